@@ -0,0 +1,309 @@
+import operator
+import uuid
+from array import array
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from app.owen_counter.exeptions import ImproperlyConfiguredError
+from app.owen_counter.owen_ci8 import OwenCI8
+from app.owen_poller.registry import NO_VALUE, OK
+
+if TYPE_CHECKING:
+    from app.owen_poller.registry import SensorRegistry
+
+OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+# показатели: скорость счета, шт/мин; показание (для группы - сумма);
+# нет связи (для группы - число сенсоров без связи)
+METRICS = ('rate', 'value', 'offline')
+
+RAISED = 'raised'
+CLEARED = 'cleared'
+
+
+@dataclass(slots=True, frozen=True)
+class AlarmRule:
+    """
+    Правило тревоги: условие metric op threshold, выполняющееся
+    не менее duration секунд. Тревога снимается, когда не выполняется
+    условие metric op clear_threshold (гистерезис, по умолчанию - threshold).
+    Проверяется для каждого сенсора sensors или для показателей группы group.
+    """
+
+    name: str
+    metric: str
+    op: str
+    threshold: float
+    duration: float = 0.0
+    clear_threshold: float | None = None
+    sensors: tuple[str, ...] = ()
+    group: str | None = None
+
+    def __post_init__(self):
+        if self.metric not in METRICS:
+            raise ImproperlyConfiguredError(
+                f'Правило {self.name}: неизвестный показатель {self.metric}.'
+            )
+        if self.op not in OPERATORS:
+            raise ImproperlyConfiguredError(
+                f'Правило {self.name}: неизвестное условие {self.op}.'
+            )
+        if bool(self.sensors) == (self.group is not None):
+            raise ImproperlyConfiguredError(
+                f'Правило {self.name}: задаются сенсоры sensors или группа group.'
+            )
+
+    @classmethod
+    def from_settings(cls, rule_settings: dict[str, Any]) -> 'AlarmRule':
+        return cls(
+            **{**rule_settings, 'sensors': tuple(rule_settings.get('sensors', ()))}
+        )
+
+    def check(self, metric: float, active: bool) -> bool:
+        """
+        :return: выполняется ли условие тревоги.
+        """
+        threshold = self.threshold
+        if active and self.clear_threshold is not None:
+            threshold = self.clear_threshold
+        return OPERATORS[self.op](metric, threshold)
+
+
+def build_rules(
+    rules_settings: Iterable[dict[str, Any]],
+    sensor_names: Iterable[str],
+    group_names: Iterable[str],
+) -> list[AlarmRule]:
+    """
+    Правила тревог из настроек alarm_rules с проверкой сенсоров и групп.
+    """
+    sensor_names = set(sensor_names)
+    group_names = set(group_names)
+    rules = []
+    for rule_settings in rules_settings:
+        rule = AlarmRule.from_settings(rule_settings)
+        if rule.group is not None and rule.group not in group_names:
+            raise ImproperlyConfiguredError(
+                f'Группа {rule.group} правила {rule.name} не найдена в groups_settings.'
+            )
+        for name in rule.sensors:
+            if name not in sensor_names:
+                raise ImproperlyConfiguredError(
+                    f'Сенсор {name} правила {rule.name} не найден в sensors_settings.'
+                )
+        rules.append(rule)
+    return rules
+
+
+class AlarmEngine:
+    """
+    Инкрементальная проверка правил тревог при записи результата опроса.
+    Правило привязывается к каждому своему сенсору или к группе;
+    состояние привязки (начало выполнения условия, активность) хранится
+    в массивах, запись показания проверяет только привязки этого сенсора
+    и его групп без пересмотра остальных. В очередь событий попадают
+    только переходы (raised/cleared), повторные срабатывания
+    не отправляются; идентификатор события позволяет получателю
+    отбросить повторную доставку. Номер перехода отсчитывается заново
+    после перезапуска и для новых правил, поэтому идентификатор начинается
+    с эпохи экземпляра (epoch): новые тревоги не совпадают с прежними.
+    Обновление и чтение выполняются под SensorRegistry.lock.
+    """
+
+    def __init__(
+        self,
+        registry: 'SensorRegistry',
+        rules: Iterable[AlarmRule],
+        previous: 'AlarmEngine | None' = None,
+    ):
+        """
+        :param registry: реестр сенсоров (группы - registry.groups),
+        :param rules: правила тревог,
+        :param previous: прежние правила, состояние одноименных привязок
+        сохраняется, активные тревоги не поднимаются повторно.
+        """
+        self.registry = registry
+        self.rules = list(rules)
+        self.epoch = uuid.uuid4().hex[:12]
+        # привязка: правило и сенсор (индекс реестра) или группа
+        self.binding_rules: list[AlarmRule] = []
+        self.subjects: list[str] = []
+        self.since = array('d')  # time.monotonic() начала выполнения условия
+        self.active = array('B')
+        self.metrics = array('d')  # последнее значение показателя
+        self.sequences = array('L')  # номер перехода для id события
+        self.sensor_bindings: dict[int, list[int]] = {}
+        self.group_bindings: dict[int, list[int]] = {}
+        self.events: list[dict[str, Any]] = []
+        groups = registry.groups
+        for rule in self.rules:
+            if rule.group is not None:
+                if groups is None or rule.group not in groups:
+                    raise ImproperlyConfiguredError(
+                        f'Группа {rule.group} правила {rule.name} не найдена.'
+                    )
+                self.bind(
+                    rule, rule.group, self.group_bindings, groups.index[rule.group]
+                )
+                continue
+            for name in rule.sensors:
+                if name not in registry.index:
+                    raise ImproperlyConfiguredError(
+                        f'Сенсор {name} правила {rule.name} не найден.'
+                    )
+                self.bind(rule, name, self.sensor_bindings, registry.index[name])
+        if previous is not None:
+            self.restore(previous)
+
+    def bind(
+        self, rule: AlarmRule, subject: str, bindings: dict[int, list[int]], key: int
+    ) -> None:
+        bindings.setdefault(key, []).append(len(self.subjects))
+        self.binding_rules.append(rule)
+        self.subjects.append(subject)
+        self.since.append(0.0)
+        self.active.append(0)
+        self.metrics.append(0.0)
+        self.sequences.append(0)
+
+    def restore(self, previous: 'AlarmEngine') -> None:
+        positions = {
+            (rule, subject): position
+            for position, (rule, subject) in enumerate(
+                zip(previous.binding_rules, previous.subjects, strict=True)
+            )
+        }
+        for binding, key in enumerate(
+            zip(self.binding_rules, self.subjects, strict=True)
+        ):
+            if (position := positions.get(key)) is None:
+                continue
+            self.since[binding] = previous.since[position]
+            self.active[binding] = previous.active[position]
+            self.metrics[binding] = previous.metrics[position]
+            self.sequences[binding] = previous.sequences[position]
+        self.events = previous.events
+
+    def sensor_metric(self, index: int, metric: str) -> float | None:
+        """
+        :return: None - показания нет, условие не проверяется.
+        """
+        registry = self.registry
+        online = registry.statuses[index] == OK
+        if metric == 'offline':
+            return float(not online)
+        if not online:
+            return None
+        if metric == 'value':
+            value = registry.values[index]
+            return None if value == NO_VALUE else float(value)
+        recent = registry.recent
+        rate = None
+        if recent is not None:
+            rate = recent.rate(index, None, OwenCI8.MAX_VALUE, min_samples=2)
+        return None if rate is None else rate * 60
+
+    def group_metric(self, slot: int, metric: str) -> float:
+        groups = self.registry.groups
+        if metric == 'rate':
+            return groups.rates[slot]
+        if metric == 'value':
+            return float(groups.totals[slot])
+        return float(len(groups.members[slot]) - groups.online[slot])
+
+    def update(self, index: int, now: float, wall_now: float) -> None:
+        """
+        Проверяет правила сенсора и его групп после записи результата опроса.
+        :param now: time.monotonic() результата опроса,
+        :param wall_now: time.time() результата опроса.
+        """
+        for binding in self.sensor_bindings.get(index, ()):
+            metric = self.sensor_metric(index, self.binding_rules[binding].metric)
+            if metric is not None:
+                self.evaluate(binding, metric, now, wall_now)
+        if not self.group_bindings or self.registry.groups is None:
+            return
+        for slot in self.registry.groups.memberships.get(index, ()):
+            for binding in self.group_bindings.get(slot, ()):
+                metric = self.group_metric(slot, self.binding_rules[binding].metric)
+                self.evaluate(binding, metric, now, wall_now)
+
+    def tick(self, now: float, wall_now: float) -> None:
+        """
+        Проверяет длительность условий без новых показаний: при потере
+        порта шины записей нет, тревога с duration поднимается по времени.
+        Показатель привязки - последний вычисленный.
+        """
+        for binding, rule in enumerate(self.binding_rules):
+            if rule.duration and self.since[binding] and not self.active[binding]:
+                self.evaluate(binding, self.metrics[binding], now, wall_now)
+
+    def evaluate(
+        self, binding: int, metric: float, now: float, wall_now: float
+    ) -> None:
+        rule = self.binding_rules[binding]
+        active = self.active[binding]
+        self.metrics[binding] = metric
+        if rule.check(metric, active):
+            if not self.since[binding]:
+                self.since[binding] = now
+            if not active and now - self.since[binding] >= rule.duration:
+                self.active[binding] = 1
+                self.emit(binding, RAISED, wall_now)
+        else:
+            self.since[binding] = 0.0
+            if active:
+                self.active[binding] = 0
+                self.emit(binding, CLEARED, wall_now)
+
+    def emit(self, binding: int, state: str, wall_now: float) -> None:
+        rule = self.binding_rules[binding]
+        subject = self.subjects[binding]
+        self.sequences[binding] += 1
+        self.events.append(
+            {
+                'id': f'{self.epoch}:{rule.name}:{subject}:{self.sequences[binding]}',
+                'rule': rule.name,
+                'subject': subject,
+                'state': state,
+                'metric': rule.metric,
+                'value': self.metrics[binding],
+                'threshold': rule.threshold,
+                'time': wall_now,
+            }
+        )
+
+    def drain(self) -> list[dict[str, Any]]:
+        """
+        Забирает накопленные события переходов.
+        """
+        events, self.events = self.events, []
+        return events
+
+    def report(self) -> list[dict[str, Any]]:
+        """
+        Активные тревоги: правило, сенсор или группа, значение показателя
+        и длительность выполнения условия, с.
+        """
+        now = self.registry.now
+        return [
+            {
+                'rule': rule.name,
+                'subject': subject,
+                'metric': rule.metric,
+                'value': self.metrics[binding],
+                'threshold': rule.threshold,
+                'for': now - self.since[binding],
+            }
+            for binding, (rule, subject) in enumerate(
+                zip(self.binding_rules, self.subjects, strict=True)
+            )
+            if self.active[binding]
+        ]
@@ -0,0 +1,233 @@
+import asyncio
+import time
+import unittest
+
+from app.dummy.webhook import EmulatedWebhook
+from app.owen_counter.exeptions import ImproperlyConfiguredError
+from app.owen_counter.owen_ci8 import ReadResult
+from app.owen_poller.groups import GroupAggregates, resolve_groups
+from app.owen_poller.registry import NO_VALUE, RecentSamples, SensorRegistry
+from app.sinks.pipeline import SinkPipeline
+from app.sinks.webhook import WebhookSink
+
+from .engine import CLEARED, RAISED, AlarmEngine, build_rules
+
+
+def local_ids(events: list[dict]) -> list[str]:
+    # идентификаторы событий без эпохи экземпляра AlarmEngine
+    return [event['id'].split(':', 1)[1] for event in events]
+
+
+class TestAlarmEngine(unittest.TestCase):
+    def setUp(self):
+        self.registry = SensorRegistry(recent=RecentSamples(capacity=8))
+        for name in ('s1', 's2'):
+            self.registry.allocate(name)
+        self.registry.groups = GroupAggregates(
+            self.registry,
+            resolve_groups({'line1': ['s1', 's2']}, self.registry.index),
+        )
+
+    def set_rules(self, *rules: dict) -> AlarmEngine:
+        self.registry.alarms = AlarmEngine(
+            self.registry,
+            build_rules(rules, self.registry.index, self.registry.groups.index),
+            previous=self.registry.alarms,
+        )
+        return self.registry.alarms
+
+    def store(self, name: str, timestamp: float, status: str, value: int = NO_VALUE):
+        self.registry.stamp()
+        self.registry.store(self.registry.index[name], status, value, timestamp)
+
+    def test_build_rules(self):
+        """Тестируем проверку правил тревог."""
+        rule = {'name': 'high', 'sensors': ['s1'], 'metric': 'value'}
+        with self.assertRaises(ImproperlyConfiguredError):
+            build_rules([{**rule, 'op': '>>', 'threshold': 1}], ['s1'], [])
+        with self.assertRaises(ImproperlyConfiguredError):
+            build_rules([{**rule, 'op': '>', 'threshold': 1}], ['s2'], [])
+        with self.assertRaises(ImproperlyConfiguredError):
+            build_rules(
+                [{**rule, 'op': '>', 'threshold': 1, 'group': 'line1'}], ['s1'], []
+            )
+        (built,) = build_rules([{**rule, 'op': '>', 'threshold': 1}], ['s1'], [])
+        self.assertEqual(('s1',), built.sensors)
+
+    def test_duration_and_hysteresis(self):
+        """Тестируем тревогу по длительности условия и снятие с гистерезисом."""
+        alarms = self.set_rules(
+            {
+                'name': 'slow',
+                'sensors': ['s1'],
+                'metric': 'rate',
+                'op': '<',
+                'threshold': 30,
+                'clear_threshold': 50,
+                'duration': 5,
+            }
+        )
+        # 60 шт/мин, затем остановка
+        for step in range(1, 4):
+            self.store('s1', step, ReadResult.OK, step)
+        for step in range(4, 16):
+            self.store('s1', step, ReadResult.OK, 3)
+        (raised,) = alarms.drain()
+        self.assertEqual(
+            (RAISED, 'slow', 's1', ['slow:s1:1']),
+            (raised['state'], raised['rule'], raised['subject'], local_ids([raised])),
+        )
+        self.assertEqual(1, len(alarms.report()))
+        # 40 шт/мин - выше threshold, но ниже clear_threshold: тревога остается
+        value = 3
+        for step in range(16, 46, 3):
+            value += 2
+            self.store('s1', step, ReadResult.OK, value)
+        self.assertEqual([], alarms.drain())
+        self.assertAlmostEqual(40.0, alarms.metrics[0])
+        for step in range(46, 56):
+            value += 1
+            self.store('s1', step, ReadResult.OK, value)
+        (cleared,) = alarms.drain()
+        self.assertEqual(
+            (CLEARED, ['slow:s1:2']), (cleared['state'], local_ids([cleared]))
+        )
+        self.assertEqual([], alarms.report())
+
+    def test_group_and_offline_rules(self):
+        """Тестируем правила по группе и по связи без повторных событий."""
+        alarms = self.set_rules(
+            {
+                'name': 'line-offline',
+                'group': 'line1',
+                'metric': 'offline',
+                'op': '>=',
+                'threshold': 2,
+            },
+            {
+                'name': 'offline',
+                'sensors': ['s1', 's2'],
+                'metric': 'offline',
+                'op': '==',
+                'threshold': 1,
+                'duration': 2,
+            },
+        )
+        for step in range(1, 3):
+            self.store('s1', step, ReadResult.OK, step)
+            self.store('s2', step, ReadResult.OK, step)
+        self.assertEqual([], alarms.drain())
+        for step in range(3, 8):
+            self.store('s1', step, ReadResult.TIMEOUT)
+            self.store('s2', step + 0.5, ReadResult.TIMEOUT)
+        events = alarms.drain()
+        self.assertEqual(
+            ['line-offline:line1:1', 'offline:s1:1', 'offline:s2:1'],
+            local_ids(events),
+        )
+        self.assertTrue(all(event['state'] == RAISED for event in events))
+        self.store('s2', 8, ReadResult.OK, 10)
+        self.assertEqual(
+            ['offline:s2:2', 'line-offline:line1:2'],
+            local_ids(alarms.drain()),
+        )
+
+    def test_duration_checked_without_readings(self):
+        """Тестируем тревогу по длительности без новых показаний."""
+        alarms = self.set_rules(
+            {
+                'name': 'offline',
+                'sensors': ['s1'],
+                'metric': 'offline',
+                'op': '==',
+                'threshold': 1,
+                'duration': 5,
+            }
+        )
+        self.store('s1', 1, ReadResult.OK, 1)
+        self.store('s1', 2, ReadResult.ERROR)
+        alarms.tick(6, 6.0)
+        self.assertEqual([], alarms.drain())
+        alarms.tick(7, 7.0)
+        (raised,) = alarms.drain()
+        self.assertEqual(
+            (RAISED, ['offline:s1:1']), (raised['state'], local_ids([raised]))
+        )
+        alarms.tick(8, 8.0)
+        self.assertEqual([], alarms.drain())
+
+    def test_state_kept_on_rebuild(self):
+        """Тестируем сохранение активных тревог при изменении правил."""
+        rule = {
+            'name': 'high',
+            'sensors': ['s1'],
+            'metric': 'value',
+            'op': '>',
+            'threshold': 100,
+        }
+        alarms = self.set_rules(rule)
+        self.store('s1', 1, ReadResult.OK, 150)
+        self.assertEqual(1, len(alarms.drain()))
+        alarms = self.set_rules(rule, {**rule, 'name': 'higher', 'threshold': 120})
+        self.store('s1', 2, ReadResult.OK, 160)
+        self.assertEqual(['higher:s1:1'], local_ids(alarms.drain()))
+        self.assertEqual(['high', 'higher'], [item['rule'] for item in alarms.report()])
+        self.store('s1', 3, ReadResult.OK, 90)
+        self.assertEqual(['high:s1:2', 'higher:s1:2'], local_ids(alarms.drain()))
+
+    def test_event_ids_unique_across_engines(self):
+        """Тестируем разные идентификаторы событий после перезапуска."""
+        rule = {
+            'name': 'high',
+            'sensors': ['s1'],
+            'metric': 'value',
+            'op': '>',
+            'threshold': 100,
+        }
+        ids = []
+        for _ in range(2):
+            self.registry.alarms = None
+            alarms = self.set_rules(rule)
+            self.store('s1', 1, ReadResult.OK, 150)
+            self.store('s1', 2, ReadResult.OK, 90)
+            events = alarms.drain()
+            self.assertEqual(['high:s1:1', 'high:s1:2'], local_ids(events))
+            ids.extend(event['id'] for event in events)
+        self.assertEqual(4, len(set(ids)))
+
+
+class TestWebhookSink(unittest.TestCase):
+    @staticmethod
+    def deliver(webhook: EmulatedWebhook, batches: list[list[dict]]) -> dict:
+        async def run():
+            sink = WebhookSink(webhook.url, retry_delay=0.01, name='webhook')
+            pipeline = SinkPipeline([sink])
+            pipeline.start()
+            for batch in batches:
+                pipeline.publish(batch)
+            deadline = time.monotonic() + 2
+            while sink.written < len(batches) and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            report = pipeline.report()
+            await pipeline.close()
+            return report
+
+        return asyncio.run(run())
+
+    def test_events_delivered(self):
+        """Тестируем доставку событий тревог на webhook."""
+        events = [
+            {'id': 'slow:s1:1', 'state': RAISED, 'time': None},
+            {'id': 'slow:s1:2', 'state': CLEARED, 'time': None},
+        ]
+        with EmulatedWebhook() as webhook:
+            self.deliver(webhook, [events[:1], events[1:]])
+        self.assertEqual(events, webhook.received)
+
+    def test_failed_post_retried(self):
+        """Тестируем повторную отправку при ошибке получателя."""
+        with EmulatedWebhook(failures=2) as webhook:
+            report = self.deliver(webhook, [[{'id': 'slow:s1:1', 'time': None}]])
+        self.assertEqual(3, webhook.requests)
+        self.assertEqual([{'id': 'slow:s1:1', 'time': None}], webhook.received)
+        self.assertEqual(1, report['webhook']['written'])
@@ -0,0 +1,265 @@
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from app.owen_counter.owen_ci8 import OwenCI8
+from app.owen_poller.registry import NO_VALUE
+
+# Состояния интервала между соседними отсчетами (как в DummyCounter)
+OFFLINE = 0
+STOP = 1
+PAUSE = 2
+PARTIAL = 3
+FULL = 4
+STATES = ('offline', 'stop', 'pause', 'partial', 'full')
+NO_INTERVAL = -1  # нет одного из отсчетов или интервал вне окна
+
+
+@dataclass
+class Thresholds:
+    """
+    Пороги классификации:
+    idle_rate - скорость (шт/мин), не выше которой интервал считается простоем,
+    full_rate - скорость, начиная с которой работа идет в полную силу,
+    pause_max - простой короче pause_max секунд - пауза, длиннее - остановка.
+    """
+
+    idle_rate: float = 10.0
+    full_rate: float = 150.0
+    pause_max: float = 60.0
+
+
+def get_thresholds(**overrides: float | None) -> Thresholds:
+    """
+    Пороги из settings (ANALYTICS_IDLE_RATE и др.) с заменой заданных значений.
+    """
+    from app import settings
+
+    thresholds = Thresholds(
+        idle_rate=getattr(settings, 'ANALYTICS_IDLE_RATE', Thresholds.idle_rate),
+        full_rate=getattr(settings, 'ANALYTICS_FULL_RATE', Thresholds.full_rate),
+        pause_max=getattr(settings, 'ANALYTICS_PAUSE_MAX', Thresholds.pause_max),
+    )
+    for name, value in overrides.items():
+        if value is not None:
+            setattr(thresholds, name, value)
+    return thresholds
+
+
+def order_samples(
+    times: np.ndarray, values: np.ndarray, heads: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Упорядочивает кольцевые буферы от старых отсчетов к новым.
+    :param times: время отсчетов, (сенсоры, capacity),
+    :param values: значения, (сенсоры, capacity),
+    :param heads: позиции следующей записи буферов.
+    Незаполненные позиции (время 0) оказываются в начале строки.
+    """
+    capacity = times.shape[1]
+    heads = np.asarray(heads, dtype=np.intp)
+    order = (heads[:, None] + np.arange(capacity)) % capacity
+    return (
+        np.take_along_axis(times, order, axis=1),
+        np.take_along_axis(values, order, axis=1),
+    )
+
+
+def classify(
+    times: np.ndarray,
+    values: np.ndarray,
+    window_start: float,
+    thresholds: Thresholds,
+    max_value: int = OwenCI8.MAX_VALUE,
+) -> dict[str, np.ndarray]:
+    """
+    Классифицирует интервалы между отсчетами всех сенсоров.
+    :param times: упорядоченное время отсчетов, (сенсоры, отсчеты),
+    :param values: упорядоченные значения счетчиков, NO_VALUE - нет связи,
+    :param window_start: начало окна анализа (time.time()),
+    :param thresholds: пороги классификации,
+    :param max_value: значение переполнения счетчика.
+    :return: state - состояние интервала, duration - длительность в окне, с,
+      count - импульсов за интервал в окне, run_* - серии простоев.
+    """
+    t0, t1 = times[:, :-1], times[:, 1:]
+    v0, v1 = values[:, :-1], values[:, 1:]
+    span = t1 - t0
+    duration = t1 - np.maximum(t0, window_start)
+    valid = (t0 > 0) & (span > 0) & (duration > 0)
+    duration[~valid] = 0.0
+    span[~valid] = 1.0
+    offline = (v0 == NO_VALUE) | (v1 == NO_VALUE)
+    diff = v1 - v0
+    diff[diff < 0] += max_value
+    diff[offline] = 0
+    rate = diff / span
+    count = rate * duration
+    rate *= 60
+
+    state = np.full(diff.shape, PARTIAL, dtype=np.int8)
+    state[rate >= thresholds.full_rate] = FULL
+    idle = rate <= thresholds.idle_rate
+    state[idle] = STOP
+    state[offline] = OFFLINE
+    state[~valid] = NO_INTERVAL
+
+    # серии простоев: соседние интервалы одного состояния одного сенсора
+    flat_state = state.ravel()
+    flat_duration = duration.ravel()
+    intervals = state.shape[1]
+    starts = np.ones(flat_state.shape, dtype=bool)
+    if flat_state.size:
+        starts[1:] = flat_state[1:] != flat_state[:-1]
+        starts[::intervals] = True
+    run_start = np.flatnonzero(starts)
+    if run_start.size:
+        run_duration = np.add.reduceat(flat_duration, run_start)
+    else:
+        run_duration = np.zeros(0)
+    run_state = flat_state[run_start]
+    short = (run_state == STOP) & (run_duration < thresholds.pause_max)
+    run_state[short] = PAUSE
+    run_length = np.diff(run_start, append=flat_state.size)
+    state = np.repeat(run_state, run_length).reshape(state.shape)
+    return {
+        'state': state,
+        'duration': duration,
+        'count': count,
+        'run_row': run_start // max(intervals, 1),
+        'run_state': run_state,
+        'run_duration': run_duration,
+    }
+
+
+def summarize(classified: dict[str, np.ndarray], thresholds: Thresholds) -> dict:
+    """
+    Сводка по сенсорам: длительность состояний, доступность, производительность.
+    Доступность - доля времени работы (частичной и полной) во времени на связи,
+    производительность - отношение выпуска ко времени работы на full_rate.
+    """
+    state = classified['state']
+    duration = classified['duration']
+    rows = state.shape[0]
+    valid = state >= 0
+    keys = np.arange(rows)[:, None] * len(STATES) + state
+    totals = np.bincount(
+        keys[valid], weights=duration[valid], minlength=rows * len(STATES)
+    ).reshape(rows, len(STATES))
+    working = state >= PARTIAL
+    run_time = totals[:, PARTIAL] + totals[:, FULL]
+    online_time = totals.sum(axis=1) - totals[:, OFFLINE]
+    produced = np.where(working, classified['count'], 0.0).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        availability = np.where(online_time > 0, run_time / online_time, np.nan)
+        performance = np.where(
+            run_time > 0, produced / (thresholds.full_rate / 60 * run_time), np.nan
+        )
+    stops = classified['run_state'] == STOP
+    return {
+        'totals': totals,
+        'availability': availability,
+        'performance': performance,
+        'produced': produced,
+        'stop_rows': classified['run_row'][stops],
+        'stop_durations': classified['run_duration'][stops],
+    }
+
+
+def _optional(value: float) -> float | None:
+    return None if np.isnan(value) else float(value)
+
+
+def analyze(
+    times: np.ndarray,
+    values: np.ndarray,
+    heads: np.ndarray,
+    now: float,
+    window: float,
+    thresholds: Thresholds,
+) -> list[dict[str, Any]]:
+    """
+    Аналитика простоев сенсоров по истории показаний за последние window секунд.
+    :return: сводка по каждой строке истории.
+    """
+    times, values = order_samples(times, values, heads)
+    summary = summarize(classify(times, values, now - window, thresholds), thresholds)
+    stop_rows = summary['stop_rows']
+    stop_durations = summary['stop_durations']
+    boundaries = np.searchsorted(stop_rows, np.arange(times.shape[0] + 1))
+    result = []
+    for row, totals in enumerate(summary['totals'].tolist()):
+        durations = stop_durations[boundaries[row] : boundaries[row + 1]].tolist()
+        result.append(
+            {
+                'states': dict(zip(STATES, totals, strict=True)),
+                'availability': _optional(summary['availability'][row]),
+                'performance': _optional(summary['performance'][row]),
+                'produced': float(summary['produced'][row]),
+                'stops': {
+                    'count': len(durations),
+                    'total': sum(durations),
+                    'longest': max(durations, default=0.0),
+                    'durations': durations,
+                },
+            }
+        )
+    return result
+
+
+def snapshot(poller, sensors: list) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Копирует историю сенсоров под registry.lock.
+    :return: время, значения и позиции записи кольцевых буферов.
+    """
+    history = poller.registry.history
+    indexes = np.fromiter((sensor.index for sensor in sensors), dtype=np.intp)
+    capacity = history.capacity
+    with poller.registry.lock:
+        # представления буферов array живут только внутри выражений,
+        # иначе array не сможет расти при добавлении сенсоров
+        times = np.frombuffer(history.times, dtype=np.float64).reshape(-1, capacity)[
+            indexes
+        ]
+        values = np.frombuffer(history.values, dtype=np.int64).reshape(-1, capacity)[
+            indexes
+        ]
+        heads = np.frombuffer(history.heads, dtype=f'u{history.heads.itemsize}')[
+            indexes
+        ].astype(np.intp)
+    return times, values, heads
+
+
+def analyze_sensors(
+    poller,
+    names: list[str] | None,
+    window: float,
+    thresholds: Thresholds,
+    now: float,
+) -> list[dict[str, Any]]:
+    """
+    Аналитика простоев для списка сенсоров (None - все сенсоры).
+    Поддерживаются счетчики импульсов (параметр DCNT).
+    """
+    if names is None:
+        names = list(poller.sensors)
+    responses = []
+    selected = []
+    for name in names:
+        response = {'sensor': name, 'window': window, 'status': 'NOT FOUND'}
+        responses.append(response)
+        sensor = poller.sensors.get(name)
+        if sensor is None:
+            continue
+        if sensor.parameter_hash != OwenCI8.DCNT:
+            response['status'] = 'NOT SUPPORTED'
+            continue
+        response['status'] = 'OK'
+        selected.append((response, sensor))
+    if selected:
+        times, values, heads = snapshot(poller, [sensor for _, sensor in selected])
+        analysis = analyze(times, values, heads, now, window, thresholds)
+        for (response, _), result in zip(selected, analysis, strict=True):
+            response.update(result)
+    return responses
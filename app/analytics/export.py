@@ -0,0 +1,181 @@
+import csv
+import io
+import json
+import zlib
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+
+from app.owen_poller.registry import NO_VALUE
+from app.owen_poller.timeseries import decode_series
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+CSV_HEADER = ('sensor', 'time', 'value')
+CHUNK_SIZE = 64 * 1024
+
+
+def read_series(poller, name: str, sensor) -> tuple[list[float], list[int]]:
+    """
+    Копирует историю одного сенсора под registry.lock.
+    Блокировка держится только на время копирования одного сенсора,
+    поэтому выгрузка не задерживает опрос.
+    """
+    with poller.registry.lock:
+        if poller.sensors.get(name) is not sensor:
+            # сенсор удален при перезагрузке настроек, индекс мог быть переиспользован
+            return [], []
+        return poller.registry.history.series(sensor.index)
+
+
+def read_archive(
+    poller, name: str, sensor, start: float | None, end: float | None
+) -> Iterator[tuple[float, int]]:
+    """
+    Отсчеты длительной истории сенсора в интервале [start, end).
+    Под registry.lock копируется только индекс блоков, декодирование
+    потоковое, поэтому выгрузка суток не держит в памяти всю историю.
+    """
+    with poller.registry.lock:
+        if poller.sensors.get(name) is not sensor:
+            return iter(())
+        starts, blocks = poller.registry.archive.snapshot(sensor.index)
+    return decode_series(starts, blocks, start, end)
+
+
+def select_samples(
+    times: list[float],
+    values: list[int],
+    start: float | None = None,
+    end: float | None = None,
+    step: float = 0.0,
+) -> Iterator[tuple[float, int | None]]:
+    """
+    Отсчеты в интервале [start, end), при step > 0 - последний отсчет
+    каждого интервала step секунд (для счетчика - его значение на конец интервала).
+    NO_VALUE возвращается как None.
+    """
+    return thin_samples(zip(times, values, strict=True), start, end, step)
+
+
+def thin_samples(
+    samples: Iterable[tuple[float, int]],
+    start: float | None = None,
+    end: float | None = None,
+    step: float = 0.0,
+) -> Iterator[tuple[float, int | None]]:
+    """
+    select_samples для потока отсчетов (время, значение).
+    """
+    last = None
+    last_bucket = None
+    for wall_time, value in samples:
+        if start is not None and wall_time < start:
+            continue
+        if end is not None and wall_time >= end:
+            break
+        sample = (wall_time, None if value == NO_VALUE else value)
+        if step <= 0:
+            yield sample
+            continue
+        bucket = wall_time // step
+        if last is not None and bucket != last_bucket:
+            yield last
+        last, last_bucket = sample, bucket
+    if last is not None:
+        yield last
+
+
+def iter_samples(
+    poller,
+    names: Iterable[str],
+    start: float | None = None,
+    end: float | None = None,
+    step: float = 0.0,
+) -> Iterator[tuple[str, float, int | None]]:
+    """
+    Отсчеты истории сенсоров по очереди, неизвестные сенсоры пропускаются.
+    При ARCHIVE_SIZE - из длительной истории, иначе - из SampleHistory.
+    """
+    archive = poller.registry.archive is not None
+    for name in names:
+        sensor = poller.sensors.get(name)
+        if sensor is None:
+            continue
+        if archive:
+            samples = read_archive(poller, name, sensor, start, end)
+        else:
+            samples = zip(*read_series(poller, name, sensor), strict=True)
+        for wall_time, value in thin_samples(samples, start, end, step):
+            yield name, wall_time, value
+
+
+def format_ndjson(samples: Iterable[tuple[str, float, int | None]]) -> Iterator[str]:
+    for name, wall_time, value in samples:
+        time = datetime.fromtimestamp(wall_time).isoformat()
+        yield json.dumps({'sensor': name, 'time': time, 'value': value}) + '\n'
+
+
+def format_csv(samples: Iterable[tuple[str, float, int | None]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(CSV_HEADER)
+    for name, wall_time, value in samples:
+        writer.writerow((name, datetime.fromtimestamp(wall_time).isoformat(), value))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def batch(lines: Iterable[str], size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Объединяет строки в блоки около size байт.
+    """
+    chunk = []
+    length = 0
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(chunk).encode()
+            chunk.clear()
+            length = 0
+    if chunk:
+        yield ''.join(chunk).encode()
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 - формат gzip
+    for chunk in chunks:
+        if compressed := compressor.compress(chunk):
+            yield compressed
+    yield compressor.flush()
+
+
+def export_history(
+    poller,
+    names: Iterable[str],
+    fmt: str = 'ndjson',
+    start: float | None = None,
+    end: float | None = None,
+    step: float = 0.0,
+    compress: bool = False,
+) -> Iterator[bytes]:
+    """
+    Потоковая выгрузка истории показаний сенсоров.
+    Память не зависит от объема выгрузки: в памяти одновременно
+    история одного сенсора (для длительной истории - копия индекса
+    ее блоков) и один блок ответа.
+    :param names: сенсоры,
+    :param fmt: ndjson или csv,
+    :param start: начало интервала (time.time()),
+    :param end: конец интервала (time.time()),
+    :param step: интервал прореживания, с (0 - все отсчеты),
+    :param compress: сжатие gzip.
+    :return: блоки ответа.
+    """
+    formatter = format_csv if fmt == 'csv' else format_ndjson
+    chunks = batch(formatter(iter_samples(poller, names, start, end, step)))
+    return gzip_stream(chunks) if compress else chunks
@@ -0,0 +1,156 @@
+import csv
+import gzip
+import io
+import json
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.owen_poller.history import SampleHistory
+from app.owen_poller.registry import NO_VALUE, SensorRegistry
+from app.owen_poller.timeseries import CompressedHistory
+
+from .downtime import Thresholds, analyze
+from .export import export_history, select_samples
+
+
+def build_history(*series: list[int | None], interval: float = 10.0):
+    """
+    История сенсоров из приращений счетчика за интервал (None - нет связи).
+    """
+    capacity = max(len(increments) for increments in series) + 1
+    history = SampleHistory(capacity=capacity, interval=0)
+    history.extend(len(series))
+    for index, increments in enumerate(series):
+        total = 0
+        history.record(index, 1000.0, total)
+        for step, increment in enumerate(increments, start=1):
+            if increment is None:
+                value = NO_VALUE
+            else:
+                total += increment
+                value = total
+            history.record(index, 1000.0 + step * interval, value)
+    shape = (len(series), capacity)
+    return (
+        np.array(history.times).reshape(shape),
+        np.array(history.values).reshape(shape),
+        np.array(history.heads),
+    )
+
+
+class TestDowntimeAnalytics(unittest.TestCase):
+    def setUp(self):
+        # 10 с интервал: 25 шт = 150 шт/мин, 10 шт = 60 шт/мин
+        self.thresholds = Thresholds(idle_rate=10, full_rate=150, pause_max=60)
+
+    def analyze(self, *series, now: float = 2000.0, window: float = 1000.0):
+        times, values, heads = build_history(*series)
+        return analyze(times, values, heads, now, window, self.thresholds)
+
+    def test_states_classified(self):
+        """Тестируем классификацию состояний как в DummyCounter."""
+        series = [None, None] + [0] * 8 + [10] * 3 + [0] * 2 + [25] * 4
+        result = self.analyze(series)[0]
+        self.assertEqual(
+            {'offline': 30, 'stop': 70, 'pause': 20, 'partial': 30, 'full': 40},
+            result['states'],
+        )
+        self.assertEqual(
+            {'count': 1, 'total': 70, 'longest': 70},
+            {key: result['stops'][key] for key in ('count', 'total', 'longest')},
+        )
+        self.assertAlmostEqual(70 / 160, result['availability'])
+        self.assertAlmostEqual(130 / (150 / 60 * 70), result['performance'])
+        self.assertEqual(130, result['produced'])
+
+    def test_sensors_analyzed_independently(self):
+        """Тестируем независимую обработку сенсоров с разной длиной истории."""
+        first, second, third = self.analyze([0] * 7 + [25], [25] * 3, [])
+        self.assertEqual([70.0], first['stops']['durations'])
+        self.assertEqual(30, second['states']['full'])
+        self.assertEqual(0, second['stops']['count'])
+        self.assertEqual(1.0, second['availability'])
+        self.assertIsNone(third['availability'])
+        self.assertEqual(0, sum(third['states'].values()))
+
+    def test_window_and_ring_buffer_wrap(self):
+        """Тестируем окно анализа по кольцевому буферу после переполнения."""
+        times, values, heads = build_history([25] * 5)
+        history_len = times.shape[1]
+        # сдвигаем кольцо: самый старый отсчет теперь не в начале строки
+        times = np.roll(times, 2, axis=1)
+        values = np.roll(values, 2, axis=1)
+        heads = (heads + 2) % history_len
+        result = analyze(times, values, heads, 1050.0, 25.0, self.thresholds)[0]
+        self.assertEqual(25, result['states']['full'])
+
+    def test_counter_overflow(self):
+        """Тестируем переполнение счетчика."""
+        times, values, heads = build_history([25, 25])
+        values[0] = [9_999_965, 9_999_990, 16]
+        result = analyze(times, values, heads, 2000.0, 1000.0, self.thresholds)[0]
+        self.assertEqual(20, result['states']['full'])
+
+
+class TestHistoryExport(unittest.TestCase):
+    def setUp(self):
+        registry = SensorRegistry(history=SampleHistory(capacity=100, interval=0))
+        self.poller = SimpleNamespace(registry=registry, sensors={})
+        for name in ('a', 'b'):
+            index = registry.allocate(name)
+            self.poller.sensors[name] = SimpleNamespace(index=index)
+        for step in range(10):
+            registry.history.record(0, 1000.0 + step * 10, step)
+        registry.history.record(1, 1000.0, NO_VALUE)
+
+    def export(self, *names: str, **kwargs) -> bytes:
+        return b''.join(export_history(self.poller, names, **kwargs))
+
+    def test_range_and_downsampling(self):
+        """Тестируем интервал [start, end) и последний отсчет каждых step секунд."""
+        times = [1000.0 + step * 10 for step in range(10)]
+        samples = select_samples(times, list(range(10)), start=1010, end=1080)
+        self.assertEqual([1, 2, 3, 4, 5, 6, 7], [value for _, value in samples])
+        samples = select_samples(times, list(range(10)), step=30)
+        self.assertEqual(
+            [(1010.0, 1), (1040.0, 4), (1070.0, 7), (1090.0, 9)], list(samples)
+        )
+
+    def test_ndjson(self):
+        """Тестируем NDJSON с пропуском неизвестных сенсоров."""
+        lines = self.export('b', 'x', 'a', end=1020).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [('b', None), ('a', 0), ('a', 1)],
+            [(row['sensor'], row['value']) for row in rows],
+        )
+
+    def test_csv_gzip(self):
+        """Тестируем сжатую выгрузку CSV."""
+        content = gzip.decompress(self.export('a', fmt='csv', compress=True))
+        rows = list(csv.reader(io.StringIO(content.decode())))
+        self.assertEqual(['sensor', 'time', 'value'], rows[0])
+        self.assertEqual(['a', '9'], [rows[-1][0], rows[-1][2]])
+        self.assertEqual(11, len(rows))
+
+
+class TestArchiveExport(unittest.TestCase):
+    def test_export_from_archive(self):
+        """Тестируем выгрузку интервала из длительной истории."""
+        registry = SensorRegistry(
+            archive=CompressedHistory(capacity=1000, interval=0, block_size=16)
+        )
+        poller = SimpleNamespace(registry=registry, sensors={})
+        index = registry.allocate('a')
+        poller.sensors['a'] = SimpleNamespace(index=index)
+        for step in range(100):
+            registry.archive.record(index, 1000.0 + step, step)
+        content = b''.join(export_history(poller, ['a'], start=1050, end=1080, step=10))
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual([59, 69, 79], [row['value'] for row in rows])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,4 +6,4 @@ from typing import Any
 @dataclass
 class SensorReading:
     value: Any = None
-    time: datetime = datetime.now()
+    time: datetime | None = None
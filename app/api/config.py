@@ -1,4 +1,5 @@
 import logging
+from functools import lru_cache
 from pathlib import Path
 
 from pydantic import BaseSettings, HttpUrl
@@ -10,6 +11,29 @@ class Settings(BaseSettings):
     poller_active: bool = False
     debug: bool = False
     poller_connection_timeout: float = 1.5
+    error_summary_interval: float = 120.0
+    probe_cache_ttl: float = 5.0
+    peers: list[str] = []
+    peer_timeout: float = 2.0
+    peer_cache_ttl: float = 1.0
+    peer_stale_ttl: float = 60.0
+    sinks: list[str] = []
+    sink_queue_size: int = 100
+    phyhub_interval: float = 30.0
+    mqtt_url: str = 'mqtt://127.0.0.1:1883'
+    mqtt_topic: str = 'owen/sensors'
+    sink_file: str = 'readings.ndjson'
+    alarm_webhooks: list[str] = []
+    api_max_concurrency: int = 32
+    api_heavy_concurrency: int = 2
+    api_system_reserve: int = 8
+    api_client_concurrency: int = 8
+    api_rate: float = 200.0
+    api_client_rate: float = 20.0
+    api_client_burst: int = 40
+    api_stale_ttl: float = 30.0
+    api_max_lag: float = 0.05
+    api_trusted_proxies: list[str] = []
 
     class Config:
         # env_file = '.env'
@@ -17,11 +41,24 @@ class Settings(BaseSettings):
         env_file_encoding = 'utf-8'
 
 
-settings = Settings()
-logging_level = logging.DEBUG if settings.debug else logging.INFO
+@lru_cache
+def get_settings() -> Settings:
+    """
+    Настройки создаются при первом обращении, а не при импорте модуля.
+    """
+    return Settings()
 
 
-def configure_logging(level=logging_level):
+def __getattr__(name: str):
+    # from app.api.config import settings
+    if name == 'settings':
+        return get_settings()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def configure_logging(level: int | None = None):
+    if level is None:
+        level = logging.DEBUG if get_settings().debug else logging.INFO
     logging.basicConfig(
         level=level,
         datefmt='%Y-%m-%d %H:%M:%S',
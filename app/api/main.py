@@ -1,18 +1,86 @@
 import asyncio
 import logging
+import time
+from contextlib import asynccontextmanager, suppress
+from datetime import datetime
+from typing import TYPE_CHECKING, Annotated, Any, Literal
 
-from fastapi import FastAPI, status
+from fastapi import Depends, FastAPI, Query, Request, status
 from fastapi.exceptions import HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 
-from app.api.config import settings
-from app.owen_poller.exeptions import DeviceNotFound
-from app.owen_poller.owen_poller import SensorsPoller
-from app.owen_poller.sender import PcsPerMinSender
-from app.services.sensor_probe import SensorProbeService
+from app.api.config import configure_logging, get_settings
+from app.owen_poller.exeptions import DeviceNotFound, GroupNotFound
+from app.owen_poller.owen_poller import DEFAULT_BUS, SensorsPoller, log_missing
+from app.services.admission import AdmissionController, AdmissionMiddleware
+from app.services.sensor_probe import ProbeCoalescer
+from app.sinks.pipeline import build_alarm_pipeline, build_pipeline
+
+if TYPE_CHECKING:
+    from app.federation.aggregator import PeerAggregator
 
 logger = logging.getLogger(__name__)
-application = FastAPI()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Порты, опрос и отправка показаний создаются при запуске приложения,
+    а не при импорте модуля. Порты шин открываются в фоне в цикле опроса,
+    поэтому API отвечает сразу, а недоступный порт не останавливает запуск.
+    """
+    configure_logging()
+    settings = get_settings()
+    poller = SensorsPoller()
+    app.state.poller = poller
+    app.state.probes = ProbeCoalescer(poller, DEFAULT_BUS, ttl=settings.probe_cache_ttl)
+    app.state.admission = AdmissionController.from_settings(settings)
+    app.state.peers = None
+    if settings.peers:
+        from app.federation.aggregator import PeerAggregator
+
+        logger.info('Aggregating peers: %s', ', '.join(settings.peers))
+        app.state.peers = PeerAggregator(
+            settings.peers,
+            timeout=settings.peer_timeout,
+            cache_ttl=settings.peer_cache_ttl,
+            stale_ttl=settings.peer_stale_ttl,
+        )
+    sinks = build_pipeline(settings)
+    if sinks is not None:
+        logger.info('Starting sinks: %s', ', '.join(sink.name for sink in sinks.sinks))
+        poller.sinks = sinks
+        sinks.start()
+    alarm_sinks = build_alarm_pipeline(settings)
+    if alarm_sinks is not None:
+        poller.alarm_sinks = alarm_sinks
+        alarm_sinks.start()
+    tasks = [
+        asyncio.create_task(poller.poll()),
+        asyncio.create_task(app.state.admission.monitor()),
+    ]
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+        poller.close()
+        if sinks is not None:
+            await sinks.close()
+        if alarm_sinks is not None:
+            await alarm_sinks.close()
+        if app.state.peers is not None:
+            app.state.peers.close()
+
+
+application = FastAPI(lifespan=lifespan)
+
+# CORS добавляется последним, чтобы ответы 429 тоже получали его заголовки
+application.add_middleware(AdmissionMiddleware)
 
 application.add_middleware(
     CORSMiddleware,
@@ -22,17 +90,27 @@ application.add_middleware(
     allow_headers=['*'],
 )
 
-poller = SensorsPoller()
-if settings.poller_active:
-    readings_sender = PcsPerMinSender(poller)
 
+def get_poller(request: Request) -> SensorsPoller:
+    return request.app.state.poller
+
+
+Poller = Annotated[SensorsPoller, Depends(get_poller)]
+
+
+def get_probes(request: Request) -> ProbeCoalescer:
+    return request.app.state.probes
 
-@application.on_event('startup')
-async def app_startup():
-    asyncio.create_task(poller.poll())
-    if settings.poller_active:
-        logger.info('Starting active poller...')
-        asyncio.create_task(readings_sender.send_readings())
+
+Probes = Annotated[ProbeCoalescer, Depends(get_probes)]
+
+
+def get_peers(request: Request) -> 'PeerAggregator | None':
+    return request.app.state.peers
+
+
+# агрегатор импортируется только при заданных PEERS
+Peers = Annotated[Any, Depends(get_peers)]
 
 
 @application.get('/')
@@ -41,18 +119,94 @@ async def root():
 
 
 @application.get('/sensors/')
-async def get_list_sensor_readings(work_centers: str):
+async def get_list_sensor_readings(
+    work_centers: str, poller: Poller, peers: Peers, local: bool = False
+):
+    """
+    :param local: только показания собственного опроса, без запроса других
+    экземпляров; так запрашивают экземпляры в режиме агрегатора.
+    """
     work_centers = work_centers.split(',')
-    logger.debug(f'Getting readings for {work_centers}')
-    response = poller.get_list_readings(work_centers)
-    logger.debug(f'{response=}')
+    logger.debug('Getting readings for %s', work_centers)
+    federated = peers is not None and not local
+    # о ненайденных сенсорах сообщает экземпляр, объединяющий ответы
+    response = poller.get_list_readings(
+        work_centers, local=local, report_missing=not federated
+    )
+    if federated:
+        response = await peers.get_list_readings(work_centers, local=response)
+        log_missing(response)
+    logger.debug('response=%s', response)
     return response
 
 
+@application.get('/peers/')
+async def get_peers_report(peers: Peers):
+    """
+    Состояние экземпляров режима агрегатора: число запросов и ошибок,
+    время последнего ответа (latency_ms) и его возраст (staleness), с.
+    """
+    return [] if peers is None else peers.report()
+
+
+@application.get('/buses/')
+async def get_buses(poller: Poller):
+    """
+    Состояние портов шин: потери порта, время восстановления (last_recovery,
+    max_recovery) и общее время недоступности, с.
+    """
+    return poller.supervisor.report()
+
+
+@application.get('/capacity/')
+async def get_capacity(poller: Poller):
+    """
+    Загрузка шин: время символа и задержка ответа устройств, с, предельная
+    (max_rate) и запрошенная (demand_rate) частота транзакций, 1/с,
+    запрошенные и назначенные периоды опроса сенсоров, с.
+    """
+    return poller.planner.report()
+
+
+@application.get('/baudrate/')
+async def get_baudrate(poller: Poller):
+    """
+    Скорость счетчиков шин (BAUD_PROBE): скорость порта из настроек
+    и скорость, на которой отвечают счетчики (detected, mismatch - они
+    различаются), скорость каждого счетчика, расчетный рост пропускной
+    способности (gain) при перенастройке счетчиков и порта на target
+    и измеренная частота транзакций. Скорость порта не меняется.
+    """
+    return {
+        bus: probe.report(
+            poller.planner.turnarounds.get(bus, poller.planner.turnaround)
+        )
+        for bus, probe in poller.baud_probes.items()
+    }
+
+
+@application.get('/sinks/')
+async def get_sinks(poller: Poller):
+    """
+    Состояние получателей показаний: размер очереди, отброшенные
+    при переполнении пакеты, записанные показания и ошибки.
+    """
+    return {} if poller.sinks is None else poller.sinks.report()
+
+
+@application.get('/admission/')
+async def get_admission(request: Request):
+    """
+    Допуск запросов API: запросы в обработке по классам, допущенные,
+    отклоненные (429) и отданные из кэша при перегрузке (stale).
+    """
+    return request.app.state.admission.report()
+
+
 @application.get('/sensors/{name}')
-async def get_sensor_readings(name: str):
+async def get_sensor_readings(name: str, poller: Poller):
     try:
-        logger.debug(f'Getting readings for {name}')
+        logger.debug('Getting readings for %s', name)
         return poller.get_sensor_readings(name)
     except DeviceNotFound as err:
         raise HTTPException(
@@ -60,10 +214,107 @@ async def get_sensor_readings(name: str):
         ) from None
 
 
+@application.get('/groups/')
+async def get_groups(poller: Poller):
+    """
+    Суммарные показатели групп сенсоров (groups_settings).
+    """
+    return poller.get_groups()
+
+
+@application.get('/groups/{name}')
+async def get_group(name: str, poller: Poller, members: bool = True):
+    """
+    Показатели группы: скорость счета (rate), шт/мин, сумма показаний
+    счетчиков (total), число сенсоров на связи и без связи;
+    members - вклад участников группы.
+    """
+    try:
+        return poller.get_group(name, members)
+    except GroupNotFound as err:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=err.args[0]
+        ) from None
+
+
+@application.get('/alarms/')
+async def get_alarms(poller: Poller):
+    """
+    Активные тревоги (alarm_rules) и состояние получателей событий тревог.
+    """
+    return {
+        'active': poller.get_alarms(),
+        'webhooks': {} if poller.alarm_sinks is None else poller.alarm_sinks.report(),
+    }
+
+
+@application.get('/analytics/downtime/')
+async def get_downtime(
+    poller: Poller,
+    work_centers: str | None = None,
+    window: float = 3600.0,
+    idle_rate: float | None = None,
+    full_rate: float | None = None,
+    pause_max: float | None = None,
+):
+    """
+    Состояния работы (нет связи, остановка, пауза, частичная и полная работа),
+    доступность, производительность и остановки сенсоров за window секунд.
+    Без work_centers - по всем сенсорам. Пороги по умолчанию - из settings.
+    """
+    # numpy загружается при первом запросе аналитики, а не при запуске API
+    from app.analytics.downtime import analyze_sensors, get_thresholds
+
+    thresholds = get_thresholds(
+        idle_rate=idle_rate, full_rate=full_rate, pause_max=pause_max
+    )
+    names = work_centers.split(',') if work_centers else None
+    # расчет по всем сенсорам не должен задерживать остальные запросы
+    return await asyncio.get_running_loop().run_in_executor(
+        None, analyze_sensors, poller, names, window, thresholds, time.time()
+    )
+
+
+@application.get('/history/export/')
+async def export_history(
+    poller: Poller,
+    work_centers: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    step: float = 0.0,
+    fmt: Annotated[Literal['ndjson', 'csv'], Query(alias='format')] = 'ndjson',
+    gzip: bool = False,
+):
+    """
+    Потоковая выгрузка истории показаний (NDJSON или CSV) за [start, end).
+    step - прореживание: последний отсчет каждых step секунд.
+    Без work_centers - по всем сенсорам.
+    """
+    from app.analytics.export import FORMATS, export_history
+
+    names = work_centers.split(',') if work_centers else list(poller.sensors)
+    # синхронный генератор выполняется в пуле потоков, event loop свободен
+    content = export_history(
+        poller,
+        names,
+        fmt=fmt,
+        start=start.timestamp() if start else None,
+        end=end.timestamp() if end else None,
+        step=step,
+        compress=gzip,
+    )
+    headers = {
+        'Content-Disposition': f'attachment; filename="history.{fmt}"',
+    }
+    if gzip:
+        headers['Content-Encoding'] = 'gzip'
+    return StreamingResponse(content, media_type=FORMATS[fmt], headers=headers)
+
+
 @application.get('/test_sensor/{addr}')
-async def test_sensor(addr: int):
+async def test_sensor(addr: int, probes: Probes):
     try:
-        result = SensorProbeService.probe(addr=addr)
+        result = await probes.probe_addr(addr)
 
         return {
             'addr': result.addr,
@@ -82,4 +333,4 @@ async def test_sensor(addr: int):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(err),
-        ) from None
\ No newline at end of file
+        ) from None
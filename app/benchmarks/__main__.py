@@ -0,0 +1,161 @@
+"""
+Бенчмарки OwenPulseCounterAPI.
+
+Запуск из корня репозитория:
+    python -m app.benchmarks --output bench.json
+    python -m app.benchmarks --only poll --sensors 8 32 128 --offline 0 0.25
+    python -m app.benchmarks --only api --url http://127.0.0.1:8000 \\
+        --work-centers s10,s11
+    python -m app.benchmarks --only replay --replay bus.owenrec --replay-speed 0
+    python -m app.benchmarks --only startup
+    python -m app.benchmarks --only registry --registry-sensors 5000
+    python -m app.benchmarks --only admission --clients 16 --duration 5
+    python -m app.benchmarks --only history --history-samples 172800
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from app.benchmarks import environment  # noqa: F401
+
+SUITES = (
+    'codec',
+    'poll',
+    'api',
+    'replay',
+    'startup',
+    'registry',
+    'admission',
+    'history',
+)
+
+
+def get_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m app.benchmarks')
+    parser.add_argument('--only', nargs='+', choices=SUITES, default=list(SUITES[:3]))
+    parser.add_argument('--output', type=Path, help='файл для JSON результатов')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--sensors', type=int, nargs='+', default=[8, 32, 128])
+    parser.add_argument('--offline', type=float, nargs='+', default=[0.0, 0.25])
+    parser.add_argument('--cycles', type=int, default=20)
+    parser.add_argument(
+        '--realtime',
+        action='store_true',
+        help='моделировать время передачи по линии 9600 бод и таймауты',
+    )
+    parser.add_argument('--url', help='адрес запущенного экземпляра API')
+    parser.add_argument('--work-centers', help='список сенсоров для --url')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--replay', type=Path, help='журнал обмена для воспроизведения')
+    parser.add_argument(
+        '--replay-speed',
+        type=float,
+        default=0.0,
+        help='ускорение воспроизведения (1 - исходная скорость, 0 - без задержек)',
+    )
+    parser.add_argument('--registry-sensors', type=int, default=5000)
+    parser.add_argument('--history-samples', type=int, default=172800)
+    parser.add_argument(
+        '--duration', type=float, default=5.0, help='длительность нагрузки API, с'
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> dict:
+    args = parse_args(argv)
+    report = {
+        'meta': {
+            'revision': get_revision(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+        },
+        'results': {},
+    }
+    results = report['results']
+    if 'codec' in args.only:
+        from app.benchmarks import codec
+
+        results['codec'] = codec.run(repeat=args.repeat)
+    if 'poll' in args.only:
+        from app.benchmarks import poll_cycle
+
+        results['poll_cycle'] = poll_cycle.run_matrix(
+            args.sensors, args.offline, cycles=args.cycles, realtime=args.realtime
+        )
+    if 'api' in args.only:
+        from app.benchmarks import api
+
+        results['api'] = api.run(
+            url=args.url,
+            work_centers=args.work_centers.split(',') if args.work_centers else None,
+            sensors_count=max(args.sensors),
+            offline_fraction=args.offline[-1],
+            clients_counts=tuple(args.clients),
+            requests_per_client=args.requests,
+        )
+    if 'replay' in args.only:
+        if args.replay is None:
+            raise SystemExit('Для --only replay требуется --replay')
+        from app.benchmarks import replay
+
+        results['replay'] = replay.run(args.replay, speed=args.replay_speed)
+
+    if 'startup' in args.only:
+        from app.benchmarks import startup
+
+        results['startup'] = startup.run(
+            repeat=args.repeat, sensors_count=max(args.sensors)
+        )
+    if 'registry' in args.only:
+        from app.benchmarks import registry
+
+        results['registry'] = registry.run(
+            sensors_count=args.registry_sensors, repeat=args.repeat
+        )
+    if 'admission' in args.only:
+        from app.benchmarks import admission
+
+        results['admission'] = admission.run(
+            sensors_count=min(args.sensors),
+            clients=max(args.clients),
+            duration=args.duration,
+        )
+    if 'history' in args.only:
+        from app.benchmarks import timeseries
+
+        results['history'] = timeseries.run(samples_count=args.history_samples)
+
+    write_report(report, args.output)
+    return report
+
+
+def write_report(report: dict, output: Path | None) -> None:
+    dump = json.dumps(report, indent=2, ensure_ascii=False)
+    if output:
+        output.write_text(dump + '\n', encoding='utf-8')
+    else:
+        print(dump)
+
+
+if __name__ == '__main__':
+    main()
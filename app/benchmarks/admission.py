@@ -0,0 +1,139 @@
+import http.client
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+from urllib.parse import urlsplit
+
+from app.benchmarks.api import InProcessServer, percentile
+
+
+def _saturate(
+    url: str, paths: list[str], duration: float, source: str
+) -> dict[str, int]:
+    """
+    Клиент без пауз между запросами по keep-alive соединению.
+    :param source: адрес клиента 127.0.0.x, лимиты клиента - по адресу.
+    """
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(
+        parts.hostname, parts.port, timeout=10, source_address=(source, 0)
+    )
+    statuses: dict[str, int] = {}
+    deadline = time.perf_counter() + duration
+    step = 0
+    try:
+        while time.perf_counter() < deadline:
+            connection.request('GET', paths[step % len(paths)])
+            response = connection.getresponse()
+            response.read()
+            status = str(response.status)
+            if response.getheader('x-admission') == 'stale':
+                status = 'stale'
+            statuses[status] = statuses.get(status, 0) + 1
+            step += 1
+    finally:
+        connection.close()
+    return statuses
+
+
+def measure(
+    server: InProcessServer,
+    paths: list[str],
+    clients: int,
+    duration: float,
+    admission: Any,
+) -> dict[str, Any]:
+    """
+    Периоды опроса шины (между началами циклов) при нагрузке API
+    clients клиентами; admission - контроллер допуска, None - без него.
+    """
+    state = server.application.state
+    poller = state.poller
+    state.admission = admission
+    starts: list[float] = []
+    check_cycle = type(poller).check_cycle
+
+    def timed_check_cycle(serial_settings, sensors):
+        starts.append(time.perf_counter())
+        return check_cycle(serial_settings, sensors)
+
+    statuses: dict[str, int] = {}
+    poller.check_cycle = timed_check_cycle
+    try:
+        if clients:
+            with ProcessPoolExecutor(max_workers=clients) as executor:
+                futures = [
+                    executor.submit(
+                        _saturate, server.url, paths, duration, f'127.0.0.{client + 2}'
+                    )
+                    for client in range(clients)
+                ]
+                for future in futures:
+                    for status, count in future.result().items():
+                        statuses[status] = statuses.get(status, 0) + count
+        else:
+            time.sleep(duration)
+    finally:
+        del poller.check_cycle
+    periods = [end - start for start, end in zip(starts, starts[1:], strict=False)]
+    requests_count = sum(statuses.values())
+    return {
+        'clients': clients,
+        'admission': admission is not None,
+        'cycles': len(starts),
+        'period_ms_p50': percentile(periods, 0.50) * 1e3,
+        'period_ms_p99': percentile(periods, 0.99) * 1e3,
+        'period_ms_max': max(periods) * 1e3,
+        'period_ms_stdev': statistics.pstdev(periods) * 1e3,
+        'requests': requests_count,
+        'throughput_rps': requests_count / duration,
+        'statuses': statuses,
+    }
+
+
+def run(
+    sensors_count: int = 8,
+    clients: int = 16,
+    duration: float = 5.0,
+    poll_delay: float = 0.1,
+) -> dict[str, Any]:
+    """
+    Стабильность периода опроса при насыщении API: без нагрузки,
+    под нагрузкой без допуска запросов и с допуском (настройки API_*).
+    Клиенты - отдельные процессы с адресами 127.0.0.2, 127.0.0.3, ...
+    """
+    work_centers = ','.join(f's{index}' for index in range(sensors_count))
+    paths = [
+        f'/sensors/?work_centers={work_centers}',
+        '/sensors/s0',
+        '/groups/',
+        '/analytics/downtime/',
+    ]
+    with InProcessServer(sensors_count, poll_delay=poll_delay) as server:
+        from app.owen_poller.owen_poller import DEFAULT_BUS
+
+        # эмулятор отвечает без задержек линии; на 9600 бод модель загрузки
+        # шины увеличила бы периоды опроса сверх poll_delay
+        poller = server.application.state.poller
+        poller.buses_settings[DEFAULT_BUS] = {
+            **poller.buses_settings[DEFAULT_BUS],
+            'baudrate': 115200,
+        }
+        poller.plan_bus(DEFAULT_BUS)
+        time.sleep(1.0)
+        interval = poller.planner.plans[DEFAULT_BUS].intervals['s0']
+        # контроллер приложения, его monitor() работает в event loop сервера
+        admission = server.application.state.admission
+        runs = [
+            measure(server, paths, 0, duration, None),
+            measure(server, paths, clients, duration, None),
+            measure(server, paths, clients, duration, admission),
+        ]
+        server.application.state.admission = admission
+    return {
+        'sensors': sensors_count,
+        'poll_delay_ms': poll_delay * 1e3,
+        'interval_ms': interval * 1e3,
+        'runs': runs,
+    }
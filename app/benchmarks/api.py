@@ -0,0 +1,149 @@
+import http.client
+import logging
+import socket
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from urllib.parse import urlsplit
+
+from app.benchmarks.environment import install_settings
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class InProcessServer:
+    """
+    Запускает приложение в отдельном потоке на эмулированной шине.
+    """
+
+    def __init__(
+        self,
+        sensors_count: int,
+        offline_fraction: float = 0.0,
+        poll_delay: float = 0.5,
+    ):
+        bus = install_settings(sensors_count, offline_fraction, poll_delay)
+        import uvicorn
+
+        from app.api import main
+
+        self.bus = bus
+        self.application = main.application
+        self.port = _free_port()
+        self.server = uvicorn.Server(
+            uvicorn.Config(
+                self.application,
+                host='127.0.0.1',
+                port=self.port,
+                log_level='warning',
+            )
+        )
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.port}'
+
+    def __enter__(self) -> 'InProcessServer':
+        # ошибки опроса молчащих сенсоров не должны попадать в вывод бенчмарка
+        logging.disable(logging.ERROR)
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        # опрос создается при запуске приложения
+        from app.owen_poller.owen_poller import DEFAULT_BUS
+
+        self.application.state.poller.set_port(DEFAULT_BUS, self.bus)
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.server.should_exit = True
+        self.thread.join()
+        logging.disable(logging.NOTSET)
+
+
+def _client(url: str, path: str, requests_count: int) -> list[float]:
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=10)
+    latencies = []
+    try:
+        for _ in range(requests_count):
+            started = time.perf_counter()
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                raise RuntimeError(f'{path}: HTTP {response.status}')
+            latencies.append(time.perf_counter() - started)
+    finally:
+        connection.close()
+    return latencies
+
+
+def load(url: str, path: str, clients: int, requests_per_client: int) -> dict[str, Any]:
+    """
+    Нагружает url конкурентными клиентами с keep-alive соединениями.
+    """
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        futures = [
+            executor.submit(_client, url, path, requests_per_client)
+            for _ in range(clients)
+        ]
+        latencies = [latency for future in futures for latency in future.result()]
+    elapsed = time.perf_counter() - started
+    return {
+        'clients': clients,
+        'requests': len(latencies),
+        'throughput_rps': len(latencies) / elapsed,
+        'latency_ms_p50': percentile(latencies, 0.50) * 1e3,
+        'latency_ms_p99': percentile(latencies, 0.99) * 1e3,
+        'latency_ms_mean': statistics.fmean(latencies) * 1e3,
+        'latency_ms_max': max(latencies) * 1e3,
+    }
+
+
+def run(
+    url: str | None = None,
+    work_centers: list[str] | None = None,
+    sensors_count: int = 32,
+    offline_fraction: float = 0.0,
+    clients_counts: tuple[int, ...] = (1, 8, 32),
+    requests_per_client: int = 200,
+) -> dict[str, Any]:
+    """
+    Пропускная способность и задержки /sensors/.
+    Без url поднимает приложение в процессе на эмулированной шине.
+    """
+    if work_centers is None:
+        work_centers = [f's{index}' for index in range(sensors_count)]
+    path = f'/sensors/?work_centers={",".join(work_centers)}'
+    result: dict[str, Any] = {
+        'work_centers': len(work_centers),
+        'in_process': url is None,
+    }
+    if url is None:
+        result['sensors'] = sensors_count
+        result['offline_fraction'] = offline_fraction
+        with InProcessServer(sensors_count, offline_fraction) as server:
+            result['runs'] = [
+                load(server.url, path, clients, requests_per_client)
+                for clients in clients_counts
+            ]
+    else:
+        result['runs'] = [
+            load(url, path, clients, requests_per_client) for clients in clients_counts
+        ]
+    return result
@@ -0,0 +1,66 @@
+import statistics
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+
+def measure(func: Callable[[], Any], repeat: int = 5) -> dict[str, float]:
+    """
+    Замеряет время одного вызова func, нс.
+    Количество вызовов в серии подбирается автоматически (не менее 0.2 с).
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    timings = [t / number * 1e9 for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'ns_per_op_min': min(timings),
+        'ns_per_op_median': statistics.median(timings),
+        'ops_per_sec': 1e9 / min(timings),
+        'loops': number,
+        'repeat': repeat,
+    }
+
+
+def run(repeat: int = 5) -> dict[str, Any]:
+    """
+    Микробенчмарки кодека Owen на пакетах ответа DCNT и DTMR.
+    """
+    from app.dummy.emulator import EmulatedCI8
+    from app.owen_counter.owen_ci8 import DataConverters, OwenCI8
+
+    device = OwenCI8(addr=2, addr_len=8)
+    emulated = EmulatedCI8(addr=2, addr_len=8)
+    command = device.get_command_packet(OwenCI8.DCNT)
+    command_ascii = device.bin_to_ascii(command)
+    dcnt_ascii = emulated.get_response(OwenCI8.DCNT)
+    dtmr_ascii = emulated.get_response(OwenCI8.DTMR)
+    dcnt_bin = device.ascii_to_bin(dcnt_ascii)
+    dtmr_bin = device.ascii_to_bin(dtmr_ascii)
+    dcnt_data = bytes(device.check_bin_packet(bytearray(dcnt_bin), OwenCI8.DCNT))
+    dtmr_data = bytes(device.check_bin_packet(bytearray(dtmr_bin), OwenCI8.DTMR))
+    dcnt_batch = [dcnt_data] * 1000
+
+    cases: dict[str, Callable[[], Any]] = {
+        'calc_owen_crc[dcnt_response]': lambda: device.calc_owen_crc(dcnt_bin[:-2]),
+        'calc_owen_crc[dtmr_response]': lambda: device.calc_owen_crc(dtmr_bin[:-2]),
+        'bin_to_ascii[command]': lambda: device.bin_to_ascii(command),
+        'ascii_to_bin[command]': lambda: device.ascii_to_bin(command_ascii),
+        'ascii_to_bin[dcnt_response]': lambda: device.ascii_to_bin(dcnt_ascii),
+        'ascii_to_bin[dtmr_response]': lambda: device.ascii_to_bin(dtmr_ascii),
+        'check_bin_packet[dcnt_response]': lambda: device.check_bin_packet(
+            bytearray(dcnt_bin), OwenCI8.DCNT
+        ),
+        'check_bin_packet[dtmr_response]': lambda: device.check_bin_packet(
+            bytearray(dtmr_bin), OwenCI8.DTMR
+        ),
+        'bcd_to_int[4]': lambda: DataConverters.bcd_to_int(dcnt_data),
+        'clk_to_timedelta[7]': lambda: DataConverters.clk_to_timedelta(dtmr_data),
+        'bcd_to_int_batch[1000x4]': lambda: DataConverters.bcd_to_int_batch(dcnt_batch),
+    }
+    try:
+        import numpy  # noqa: F401
+
+        cases['bcd_to_numpy[1000x4]'] = lambda: DataConverters.bcd_to_numpy(dcnt_batch)
+    except ImportError:
+        pass
+    return {name: measure(func, repeat=repeat) for name, func in cases.items()}
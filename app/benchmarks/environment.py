@@ -0,0 +1,83 @@
+import os
+import sys
+import types
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from app.dummy.emulator import EmulatedCI8, OwenBusEmulator
+
+# Настройки приемника обязательны для app.api.config.Settings
+os.environ.setdefault('RECEIVER_URL', 'http://127.0.0.1:8000/')
+os.environ.setdefault('RECEIVER_TOKEN', 'benchmark')
+
+
+def build_devices(
+    sensors_count: int, offline_fraction: float = 0.0
+) -> list['EmulatedCI8']:
+    """
+    Создает счетчики для эмулятора шины.
+    Первые offline_fraction * sensors_count счетчиков не отвечают на запросы.
+    """
+    from app.dummy.emulator import EmulatedCI8
+
+    offline_count = round(sensors_count * offline_fraction)
+    return [
+        EmulatedCI8(
+            addr=addr,
+            addr_len=8 if sensors_count < 256 else 11,
+            pcs_per_min=60 + addr % 120,
+            online=addr >= offline_count,
+        )
+        for addr in range(sensors_count)
+    ]
+
+
+def install_settings(
+    sensors_count: int,
+    offline_fraction: float = 0.0,
+    poll_delay: float = 0.5,
+    serial_settings: dict[str, Any] | None = None,
+) -> 'OwenBusEmulator':
+    """
+    Подменяет модуль app.settings конфигурацией с эмулированными счетчиками.
+    Возвращает эмулятор шины, который нужно назначить сенсорам.
+    """
+    from app.dummy.emulator import OwenBusEmulator
+    from app.owen_counter.owen_ci8 import OwenCI8
+
+    devices = build_devices(sensors_count, offline_fraction)
+    sensors_settings: list[dict[str, Any]] = [
+        {
+            'name': f's{index}',
+            'driver': OwenCI8,
+            'addr': index,
+            'addr_len': device.codec.addr_len,
+            'parameter': OwenCI8.DCNT,
+        }
+        for index, device in enumerate(devices)
+    ]
+    install_module(sensors_settings, serial_settings, poll_delay=poll_delay)
+    return OwenBusEmulator(devices)
+
+
+def install_module(
+    sensors_settings: list[dict[str, Any]],
+    serial_settings: dict[str, Any] | None = None,
+    poll_delay: float = 0.5,
+) -> types.ModuleType:
+    """
+    Подменяет модуль app.settings заданной конфигурацией.
+    """
+    module = types.ModuleType('app.settings')
+    module.serial_settings = serial_settings or {}
+    module.sensors_settings = sensors_settings
+    module.POLL_DELAY = poll_delay
+    sys.modules['app.settings'] = module
+    # уже импортированные модули держат ссылку на прежний app.settings
+    for name, imported in list(sys.modules.items()):
+        if name != 'app' and not name.startswith('app.'):
+            continue
+        previous = getattr(imported, 'settings', None)
+        if name == 'app' or isinstance(previous, types.ModuleType):
+            imported.settings = module
+    return module
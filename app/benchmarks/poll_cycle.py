@@ -0,0 +1,64 @@
+import logging
+import statistics
+import time
+from typing import Any
+
+from app.benchmarks.environment import install_settings
+
+
+def run(
+    sensors_count: int = 32,
+    offline_fraction: float = 0.0,
+    cycles: int = 20,
+    realtime: bool = False,
+) -> dict[str, Any]:
+    """
+    Замеряет время полного цикла опроса sensors_count эмулированных сенсоров.
+    :param offline_fraction: доля сенсоров, не отвечающих на запросы,
+    :param realtime: моделировать время передачи по линии и таймауты.
+    """
+    bus = install_settings(sensors_count, offline_fraction)
+    bus.realtime = realtime
+    from app.owen_poller.owen_poller import SensorsPoller
+
+    poller = SensorsPoller()
+    for sensor in poller.sensors.values():
+        sensor.serial = bus
+
+    sensors = list(poller.sensors.values())
+    timings = []
+    for _ in range(cycles):
+        started = time.perf_counter()
+        poller.poll_cycle(sensors)
+        timings.append(time.perf_counter() - started)
+
+    online = sum(sensor.reading.value is not None for sensor in poller.sensors.values())
+    return {
+        'sensors': sensors_count,
+        'offline_fraction': offline_fraction,
+        'realtime': realtime,
+        'cycles': cycles,
+        'online_sensors': online,
+        'cycle_ms_min': min(timings) * 1e3,
+        'cycle_ms_median': statistics.median(timings) * 1e3,
+        'cycle_ms_max': max(timings) * 1e3,
+        'per_sensor_us_median': statistics.median(timings) / sensors_count * 1e6,
+    }
+
+
+def run_matrix(
+    sensors_counts: list[int],
+    offline_fractions: list[float],
+    cycles: int = 20,
+    realtime: bool = False,
+) -> list[dict[str, Any]]:
+    # ошибки опроса молчащих сенсоров не должны попадать в вывод бенчмарка
+    logging.disable(logging.ERROR)
+    try:
+        return [
+            run(count, fraction, cycles=cycles, realtime=realtime)
+            for count in sensors_counts
+            for fraction in offline_fractions
+        ]
+    finally:
+        logging.disable(logging.NOTSET)
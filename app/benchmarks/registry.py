@@ -0,0 +1,156 @@
+import copy
+import logging
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any
+
+from app.benchmarks.environment import install_module
+
+
+def _timed(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1e3
+
+
+def _allocated(func) -> int:
+    """
+    Пиковый прирост памяти при вызове func, байт.
+    """
+    tracemalloc.start()
+    try:
+        func()  # прогрев кэшей и ленивых атрибутов
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - current
+
+
+def _legacy(sensors_count: int, repeat: int) -> dict[str, Any]:
+    """
+    Прежняя модель: объект SensorReading с datetime на каждое показание
+    и copy.copy при каждом расчете скорости.
+    """
+    from app.api.common import SensorReading
+
+    readings = {f's{index}': SensorReading() for index in range(sensors_count)}
+    last_readings = {}
+
+    def apply():
+        now = datetime.now()
+        for name, reading in readings.items():
+            readings[name] = SensorReading(value=reading.value or 1, time=now)
+
+    def rates():
+        for name, reading in readings.items():
+            previous = last_readings.get(name)
+            if previous is not None:
+                (reading.value - previous.value) / max(
+                    (reading.time - previous.time).total_seconds(), 1e-6
+                )
+            last_readings[name] = copy.copy(reading)
+
+    apply()
+    rates()
+    tracemalloc.start()
+    snapshot_readings = {
+        name: SensorReading(value=1, time=datetime.now()) for name in readings
+    }
+    state_bytes = tracemalloc.get_traced_memory()[0] * 2  # показание и копия
+    tracemalloc.stop()
+    del snapshot_readings
+    return {
+        'state_bytes_per_sensor': state_bytes / sensors_count,
+        'apply_ms': _timed(apply, repeat),
+        'apply_allocated_bytes': _allocated(apply),
+        'rates_ms': _timed(rates, repeat),
+        'rates_allocated_bytes': _allocated(rates),
+    }
+
+
+def run(sensors_count: int = 5000, repeat: int = 5) -> dict[str, Any]:
+    """
+    Память и время обработки показаний колоночным реестром сенсоров:
+    запись результатов пакетного опроса и расчет скорости для API.
+    """
+    from app.owen_counter.owen_ci8 import OwenCI8, ReadResult
+
+    # адресное пространство шины - 2048 счетчиков, сенсоры делятся на шины
+    bus_size = 2048
+    module = install_module(
+        [
+            {
+                'name': f's{index}',
+                'driver': OwenCI8,
+                'addr': index % bus_size,
+                'addr_len': 11,
+                'parameter': OwenCI8.DCNT,
+                'bus': f'bus{index // bus_size}',
+            }
+            for index in range(sensors_count)
+        ]
+    )
+    module.buses_settings = {
+        f'bus{number}': {} for number in range(sensors_count // bus_size + 1)
+    }
+    from app.owen_poller.owen_poller import SensorsPoller
+
+    logging.disable(logging.ERROR)
+    try:
+        tracemalloc.start()
+        poller = SensorsPoller()
+        poller_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        registry = poller.registry
+        sensors = list(poller.sensors.values())
+        names = [sensor.name for sensor in sensors]
+        results = [
+            ReadResult(sensor.device, sensor.parameter_hash, value=index)
+            for index, sensor in enumerate(sensors)
+        ]
+
+        def apply():
+            with registry.lock:
+                registry.stamp()
+                for sensor, result in zip(sensors, results, strict=True):
+                    result.value += 1
+                    sensor.apply(result)
+
+        def rates():
+            poller.get_list_readings(names)
+
+        apply()
+        rates()
+        columns = [
+            registry.values,
+            registry.times,
+            registry.wall_times,
+            registry.statuses,
+            registry.errors,
+            registry.consecutive_errors,
+            poller.rates.values,
+            poller.rates.times,
+        ]
+        columns_bytes = sum(column.itemsize * len(column) for column in columns)
+        return {
+            'sensors': sensors_count,
+            'columns_bytes_per_sensor': columns_bytes / sensors_count,
+            'view_bytes_per_sensor': sys.getsizeof(sensors[0]),
+            'poller_bytes_per_sensor': poller_bytes / sensors_count,
+            'apply_ms': _timed(apply, repeat),
+            'apply_allocated_bytes': _allocated(apply),
+            'rates_ms': _timed(rates, repeat),
+            'rates_allocated_bytes': _allocated(rates),
+            'legacy': _legacy(sensors_count, repeat),
+        }
+    finally:
+        logging.disable(logging.NOTSET)
@@ -0,0 +1,87 @@
+import logging
+import statistics
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+from app.benchmarks.environment import install_module
+
+
+def sensors_from_log(path: str | Path) -> list[dict[str, Any]]:
+    """
+    Восстанавливает конфигурацию сенсоров по запросам в журнале обмена.
+    """
+    from app.owen_counter.owen_ci8 import OwenCI8
+    from app.transport.recorder import TX, read_records
+
+    codec = OwenCI8(addr=0)
+    sensors_settings = []
+    seen = set()
+    _, records = read_records(path)
+    for record in records:
+        if record.direction != TX or record.data in seen:
+            continue
+        seen.add(record.data)
+        try:
+            packet = codec.ascii_to_bin(record.data)
+        except Exception:
+            continue
+        addr = int.from_bytes(packet[0:2], 'big') & 0xFFE0
+        # младшие 3 бита 11-битного адреса попадают во второй байт
+        addr_len = 11 if addr & 0xE0 else 8
+        sensors_settings.append(
+            {
+                'name': f'a{addr >> (16 - addr_len)}_{packet[2:4].hex()}',
+                'driver': OwenCI8,
+                'addr': addr >> (16 - addr_len),
+                'addr_len': addr_len,
+                'parameter': bytes(packet[2:4]),
+            }
+        )
+    return sensors_settings
+
+
+def run(
+    path: str | Path, speed: float = 0.0, max_cycles: int = 100_000
+) -> dict[str, Any]:
+    """
+    Прогоняет журнал обмена через OwenCI8.read_parameter и SensorsPoller.
+    :param speed: ускорение воспроизведения (0 - без задержек).
+    """
+    sensors_settings = sensors_from_log(path)
+    install_module(
+        sensors_settings,
+        serial_settings={'replay': str(path), 'replay_speed': speed, 'timeout': 0.2},
+    )
+    from app.owen_poller.owen_poller import SensorsPoller
+
+    poller = SensorsPoller()
+    serial_if = next(iter(poller.sensors.values())).serial
+    outcomes: Counter[str] = Counter()
+    timings = []
+    logging.disable(logging.ERROR)
+    try:
+        while not serial_if.exhausted and len(timings) < max_cycles:
+            started = time.perf_counter()
+            for sensor in poller.sensors.values():
+                try:
+                    sensor.device.read_parameter(sensor.serial, sensor.parameter_hash)
+                    outcomes['ok'] += 1
+                except TimeoutError:
+                    outcomes['timeout'] += 1
+                except Exception as err:
+                    outcomes[type(err).__name__] += 1
+            timings.append(time.perf_counter() - started)
+    finally:
+        logging.disable(logging.NOTSET)
+    return {
+        'log': str(path),
+        'speed': speed,
+        'sensors': len(sensors_settings),
+        'cycles': len(timings),
+        'transactions': sum(outcomes.values()),
+        'outcomes': dict(outcomes),
+        'elapsed_s': sum(timings),
+        'cycle_ms_median': statistics.median(timings) * 1e3 if timings else None,
+    }
@@ -0,0 +1,135 @@
+"""
+Время импорта app.api.main и время до первого ответа API.
+Замер выполняется в отдельном процессе, порт шины заведомо отсутствует:
+запуск не должен зависеть от доступности оборудования.
+
+Дочерний процесс:
+    python -m app.benchmarks.startup import
+    python -m app.benchmarks.startup serve PORT SENSORS
+"""
+
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+from app.benchmarks.api import _free_port
+
+# Бюджет на машине разработчика, мс (Python 3.11, FastAPI 0.98).
+# Импорт почти целиком занимает FastAPI/pydantic (~170 мс из ~280 мс).
+BUDGET_MS = {
+    'import': 500.0,
+    'first_response': 1500.0,
+    'first_sensors_response': 1500.0,
+}
+MISSING_PORT = '/dev/ttyOWEN-missing'
+ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+def _install(sensors_count: int) -> None:
+    from app.benchmarks.environment import install_settings
+
+    install_settings(sensors_count, serial_settings={'port': MISSING_PORT})
+
+
+def _child_import() -> None:
+    _install(0)
+    started = time.perf_counter()
+    import app.api.main  # noqa: F401
+
+    print((time.perf_counter() - started) * 1e3)
+
+
+def _child_serve(port: int, sensors_count: int) -> None:
+    _install(sensors_count)
+    import uvicorn
+
+    uvicorn.run(
+        'app.api.main:application', host='127.0.0.1', port=port, log_level='error'
+    )
+
+
+def _spawn(*args: str, **kwargs) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, '-m', 'app.benchmarks.startup', *args],
+        cwd=ROOT,
+        env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'},
+        **kwargs,
+    )
+
+
+def _wait_response(port: int, path: str, deadline: float) -> None:
+    while time.perf_counter() < deadline:
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+        try:
+            connection.request('GET', path)
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.005)
+        finally:
+            connection.close()
+    raise TimeoutError(f'{path} не ответил')
+
+
+def measure_import() -> float:
+    child = _spawn('import', stdout=subprocess.PIPE, text=True)
+    output, _ = child.communicate(timeout=60)
+    if child.returncode:
+        raise RuntimeError('Импорт app.api.main завершился ошибкой')
+    return float(output.split()[-1])
+
+
+def measure_first_response(sensors_count: int) -> tuple[float, float]:
+    """
+    :return: время от запуска процесса до ответа / и /sensors/, мс.
+    """
+    port = _free_port()
+    started = time.perf_counter()
+    child = _spawn('serve', str(port), str(sensors_count), stderr=subprocess.DEVNULL)
+    try:
+        _wait_response(port, '/', started + 30)
+        first = time.perf_counter()
+        _wait_response(port, '/sensors/?work_centers=s0', started + 30)
+        sensors = time.perf_counter()
+    finally:
+        child.terminate()
+        child.wait(timeout=10)
+    return (first - started) * 1e3, (sensors - started) * 1e3
+
+
+def summary(values: list[float], budget: float) -> dict[str, Any]:
+    return {
+        'ms_min': min(values),
+        'ms_median': statistics.median(values),
+        'ms_max': max(values),
+        'budget_ms': budget,
+        'within_budget': statistics.median(values) <= budget,
+    }
+
+
+def run(repeat: int = 5, sensors_count: int = 128) -> dict[str, Any]:
+    imports = [measure_import() for _ in range(repeat)]
+    responses = [measure_first_response(sensors_count) for _ in range(repeat)]
+    return {
+        'sensors': sensors_count,
+        'missing_port': MISSING_PORT,
+        'import': summary(imports, BUDGET_MS['import']),
+        'first_response': summary(
+            [first for first, _ in responses], BUDGET_MS['first_response']
+        ),
+        'first_sensors_response': summary(
+            [sensors for _, sensors in responses], BUDGET_MS['first_sensors_response']
+        ),
+    }
+
+
+if __name__ == '__main__':
+    if sys.argv[1] == 'import':
+        _child_import()
+    else:
+        _child_serve(int(sys.argv[2]), int(sys.argv[3]))
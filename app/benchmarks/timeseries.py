@@ -0,0 +1,85 @@
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any
+
+from app.owen_poller.registry import NO_VALUE
+from app.owen_poller.timeseries import CompressedHistory, decode_series
+
+
+def build_samples(
+    count: int, interval: float = 0.5, seed: int = 1
+) -> list[tuple[float, int]]:
+    """
+    Отсчеты счетчика: опрос раз в interval секунд с разбросом до 20 мс,
+    скорость 60-180 шт/мин с остановками, пропуски связи.
+    """
+    generator = random.Random(seed)
+    samples = []
+    wall_time = 1.7e9
+    value = generator.randrange(1_000_000)
+    rate = 2.0
+    for step in range(count):
+        wall_time += interval + generator.uniform(-0.02, 0.02)
+        if step % 600 == 0:
+            rate = generator.choice((0.0, 1.0, 2.0, 3.0))
+        value = (value + round(rate * interval * generator.uniform(0.5, 1.5))) % (10**7)
+        offline = generator.random() < 0.002
+        samples.append((wall_time, NO_VALUE if offline else value))
+    return samples
+
+
+def python_bytes(samples: list[tuple[float, int]]) -> int:
+    """
+    Память списка кортежей (float, int), байт.
+    """
+    tracemalloc.start()
+    try:
+        copied = [(float(wall_time), int(value)) for wall_time, value in samples]
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del copied
+    return current
+
+
+def run(samples_count: int = 172800, block_size: int = 512) -> dict[str, Any]:
+    """
+    Сжатие и скорость длительной истории одного сенсора: сутки отсчетов
+    раз в 0.5 с. Сравнение с массивами SampleHistory (array 'd' + 'q',
+    16 байт на отсчет) и списком кортежей Python.
+    """
+    samples = build_samples(samples_count)
+    history = CompressedHistory(
+        capacity=samples_count, interval=0.0, block_size=block_size
+    )
+    history.extend(1)
+    started = time.perf_counter()
+    for wall_time, value in samples:
+        history.record(0, wall_time, value)
+    append_time = time.perf_counter() - started
+    stats = history.stats()
+    starts, blocks = history.snapshot(0)
+    started = time.perf_counter()
+    decoded = sum(1 for _ in decode_series(starts, blocks))
+    decode_time = time.perf_counter() - started
+    # час в середине суток: поиск блока по индексу и декодирование интервала
+    middle = samples[samples_count // 2][0]
+    started = time.perf_counter()
+    hour = sum(1 for _ in decode_series(starts, blocks, middle, middle + 3600))
+    seek_time = time.perf_counter() - started
+    raw_bytes = samples_count * 16
+    return {
+        'python': sys.version.split()[0],
+        'samples': samples_count,
+        'block_size': block_size,
+        'bytes': stats['bytes'],
+        'bytes_per_sample': stats['bytes_per_sample'],
+        'ratio_vs_arrays': raw_bytes / stats['bytes'],
+        'ratio_vs_python': python_bytes(samples) / stats['bytes'],
+        'append_us_per_sample': append_time / samples_count * 1e6,
+        'decode_samples_per_s': decoded / decode_time,
+        'hour_range_samples': hour,
+        'hour_range_ms': seek_time * 1e3,
+    }
@@ -0,0 +1,181 @@
+import time
+
+from app.owen_counter.owen_ci8 import OwenCI8
+
+
+def int_to_bcd(value: int, length: int) -> bytes:
+    """
+    Конвертирует int в DEC_dot0 (BCD) заданной длины.
+    """
+    result = bytearray(length)
+    for i in range(length - 1, -1, -1):
+        value, l_nibble = divmod(value, 10)
+        value, h_nibble = divmod(value, 10)
+        result[i] = (h_nibble << 4) | l_nibble
+    return bytes(result)
+
+
+class EmulatedCI8:
+    """
+    Эмулятор счетчика СИ8, отвечающий на запросы DCNT, DSPD и DTMR.
+    """
+
+    DATA_LEN: int = 4
+    CLK_TAIL: bytes = b'\x40'
+
+    def __init__(
+        self,
+        addr: int,
+        addr_len: int = 8,
+        pcs_per_min: float = 120.0,
+        online: bool = True,
+        baudrate: int | None = None,
+    ):
+        """
+        :param addr: адрес счетчика,
+        :param addr_len: длина адреса,
+        :param pcs_per_min: скорость счета, шт/мин,
+        :param online: отвечает ли счетчик на запросы,
+        :param baudrate: скорость из конфигурации счетчика (параметр bPS),
+        запросы на другой скорости не распознаются; None - любая скорость.
+        """
+        self.codec = OwenCI8(addr=addr, addr_len=addr_len)
+        self.pcs_per_min = pcs_per_min
+        self.online = online
+        self.baudrate = baudrate
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def count(self) -> int:
+        return int(self.elapsed * self.pcs_per_min / 60) % (OwenCI8.MAX_VALUE + 1)
+
+    def get_data(self, parameter_hash: bytes) -> bytes | None:
+        if parameter_hash == OwenCI8.DCNT:
+            return int_to_bcd(self.count, self.DATA_LEN)
+        if parameter_hash == OwenCI8.DSPD:
+            return int_to_bcd(int(self.pcs_per_min / 60), self.DATA_LEN)
+        if parameter_hash == OwenCI8.DTMR:
+            hundredths = int(self.elapsed * 100)
+            seconds, hundredths = divmod(hundredths, 100)
+            minutes, seconds = divmod(seconds, 60)
+            hours, minutes = divmod(minutes, 60)
+            return (
+                int_to_bcd(hours, 3)
+                + int_to_bcd(minutes, 1)
+                + int_to_bcd(seconds, 1)
+                + int_to_bcd(hundredths, 1)
+                + self.CLK_TAIL
+            )
+        return None
+
+    def answers(self, baudrate: int) -> bool:
+        return self.online and (self.baudrate is None or baudrate == self.baudrate)
+
+    def get_response(self, parameter_hash: bytes) -> bytes | None:
+        """
+        Формирует ASCII пакет ответа или None, если счетчик молчит.
+        """
+        if not self.online:
+            return None
+        data = self.get_data(parameter_hash)
+        if data is None:
+            return None
+        packet = bytearray(self.codec.addr) + parameter_hash + data
+        packet[1] |= len(data)
+        packet += self.codec.calc_owen_crc(packet)
+        return bytes(self.codec.bin_to_ascii(packet))
+
+
+class OwenBusEmulator:
+    """
+    Эмулятор шины RS-485 с интерфейсом serial.Serial.
+    В режиме realtime моделирует время передачи по линии и таймауты.
+    """
+
+    def __init__(
+        self,
+        devices: list[EmulatedCI8],
+        baudrate: int = 9600,
+        bytesize: int = 8,
+        parity: str = 'N',
+        stopbits: float = 1,
+        timeout: float = 0.2,
+        turnaround: float = 0.005,
+        realtime: bool = False,
+        **kwargs,
+    ):
+        """
+        :param devices: счетчики на шине,
+        :param turnaround: время реакции счетчика на запрос, с,
+        :param realtime: моделировать задержки линии.
+        """
+        self.devices: dict[bytes, EmulatedCI8] = {
+            device.codec.addr: device for device in devices
+        }
+        self.baudrate = baudrate
+        self.bytesize = bytesize
+        self.parity = parity
+        self.stopbits = stopbits
+        self.timeout = timeout
+        self.turnaround = turnaround
+        self.realtime = realtime
+        self.is_open = True
+        self._output = bytearray()
+        self._codec = OwenCI8(addr=0)
+
+    @property
+    def char_time(self) -> float:
+        """
+        Время передачи одного символа по линии, с.
+        """
+        parity_bits = 0 if self.parity == 'N' else 1
+        return (1 + self.bytesize + parity_bits + self.stopbits) / self.baudrate
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._output)
+
+    def open(self) -> None:
+        self.is_open = True
+
+    def close(self) -> None:
+        self.is_open = False
+
+    def reset_input_buffer(self) -> None:
+        self._output.clear()
+
+    def flush(self) -> None:
+        pass
+
+    def write(self, data: bytes | bytearray) -> int:
+        if self.realtime:
+            time.sleep(len(data) * self.char_time)
+        try:
+            packet = self._codec.ascii_to_bin(bytes(data))
+        except Exception:
+            return len(data)
+        addr = bytearray(packet[0:2])
+        if len(addr) == 2:
+            addr[1] &= 0xE0
+        device = self.devices.get(bytes(addr))
+        # на чужой скорости счетчик не распознает запрос
+        if device is not None and device.answers(self.baudrate):
+            response = device.get_response(bytes(packet[2:4]))
+            if response is not None:
+                self._output += response
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        if not self._output:
+            if self.realtime and self.timeout:
+                time.sleep(self.timeout)
+            return b''
+        chunk = bytes(self._output[:size])
+        del self._output[:size]
+        if self.realtime:
+            time.sleep(self.turnaround + len(chunk) * self.char_time)
+        return chunk
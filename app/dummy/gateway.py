@@ -0,0 +1,79 @@
+import socket
+import socketserver
+import threading
+from contextlib import suppress
+
+from app.dummy.emulator import OwenBusEmulator
+
+
+class _GatewayHandler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        gateway: EmulatedGateway = self.server.gateway
+        gateway.clients.add(self.request)
+        buffer = bytearray()
+        try:
+            while chunk := self.request.recv(1024):
+                buffer += chunk
+                # запрос Owen заканчивается символом \r
+                while (end := buffer.find(b'\r')) >= 0:
+                    frame = bytes(buffer[: end + 1])
+                    del buffer[: end + 1]
+                    with gateway.lock:
+                        gateway.bus.reset_input_buffer()
+                        gateway.bus.write(frame)
+                        response = gateway.bus.read(gateway.bus.in_waiting)
+                    if response:
+                        self.request.sendall(response)
+        except OSError:
+            pass
+        finally:
+            gateway.clients.discard(self.request)
+
+
+class _GatewayServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class EmulatedGateway:
+    """
+    Эмулятор шлюза Ethernet - RS-485 в прозрачном режиме поверх OwenBusEmulator.
+    """
+
+    def __init__(self, bus: OwenBusEmulator, host: str = '127.0.0.1', port: int = 0):
+        self.bus = bus
+        self.host = host
+        self.port = port
+        self.lock = threading.Lock()
+        self.clients: set[socket.socket] = set()
+        self.server: _GatewayServer | None = None
+
+    @property
+    def url(self) -> str:
+        return f'tcp://{self.host}:{self.port}'
+
+    def start(self) -> 'EmulatedGateway':
+        self.server = _GatewayServer((self.host, self.port), _GatewayHandler)
+        self.server.gateway = self
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Останавливает шлюз и обрывает активные соединения.
+        """
+        if self.server is None:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        for client in list(self.clients):
+            with suppress(OSError):
+                client.shutdown(socket.SHUT_RDWR)
+        self.server = None
+
+    def __enter__(self) -> 'EmulatedGateway':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
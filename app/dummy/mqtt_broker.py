@@ -0,0 +1,104 @@
+import socket
+import socketserver
+import threading
+import time
+from contextlib import suppress
+
+
+class _BrokerHandler(socketserver.BaseRequestHandler):
+    def read_packet(self) -> tuple[int, bytes] | None:
+        header = self.request.recv(1)
+        if not header:
+            return None
+        length, shift = 0, 0
+        while True:
+            byte = self.request.recv(1)[0]
+            length |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        body = b''
+        while len(body) < length:
+            if not (chunk := self.request.recv(length - len(body))):
+                return None
+            body += chunk
+        return header[0], body
+
+    def handle(self) -> None:
+        broker: EmulatedBroker = self.server.broker
+        broker.clients.add(self.request)
+        try:
+            while (received := self.read_packet()) is not None:
+                header, body = received
+                kind = header & 0xF0
+                if kind == 0x10:  # CONNECT
+                    with broker.lock:
+                        broker.connects += 1
+                    self.request.sendall(b'\x20\x02\x00\x00')
+                elif kind == 0x30:  # PUBLISH QoS 0
+                    topic_len = int.from_bytes(body[:2], 'big')
+                    topic = body[2 : 2 + topic_len].decode()
+                    time.sleep(broker.delay)
+                    with broker.lock:
+                        broker.messages.append((topic, body[2 + topic_len :]))
+                elif kind == 0xE0:  # DISCONNECT
+                    break
+        except (OSError, IndexError):
+            pass
+        finally:
+            broker.clients.discard(self.request)
+
+
+class _BrokerServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class EmulatedBroker:
+    """
+    Эмулятор брокера MQTT 3.1.1: принимает подключения и публикации QoS 0.
+    Публикации сохраняются в messages, delay - задержка обработки публикации.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, delay: float = 0.0):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.connects = 0
+        self.messages: list[tuple[str, bytes]] = []
+        self.clients: set[socket.socket] = set()
+        self.server: _BrokerServer | None = None
+
+    @property
+    def url(self) -> str:
+        return f'mqtt://{self.host}:{self.port}'
+
+    def start(self) -> 'EmulatedBroker':
+        self.server = _BrokerServer((self.host, self.port), _BrokerHandler)
+        self.server.broker = self
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def drop_clients(self) -> None:
+        """
+        Обрывает активные соединения.
+        """
+        for client in list(self.clients):
+            with suppress(OSError):
+                client.shutdown(socket.SHUT_RDWR)
+
+    def stop(self) -> None:
+        if self.server is None:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        self.drop_clients()
+        self.server = None
+
+    def __enter__(self) -> 'EmulatedBroker':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
@@ -0,0 +1,124 @@
+import json
+import socket
+import threading
+import time
+from contextlib import suppress
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+
+class _PeerHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:  # noqa: N802
+        peer: EmulatedPeer = self.server.peer
+        parts = urlsplit(self.path)
+        if parts.path != '/sensors/':
+            self.send_error(404)
+            return
+        query = parse_qs(parts.query)
+        work_centers = query.get('work_centers', [''])[0].split(',')
+        with peer.lock:
+            peer.requests += 1
+            peer.queries.append(query)
+        time.sleep(peer.delay)
+        body = json.dumps(peer.get_list_readings(work_centers)).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class _PeerServer(ThreadingHTTPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connections: set[socket.socket] = set()
+
+    def process_request_thread(self, request, client_address) -> None:
+        self.connections.add(request)
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self.connections.discard(request)
+
+    def close_connections(self) -> None:
+        # постоянные соединения клиентов обслуживаются до их закрытия
+        for connection in list(self.connections):
+            with suppress(OSError):
+                connection.shutdown(socket.SHUT_RDWR)
+
+
+class EmulatedPeer:
+    """
+    Эмулятор экземпляра API шкафа для проверки режима агрегатора.
+    Отвечает на /sensors/ показаниями своих сенсоров с задержкой delay.
+    """
+
+    def __init__(
+        self,
+        readings: dict[str, float | None],
+        delay: float = 0.0,
+        host: str = '127.0.0.1',
+        port: int = 0,
+    ):
+        """
+        :param readings: скорость счета сенсоров, None - нет связи,
+        :param delay: задержка ответа, с.
+        """
+        self.readings = readings
+        self.delay = delay
+        self.host = host
+        self.port = port
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.queries: list[dict[str, list[str]]] = []
+        self.server: _PeerServer | None = None
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    def get_list_readings(self, work_centers: list[str]) -> list[dict[str, Any]]:
+        result = []
+        for work_center in work_centers:
+            response = {
+                'sensor': work_center,
+                'value': None,
+                'measured_at': None,
+                'status': 'NOT FOUND',
+            }
+            if work_center in self.readings:
+                value = self.readings[work_center]
+                response['value'] = value
+                response['status'] = 'OFFLINE' if value is None else 'OK'
+            result.append(response)
+        return result
+
+    def start(self) -> 'EmulatedPeer':
+        self.server = _PeerServer((self.host, self.port), _PeerHandler)
+        self.server.peer = self
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self.server is None:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        self.server.close_connections()
+        self.server = None
+
+    def __enter__(self) -> 'EmulatedPeer':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
@@ -0,0 +1,84 @@
+import os
+import pty
+import select
+import termios
+import threading
+from contextlib import suppress
+from pathlib import Path
+
+from app.dummy.emulator import OwenBusEmulator
+
+# коды скоростей termios -> бод
+TERMIOS_SPEEDS = {
+    getattr(termios, name): int(name[1:])
+    for name in dir(termios)
+    if name[0] == 'B' and name[1:].isdigit()
+}
+
+
+class EmulatedSerialPort:
+    """
+    Эмулятор USB-RS485 адаптера поверх OwenBusEmulator: псевдотерминал,
+    доступный по ссылке path. stop() имитирует отключение адаптера -
+    ссылка удаляется, открытый порт получает ошибки ввода-вывода.
+    Скорость, установленная клиентом порта, передается эмулятору шины:
+    счетчики отвечают только на своих скоростях, в режиме realtime
+    время передачи зависит от скорости.
+    """
+
+    def __init__(self, bus: OwenBusEmulator, path: str | Path):
+        self.bus = bus
+        self.path = Path(path)
+        self.master: int | None = None
+        self.thread: threading.Thread | None = None
+        self.running = False
+
+    def start(self) -> 'EmulatedSerialPort':
+        self.master, slave = pty.openpty()
+        slave_name = os.ttyname(slave)
+        os.close(slave)
+        os.symlink(slave_name, self.path)
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+        return self
+
+    def serve(self) -> None:
+        buffer = bytearray()
+        while self.running:
+            try:
+                ready, _, _ = select.select([self.master], [], [], 0.02)
+                if not ready:
+                    continue
+                buffer += os.read(self.master, 1024)
+            except OSError:
+                # порт еще не открыт клиентом
+                continue
+            with suppress(termios.error):
+                speed = termios.tcgetattr(self.master)[5]
+                self.bus.baudrate = TERMIOS_SPEEDS.get(speed, self.bus.baudrate)
+            # запрос Owen заканчивается символом \r
+            while (end := buffer.find(b'\r')) >= 0:
+                frame = bytes(buffer[: end + 1])
+                del buffer[: end + 1]
+                self.bus.reset_input_buffer()
+                self.bus.write(frame)
+                # молчащий счетчик: таймаут ожидает клиент порта
+                if self.bus.in_waiting:
+                    os.write(self.master, self.bus.read(self.bus.in_waiting))
+
+    def stop(self) -> None:
+        if self.master is None:
+            return
+        self.running = False
+        self.thread.join()
+        with suppress(FileNotFoundError):
+            self.path.unlink()
+        os.close(self.master)
+        self.master = None
+
+    def __enter__(self) -> 'EmulatedSerialPort':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
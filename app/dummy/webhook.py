@@ -0,0 +1,68 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler
+from typing import Any
+
+from .peer import _PeerServer
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self) -> None:  # noqa: N802
+        webhook: EmulatedWebhook = self.server.webhook
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        with webhook.lock:
+            webhook.requests += 1
+            failed = webhook.failures > 0
+            if failed:
+                webhook.failures -= 1
+            else:
+                webhook.received.extend(json.loads(body))
+        self.send_response(503 if failed else 204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class EmulatedWebhook:
+    """
+    Эмулятор получателя webhook: сохраняет элементы JSON массивов
+    из POST запросов, первые failures запросов отклоняет с кодом 503.
+    """
+
+    def __init__(self, failures: int = 0, host: str = '127.0.0.1', port: int = 0):
+        self.failures = failures
+        self.host = host
+        self.port = port
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.received: list[dict[str, Any]] = []
+        self.server: _PeerServer | None = None
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}/alarms'
+
+    def start(self) -> 'EmulatedWebhook':
+        self.server = _PeerServer((self.host, self.port), _WebhookHandler)
+        self.server.webhook = self
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self.server is None:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        self.server.close_connections()
+        self.server = None
+
+    def __enter__(self) -> 'EmulatedWebhook':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+import requests
+from requests import RequestException
+from requests.adapters import HTTPAdapter
+
+from app.owen_poller.error_log import ErrorAggregator
+
+logger = logging.getLogger(__name__)
+peer_errors = ErrorAggregator(logger)
+
+# при объединении по имени сенсора выбирается ответ с лучшим статусом
+STATUS_PRIORITY = {'OK': 0, 'OFFLINE': 1, 'NOT FOUND': 2}
+
+
+@dataclass
+class PeerState:
+    url: str
+    requests: int = 0
+    failures: int = 0
+    latency: float | None = None
+    last_success: float | None = None  # time.time() последнего ответа
+    last_error: str | None = None
+
+    def report(self, now: float) -> dict[str, Any]:
+        return {
+            'url': self.url,
+            'requests': self.requests,
+            'failures': self.failures,
+            'latency_ms': None if self.latency is None else self.latency * 1e3,
+            'last_success': self.last_success,
+            'staleness': None if self.last_success is None else now - self.last_success,
+            'last_error': self.last_error,
+        }
+
+
+class PeerAggregator:
+    """
+    Режим агрегатора: запрос /sensors/ рассылается экземплярам API
+    других шкафов одновременно, ответы объединяются по имени сенсора.
+    Экземпляры запрашиваются с local=true и отвечают только показаниями
+    собственного опроса.
+    Время ответа ограничено самым медленным экземпляром (не более timeout).
+    Соединения с экземплярами постоянные (пул requests.Session),
+    запросы выполняются в потоках, event loop не блокируется.
+    Одинаковые одновременные запросы к экземпляру объединяются,
+    ответ кэшируется на cache_ttl секунд. Если экземпляр недоступен,
+    используется его последний ответ не старше stale_ttl секунд.
+    """
+
+    def __init__(
+        self,
+        peers: Iterable[str],
+        timeout: float = 2.0,
+        cache_ttl: float = 1.0,
+        stale_ttl: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param peers: адреса экземпляров API (http://host:port),
+        :param timeout: таймаут запроса к экземпляру, с,
+        :param cache_ttl: время жизни ответа экземпляра в кэше, с,
+        :param stale_ttl: максимальный возраст ответа недоступного экземпляра, с,
+        :param clock: источник времени.
+        """
+        self.peers = {url.rstrip('/'): PeerState(url.rstrip('/')) for url in peers}
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        pool_size = max(len(self.peers), 1)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=4)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(
+            max_workers=pool_size * 4, thread_name_prefix='peer'
+        )
+        self.cache: dict[tuple[str, tuple[str, ...]], tuple[float, list]] = {}
+        self.inflight: dict[tuple[str, tuple[str, ...]], asyncio.Future] = {}
+
+    def fetch(self, peer: str, work_centers: tuple[str, ...]) -> list[dict[str, Any]]:
+        # local: экземпляр не опрашивает свои экземпляры (без циклов A - B - A)
+        # и считает скорость для агрегатора отдельно от своих клиентов
+        response = self.session.get(
+            f'{peer}/sensors/',
+            params={'work_centers': ','.join(work_centers), 'local': 'true'},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def cached(
+        self, key: tuple[str, tuple[str, ...]], max_age: float
+    ) -> list[dict[str, Any]] | None:
+        cached = self.cache.get(key)
+        if cached is not None and self.clock() - cached[0] < max_age:
+            return cached[1]
+        return None
+
+    async def query_peer(
+        self, peer: str, work_centers: tuple[str, ...]
+    ) -> list[dict[str, Any]]:
+        key = (peer, work_centers)
+        if (items := self.cached(key, self.cache_ttl)) is not None:
+            return items
+        future = self.inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self.request_peer(peer, work_centers))
+            self.inflight[key] = future
+            future.add_done_callback(lambda _: self.inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def request_peer(
+        self, peer: str, work_centers: tuple[str, ...]
+    ) -> list[dict[str, Any]]:
+        state = self.peers[peer]
+        state.requests += 1
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            items = await loop.run_in_executor(
+                self.executor, self.fetch, peer, work_centers
+            )
+        except (RequestException, ValueError) as err:
+            state.failures += 1
+            state.last_error = str(err)
+            peer_errors.failure(
+                peer, type(err).__name__, 'Экземпляр %s недоступен: %s', peer, err
+            )
+            return self.cached((peer, work_centers), self.stale_ttl) or []
+        state.latency = time.perf_counter() - started
+        state.last_success = time.time()
+        state.last_error = None
+        peer_errors.success(peer)
+        self.store((peer, work_centers), items)
+        return items
+
+    def store(self, key: tuple[str, tuple[str, ...]], items: list) -> None:
+        now = self.clock()
+        if len(self.cache) > 256:
+            self.cache = {
+                cached_key: cached
+                for cached_key, cached in self.cache.items()
+                if now - cached[0] < self.stale_ttl
+            }
+        self.cache[key] = (now, items)
+
+    async def get_list_readings(
+        self, work_centers: list[str], local: list[dict[str, Any]] | None = None
+    ) -> list[dict[str, Any]]:
+        """
+        Показания сенсоров со всех экземпляров.
+        :param work_centers: список slug рабочих центров,
+        :param local: показания собственного опроса.
+        :return: показания в порядке work_centers, с адресом источника в 'peer'.
+        """
+        names = tuple(work_centers)
+        peers = list(self.peers)
+        responses = await asyncio.gather(
+            *(self.query_peer(peer, names) for peer in peers)
+        )
+        sources = [(None, local or [])] + list(zip(peers, responses, strict=True))
+        return merge(work_centers, sources)
+
+    def report(self) -> list[dict[str, Any]]:
+        now = time.time()
+        return [state.report(now) for state in self.peers.values()]
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+
+def merge(
+    work_centers: list[str], sources: list[tuple[str | None, list[dict[str, Any]]]]
+) -> list[dict[str, Any]]:
+    """
+    Объединяет показания источников по имени сенсора.
+    Для каждого сенсора выбирается ответ с лучшим статусом (OK, OFFLINE,
+    NOT FOUND), при равенстве - первый источник.
+    """
+    best: dict[str, tuple[int, dict[str, Any]]] = {}
+    for peer, items in sources:
+        for item in items:
+            name = item.get('sensor')
+            priority = STATUS_PRIORITY.get(item.get('status'), len(STATUS_PRIORITY))
+            if name not in best or priority < best[name][0]:
+                best[name] = (priority, {**item, 'peer': peer})
+    return [best[name][1] for name in work_centers if name in best]
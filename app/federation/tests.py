@@ -0,0 +1,102 @@
+import asyncio
+import time
+import unittest
+
+from app.dummy.peer import EmulatedPeer
+
+from .aggregator import PeerAggregator, merge
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestMerge(unittest.TestCase):
+    def test_best_status_wins(self):
+        """Тестируем выбор ответа с лучшим статусом и порядок work_centers."""
+        local = [
+            {'sensor': 'a', 'value': None, 'status': 'NOT FOUND'},
+            {'sensor': 'b', 'value': 5, 'status': 'OK'},
+        ]
+        remote = [
+            {'sensor': 'a', 'value': 7, 'status': 'OK'},
+            {'sensor': 'b', 'value': 9, 'status': 'OK'},
+        ]
+        result = merge(['b', 'a', 'c'], [(None, local), ('http://peer', remote)])
+        self.assertEqual(
+            [(None, 'b', 5), ('http://peer', 'a', 7)],
+            [(item['peer'], item['sensor'], item['value']) for item in result],
+        )
+
+
+class TestPeerAggregator(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.first = EmulatedPeer({'a': 100.0, 'b': None}, delay=0.2).start()
+        self.second = EmulatedPeer({'b': 50.0}, delay=0.2).start()
+        self.addCleanup(self.first.stop)
+        self.addCleanup(self.second.stop)
+        self.aggregator = PeerAggregator(
+            [self.first.url, self.second.url], timeout=1, clock=self.clock
+        )
+        self.addCleanup(self.aggregator.close)
+
+    def query(self, *work_centers: str, repeat: int = 1) -> list:
+        async def run():
+            return await asyncio.gather(
+                *(
+                    self.aggregator.get_list_readings(list(work_centers))
+                    for _ in range(repeat)
+                )
+            )
+
+        return asyncio.run(run())
+
+    def test_peers_queried_concurrently(self):
+        """Тестируем одновременный опрос экземпляров и объединение ответов."""
+        started = time.perf_counter()
+        result = self.query('a', 'b', 'c')[0]
+        self.assertLess(time.perf_counter() - started, 0.35)
+        self.assertEqual(
+            [
+                (self.first.url, 'a', 100.0),
+                (self.second.url, 'b', 50.0),
+                (self.first.url, 'c', None),
+            ],
+            [(item['peer'], item['sensor'], item['value']) for item in result],
+        )
+        # экземпляры отвечают только собственными показаниями
+        self.assertEqual(['true'], self.first.queries[0]['local'])
+        report = {state['url']: state for state in self.aggregator.report()}
+        self.assertGreaterEqual(report[self.first.url]['latency_ms'], 200)
+        self.assertLess(report[self.first.url]['staleness'], 1)
+
+    def test_responses_cached_and_coalesced(self):
+        """Тестируем один запрос к экземпляру на одновременные и повторные."""
+        self.query('a', repeat=5)
+        self.clock.now = 0.9
+        self.query('a')
+        self.assertEqual((1, 1), (self.first.requests, self.second.requests))
+        self.clock.now = 1.0
+        self.query('a')
+        self.assertEqual(2, self.first.requests)
+
+    def test_stale_response_used_when_peer_down(self):
+        """Тестируем последний ответ недоступного экземпляра до stale_ttl."""
+        self.query('a')
+        self.first.stop()
+        self.clock.now = 30
+        self.assertEqual(100.0, self.query('a')[0][0]['value'])
+        self.clock.now = 61
+        self.assertEqual('NOT FOUND', self.query('a')[0][0]['status'])
+        report = {state['url']: state for state in self.aggregator.report()}
+        self.assertEqual(2, report[self.first.url]['failures'])
+        self.assertIsNotNone(report[self.first.url]['last_error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
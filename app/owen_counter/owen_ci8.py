@@ -1,10 +1,14 @@
 import logging
+import time
+from array import array
+from collections.abc import Iterable, Sequence
+from contextlib import AbstractContextManager, nullcontext
+from dataclasses import dataclass
 from datetime import timedelta
 from typing import Any
 
 from serial import Serial
 
-from app.api.config import configure_logging
 from app.owen_counter.exeptions import (
     BCDValueError,
     ImproperlyConfiguredError,
@@ -14,33 +18,57 @@ from app.owen_counter.exeptions import (
     PacketLenError,
     TimeValueError,
 )
+from app.owen_counter.parameters import (
+    CompiledRequest,
+    OwenParameter,
+    ParameterRegistry,
+)
 
-configure_logging()
 logger = logging.getLogger(__name__)
 
 
+def transaction(serial_if: Any) -> AbstractContextManager:
+    """
+    Контекст одной транзакции порта. Порт, разделяемый несколькими
+    пользователями (TcpSerial), не допускает в нем чужой обмен.
+    """
+    begin = getattr(serial_if, 'transaction', None)
+    return nullcontext() if begin is None else begin()
+
+
 class DataConverters:
     __CLK_DATA_LEN = 7
     __CLK_HOURS_BYTES = slice(0, 3)
     __CLK_MINUTES_BYTES = slice(3, 4)
     __CLK_SECONDS_BYTES = slice(4, 5)
     __CLK_HUNDREDTHS_SECOND_BYTES = slice(5, 6)
+    # значение байта BCD (0 - 99), -1 для байта с недопустимой тетрадой
+    __BCD_TABLE: tuple[int, ...] = tuple(
+        (byte >> 4) * 10 + (byte & 0x0F) if byte >> 4 <= 9 and byte & 0x0F <= 9 else -1
+        for byte in range(256)
+    )
 
     @staticmethod
     def bcd_to_int(data: bytes | bytearray) -> int:
         """
         Конвертирует DEC_dot0 (BCD) в int.
         """
+        table = DataConverters.__BCD_TABLE
+        # быстрый путь для 4 байтов данных DCNT и DSPD
+        if len(data) == 4:
+            d0, d1, d2, d3 = data
+            b0, b1, b2, b3 = table[d0], table[d1], table[d2], table[d3]
+            if b0 < 0 or b1 < 0 or b2 < 0 or b3 < 0:
+                raise BCDValueError(data=data)
+            return ((b0 * 100 + b1) * 100 + b2) * 100 + b3
         if len(data) == 0:
             raise BCDValueError(data=data)
         result = 0
-        for i, byte in enumerate(reversed(data)):
-            l_nibble = byte & 0x0F
-            h_nibble = byte >> 4
-            if l_nibble > 9 or h_nibble > 9:
+        for byte in data:
+            value = table[byte]
+            if value < 0:
                 raise BCDValueError(data=data)
-            result += l_nibble * 10 ** (i * 2)
-            result += h_nibble * 10 ** (i * 2 + 1)
+            result = result * 100 + value
         return result
 
     @classmethod
@@ -50,28 +78,127 @@ class DataConverters:
         """
         if len(data) != cls.__CLK_DATA_LEN:
             raise TimeValueError(data=data)
-        hours = cls.bcd_to_int(data[cls.__CLK_HOURS_BYTES])
-        minutes = cls.bcd_to_int(data[cls.__CLK_MINUTES_BYTES])
-        seconds = cls.bcd_to_int(data[cls.__CLK_SECONDS_BYTES])
-        milliseconds = cls.bcd_to_int(data[cls.__CLK_HUNDREDTHS_SECOND_BYTES]) * 10
+        table = cls.__BCD_TABLE
+        d0, d1, d2, d3, d4, d5, _ = data
+        h0, h1, h2 = table[d0], table[d1], table[d2]
+        minutes, seconds, hundredths = table[d3], table[d4], table[d5]
+        if min(h0, h1, h2, minutes, seconds, hundredths) < 0:
+            # поле с недопустимой тетрадой - исключение BCDValueError этого поля
+            for field in (
+                cls.__CLK_HOURS_BYTES,
+                cls.__CLK_MINUTES_BYTES,
+                cls.__CLK_SECONDS_BYTES,
+                cls.__CLK_HUNDREDTHS_SECOND_BYTES,
+            ):
+                cls.bcd_to_int(data[field])
         return timedelta(
-            hours=hours, minutes=minutes, seconds=seconds, milliseconds=milliseconds
+            hours=(h0 * 100 + h1) * 100 + h2,
+            minutes=minutes,
+            seconds=seconds,
+            milliseconds=hundredths * 10,
         )
 
+    @classmethod
+    def bcd_to_int_batch(
+        cls,
+        payloads: Iterable[bytes | bytearray],
+        default: int | None = None,
+        typecode: str = 'q',
+    ) -> array:
+        """
+        Конвертирует набор блоков данных DEC_dot0 (BCD) в array.
+        :param payloads: блоки данных,
+        :param default: значение для недопустимых блоков,
+          если не задано - поднимается BCDValueError,
+        :param typecode: тип элементов array.
+        """
+        table = cls.__BCD_TABLE
+        result = array(typecode)
+        append = result.append
+        for data in payloads:
+            value = 0
+            for byte in data:
+                digit = table[byte]
+                if digit < 0:
+                    value = -1
+                    break
+                value = value * 100 + digit
+            if value < 0 or not data:
+                if default is None:
+                    raise BCDValueError(data=data)
+                value = default
+            append(value)
+        return result
+
+    @classmethod
+    def bcd_to_numpy(
+        cls, payloads: Sequence[bytes | bytearray], default: int | None = None
+    ):
+        """
+        Векторно конвертирует блоки данных DEC_dot0 (BCD) одинаковой длины
+        в numpy.ndarray int64. Требует установленный numpy.
+        :param payloads: блоки данных,
+        :param default: значение для недопустимых блоков,
+          если не задано - поднимается BCDValueError.
+        """
+        import numpy as np
+
+        if not payloads:
+            return np.zeros(0, dtype=np.int64)
+        length = len(payloads[0])
+        if length == 0 or any(len(data) != length for data in payloads):
+            return np.asarray(cls.bcd_to_int_batch(payloads, default), dtype=np.int64)
+        table = np.asarray(cls.__BCD_TABLE, dtype=np.int64)
+        digits = table[
+            np.frombuffer(b''.join(payloads), dtype=np.uint8).reshape(-1, length)
+        ]
+        invalid = (digits < 0).any(axis=1)
+        if default is None and invalid.any():
+            raise BCDValueError(data=payloads[int(invalid.argmax())])
+        weights = 100 ** np.arange(length - 1, -1, -1, dtype=np.int64)
+        values = digits @ weights
+        values[invalid] = default if default is not None else 0
+        return values
+
+
+@dataclass(slots=True)
+class ReadResult:
+    """
+    Результат чтения параметра в пакетной транзакции.
+    """
+
+    OK = 'OK'
+    TIMEOUT = 'TIMEOUT'
+    ERROR = 'ERROR'
+
+    device: Any
+    parameter_hash: bytes
+    value: Any = None
+    status: str = OK
+    error: Exception | None = None
+    # time.monotonic() середины обмена: между отправкой запроса и приемом ответа
+    timestamp: float = 0.0
+    duration: float = 0.0  # от отправки запроса до приема ответа, с
+
+    def set_error(self, err: Exception) -> None:
+        self.status = self.TIMEOUT if isinstance(err, TimeoutError) else self.ERROR
+        self.error = err
+
 
 class OwenCI8:
     # Параметры СИ8
     MAX_VALUE: int = 9_999_999
-    
-    DCNT: bytes = b'\xc1\x73'  # hash параметра DCNT
-    DSPD: bytes = b'\x8f\xc2'  # hash параметра DSPD
-    DTMR: bytes = b'\xe6\x9c'  # hash параметра DTMR
 
-    PARAMS: dict[bytes, dict[str, Any]] = {
-        DCNT: {'response_len': 22, 'converter': DataConverters.bcd_to_int},
-        DSPD: {'response_len': 22, 'converter': DataConverters.bcd_to_int},
-        DTMR: {'response_len': 28, 'converter': DataConverters.clk_to_timedelta},
-    }
+    PARAMS = ParameterRegistry(
+        (
+            OwenParameter('DCNT', 4, DataConverters.bcd_to_int),
+            OwenParameter('DSPD', 4, DataConverters.bcd_to_int),
+            OwenParameter('DTMR', 7, DataConverters.clk_to_timedelta),
+        )
+    )
+    DCNT: bytes = PARAMS.hash_of('DCNT')  # b'\xc1\x73'
+    DSPD: bytes = PARAMS.hash_of('DSPD')  # b'\x8f\xc2'
+    DTMR: bytes = PARAMS.hash_of('DTMR')  # b'\xe6\x9c'
 
     # Параметры протокола Owen
     __OWEN_ASCII_LOWEST_CODE: int = 0x47  # ASCII код для тетрады 0x0
@@ -131,6 +258,8 @@ class OwenCI8:
             )
         addr <<= 16 - addr_len
         self.addr = addr.to_bytes(2, 'big')
+        # подготовленные запросы параметров
+        self.__requests: dict[bytes, CompiledRequest] = {}
 
     @staticmethod
     def calc_owen_crc(data: bytes) -> bytes:
@@ -265,25 +394,173 @@ class OwenCI8:
         except IndexError:
             raise PacketLenError(packet=data) from None
 
-    def read_parameter(self, serial_if: Serial, parameter_hash: bytes):
+    def get_request(self, parameter_hash: bytes) -> CompiledRequest:
         """
-        Считывает параметр счетчика импульсов.
-        :param serial_if: Порт.
+        Возвращает подготовленный запрос параметра.
+        Запрос формируется при первом обращении и далее берется из кеша.
         :param parameter_hash: Hash параметра счетчика.
-        :return: Значение параметра.
+        :return: Пакет запроса, длина ответа и декодер.
+        """
+        request = self.__requests.get(parameter_hash)
+        if request is None:
+            parameter = self.PARAMS.get(parameter_hash)
+            if parameter is None:
+                raise ValueError(self.__HASH_ERR_MSG.format(actual=parameter_hash))
+            frame = bytes(self.bin_to_ascii(self.get_command_packet(parameter_hash)))
+            request = CompiledRequest.compile(parameter, frame)
+            self.__requests[parameter_hash] = request
+        return request
+
+    def get_request_frame(self, parameter_hash: bytes) -> bytes:
+        """
+        Возвращает ASCII пакет запроса параметра.
+        :param parameter_hash: Hash параметра счетчика.
+        :return: ASCII пакет.
+        """
+        return self.get_request(parameter_hash).frame
+
+    def extract_data(self, ascii_response: bytes, parameter_hash: bytes) -> bytearray:
+        """
+        Проверяет ASCII пакет ответа и возвращает блок данных.
+        :param ascii_response: Принятый пакет.
+        :param parameter_hash: Hash параметра счетчика.
+        :return: Блок данных.
         """
-        if parameter_hash not in (self.DCNT, self.DSPD, self.DTMR):
-            raise ValueError(self.__HASH_ERR_MSG.format(actual=parameter_hash))
-        serial_if.reset_input_buffer()
-        serial_if.write(self.bin_to_ascii(self.get_command_packet(parameter_hash)))
-        serial_if.flush()
-        response_expected_len = self.PARAMS[parameter_hash]['response_len']
-        ascii_response = serial_if.read(response_expected_len)
         if not ascii_response:
             raise TimeoutError
 
         data = self.check_bin_packet(self.ascii_to_bin(ascii_response), parameter_hash)
         if len(data) == 0:
             raise PacketLenError(packet=ascii_response)
+        return data
+
+    def decode_response(self, ascii_response: bytes, parameter_hash: bytes):
+        """
+        Проверяет ASCII пакет ответа и преобразует блок данных в значение.
+        :param ascii_response: Принятый пакет.
+        :param parameter_hash: Hash параметра счетчика.
+        :return: Значение параметра.
+        """
+        request = self.get_request(parameter_hash)
+        return request.decode(self.extract_data(ascii_response, parameter_hash))
+
+    def read_parameter(self, serial_if: Serial, parameter_hash: bytes):
+        """
+        Считывает параметр счетчика импульсов.
+        :param serial_if: Порт.
+        :param parameter_hash: Hash параметра счетчика.
+        :return: Значение параметра.
+        """
+        request = self.get_request(parameter_hash)
+        with transaction(serial_if):
+            serial_if.reset_input_buffer()
+            serial_if.write(request.frame)
+            serial_if.flush()
+            ascii_response = serial_if.read(request.response_len)
+        return request.decode(self.extract_data(ascii_response, parameter_hash))
+
+    @classmethod
+    def read_many(
+        cls, serial_if: Serial, requests: list[tuple[Any, bytes]]
+    ) -> list[ReadResult]:
+        """
+        Считывает параметры нескольких счетчиков одной шины.
+        Пакеты запросов готовятся заранее, транзакции выполняются подряд
+        без промежуточной обработки, ответы декодируются после обмена.
+        Устройства других типов опрашиваются через их read_parameter.
+        При ошибке порта оставшиеся транзакции не выполняются.
+        :param serial_if: Порт.
+        :param requests: Список пар (устройство, hash параметра).
+        :return: Результаты в порядке запросов.
+        """
+        results = [
+            ReadResult(device, parameter_hash) for device, parameter_hash in requests
+        ]
+        transactions = cls.__prepare_transactions(results)
+        responses = cls.__exchange(serial_if, transactions)
+        cls.__decode_responses(responses)
+        return results
+
+    @classmethod
+    def __prepare_transactions(
+        cls, results: list[ReadResult]
+    ) -> list[tuple[ReadResult, CompiledRequest | None]]:
+        transactions = []
+        for result in results:
+            if not isinstance(result.device, cls):
+                transactions.append((result, None))
+                continue
+            try:
+                request = result.device.get_request(result.parameter_hash)
+            except ValueError as err:
+                result.set_error(err)
+                continue
+            transactions.append((result, request))
+        return transactions
 
-        return self.PARAMS[parameter_hash]['converter'](data=data)
+    @classmethod
+    def __decode_responses(
+        cls, responses: list[tuple[ReadResult, CompiledRequest, bytes]]
+    ) -> None:
+        """
+        Декодирует ответы, блоки данных BCD конвертируются одним вызовом.
+        """
+        bcd_results = []
+        bcd_blocks = []
+        for result, request, ascii_response in responses:
+            try:
+                data = request.validate(
+                    result.device.extract_data(ascii_response, result.parameter_hash)
+                )
+                if request.converter is DataConverters.bcd_to_int:
+                    bcd_results.append(result)
+                    bcd_blocks.append(data)
+                else:
+                    result.value = request.converter(data=data)
+            except Exception as err:
+                result.set_error(err)
+        values = DataConverters.bcd_to_int_batch(bcd_blocks, default=-1)
+        for result, data, value in zip(bcd_results, bcd_blocks, values, strict=True):
+            if value < 0:
+                result.set_error(BCDValueError(data=data))
+            else:
+                result.value = value
+
+    @staticmethod
+    def __exchange(
+        serial_if: Serial,
+        transactions: list[tuple[ReadResult, CompiledRequest | None]],
+    ) -> list[tuple[ReadResult, CompiledRequest, bytes]]:
+        responses = []
+        port_error = None
+        for result, request in transactions:
+            if port_error is not None:
+                result.set_error(port_error)
+                continue
+            try:
+                if request is None:
+                    started = time.monotonic()
+                    result.value = result.device.read_parameter(
+                        serial_if, result.parameter_hash
+                    )
+                    result.duration = time.monotonic() - started
+                    result.timestamp = started + result.duration / 2
+                    continue
+                with transaction(serial_if):
+                    serial_if.reset_input_buffer()
+                    serial_if.write(request.frame)
+                    serial_if.flush()
+                    # счетчик отвечает значением на момент между запросом и ответом
+                    sent = time.monotonic()
+                    ascii_response = serial_if.read(request.response_len)
+                result.duration = time.monotonic() - sent
+                result.timestamp = sent + result.duration / 2
+                responses.append((result, request, ascii_response))
+            except TimeoutError as err:
+                result.set_error(err)
+            except OSError as err:
+                port_error = err
+                result.set_error(err)
+            except Exception as err:
+                result.set_error(err)
+        return responses
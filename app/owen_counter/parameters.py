@@ -0,0 +1,139 @@
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from functools import cache
+from typing import Any
+
+from app.owen_counter.exeptions import PacketLenError
+
+# Символы имен параметров Owen в порядке их кодов (код символа - индекс * 2)
+OWEN_NAME_CHARS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ-_/ '
+OWEN_NAME_LEN = 4  # длина имени в символах без точек
+OWEN_NAME_PAD = 78  # код дополнения коротких имен (пробел)
+OWEN_FRAME_OVERHEAD = 6  # адрес, hash и CRC двоичного пакета, байт
+# ASCII пакет запроса без данных: маркеры начала и конца, 2 символа на байт
+OWEN_REQUEST_LEN = OWEN_FRAME_OVERHEAD * 2 + 2
+
+_NAME_ERR_MSG = 'Недопустимое имя параметра Owen: {name!r}.'
+
+
+@cache
+def owen_hash(name: str) -> bytes:
+    """
+    Возвращает hash имени параметра Owen (2 байта).
+    Символ кодируется индексом в OWEN_NAME_CHARS * 2, точка увеличивает
+    код предыдущего символа на 1, имя дополняется до 4 символов.
+    CRC с полиномом 0x8F57 считается по 7 старшим битам каждого кода.
+    """
+    codes = []
+    for char in name.upper():
+        if char == '.' and codes and codes[-1] % 2 == 0:
+            codes[-1] += 1
+            continue
+        index = OWEN_NAME_CHARS.find(char)
+        if index < 0:
+            raise ValueError(_NAME_ERR_MSG.format(name=name))
+        codes.append(index * 2)
+    if not codes or len(codes) > OWEN_NAME_LEN:
+        raise ValueError(_NAME_ERR_MSG.format(name=name))
+    codes += [OWEN_NAME_PAD] * (OWEN_NAME_LEN - len(codes))
+    crc = 0
+    for code in codes:
+        byte = (code << 1) & 0xFF
+        for _j in range(7):
+            if (byte ^ (crc >> 8)) & 0x80:
+                crc = (crc << 1) ^ 0x8F57
+            else:
+                crc <<= 1
+            crc &= 0xFFFF
+            byte = (byte << 1) & 0xFF
+    return crc.to_bytes(2, 'big')
+
+
+@dataclass(slots=True, frozen=True)
+class OwenParameter:
+    """
+    Описание параметра Owen: имя, hash, длина блока данных и декодер.
+    """
+
+    name: str
+    data_len: int
+    converter: Callable[..., Any]
+    hash: bytes = field(init=False)
+    response_len: int = field(init=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'hash', owen_hash(self.name))
+        # ASCII пакет: маркеры начала и конца, 2 символа на байт
+        object.__setattr__(
+            self, 'response_len', (OWEN_FRAME_OVERHEAD + self.data_len) * 2 + 2
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class CompiledRequest:
+    """
+    Подготовленный запрос параметра конкретного устройства: ASCII пакет
+    запроса, ожидаемая длина ответа, проверка и декодирование блока данных.
+    """
+
+    parameter: OwenParameter
+    frame: bytes
+    response_len: int
+    data_len: int
+    converter: Callable[..., Any]
+
+    @classmethod
+    def compile(cls, parameter: OwenParameter, frame: bytes) -> 'CompiledRequest':
+        return cls(
+            parameter=parameter,
+            frame=frame,
+            response_len=parameter.response_len,
+            data_len=parameter.data_len,
+            converter=parameter.converter,
+        )
+
+    def validate(self, data: bytes | bytearray) -> bytes | bytearray:
+        if len(data) != self.data_len:
+            raise PacketLenError(packet=data)
+        return data
+
+    def decode(self, data: bytes | bytearray) -> Any:
+        return self.converter(data=self.validate(data))
+
+
+class ParameterRegistry:
+    """
+    Параметры, поддерживаемые типом устройства, по hash и по имени.
+    """
+
+    def __init__(self, parameters: Iterable[OwenParameter] = ()):
+        self.__by_hash: dict[bytes, OwenParameter] = {}
+        self.__by_name: dict[str, OwenParameter] = {}
+        for parameter in parameters:
+            self.register(parameter)
+
+    def register(self, parameter: OwenParameter) -> OwenParameter:
+        self.__by_hash[parameter.hash] = parameter
+        self.__by_name[parameter.name] = parameter
+        return parameter
+
+    def __contains__(self, parameter_hash: object) -> bool:
+        return parameter_hash in self.__by_hash
+
+    def __getitem__(self, parameter_hash: bytes) -> OwenParameter:
+        return self.__by_hash[parameter_hash]
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self.__by_hash)
+
+    def __len__(self) -> int:
+        return len(self.__by_hash)
+
+    def get(self, parameter_hash: bytes) -> OwenParameter | None:
+        return self.__by_hash.get(parameter_hash)
+
+    def by_name(self, name: str) -> OwenParameter:
+        return self.__by_name[name]
+
+    def hash_of(self, name: str) -> bytes:
+        return self.__by_name[name].hash
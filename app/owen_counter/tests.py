@@ -1,14 +1,21 @@
+import random
+import time
 import unittest
 from collections import namedtuple
 from datetime import timedelta
 
+from app.dummy.emulator import EmulatedCI8, OwenBusEmulator
+
 from .exeptions import (
     BCDValueError,
     ImproperlyConfiguredError,
     PacketDecodeError,
     PacketHeaderError,
+    PacketLenError,
+    TimeValueError,
 )
-from .owen_ci8 import DataConverters, OwenCI8
+from .owen_ci8 import DataConverters, OwenCI8, ReadResult
+from .parameters import OwenParameter, ParameterRegistry, owen_hash
 
 
 class TestOwenCounter(unittest.TestCase):
@@ -370,6 +377,201 @@ class TestDataConverters(unittest.TestCase):
                 call = DataConverters.clk_to_timedelta(data=fixture.data)
                 self.assertEqual(fixture.expected_value, call)
 
+    def test_clk_to_timedelta_rise_exception_on_invalid_data(self):
+        """Поднятие исключений при недопустимых значениях CLK_frm."""
+        Fixture = namedtuple('Fixture', ['data', 'exception', 'field'])
+        fixtures = [
+            Fixture(data=b'\x00' * 6, exception=TimeValueError, field=b'\x00' * 6),
+            Fixture(
+                data=b'\x00\x0a\x00\x00\x00\x00\x40',
+                exception=BCDValueError,
+                field=b'\x00\x0a\x00',
+            ),
+            Fixture(
+                data=b'\x00\x00\x00\x00\xf0\x00\x40',
+                exception=BCDValueError,
+                field=b'\xf0',
+            ),
+            Fixture(
+                data=b'\x00\x00\x00\x00\x00\x0b\x40',
+                exception=BCDValueError,
+                field=b'\x0b',
+            ),
+        ]
+        for fixture in fixtures:
+            with self.subTest(data=fixture.data):
+                with self.assertRaises(fixture.exception) as context:
+                    DataConverters.clk_to_timedelta(data=fixture.data)
+                self.assertIn(str(fixture.field), context.exception.args[-1])
+
+    def test_bcd_to_int_matches_nibble_decoding(self):
+        """Тестируем табличное преобразование BCD на всех байтах и длинах 1 - 7."""
+
+        def reference(data):
+            result = 0
+            for byte in data:
+                if byte >> 4 > 9 or byte & 0x0F > 9:
+                    return None
+                result = result * 100 + (byte >> 4) * 10 + (byte & 0x0F)
+            return result
+
+        rnd = random.Random(0)
+        fixtures = [bytes([byte]) for byte in range(256)] + [
+            bytes(rnd.choice(range(0x9A)) for _ in range(length))
+            for length in range(2, 8)
+            for _ in range(200)
+        ]
+        for data in fixtures:
+            expected = reference(data)
+            if expected is None:
+                with self.assertRaises(BCDValueError):
+                    DataConverters.bcd_to_int(data=data)
+            else:
+                self.assertEqual(expected, DataConverters.bcd_to_int(data=data))
+
+    def test_bcd_to_int_batch(self):
+        """Тестируем пакетное преобразование BCD."""
+        payloads = [b'\x00\x00\x12\x34', b'\x99', bytearray(b'\x01\x00\x00\x00')]
+        self.assertEqual(
+            [1234, 99, 1000000], list(DataConverters.bcd_to_int_batch(payloads))
+        )
+        invalid = [b'\x00\x01', b'\x0a', b'']
+        self.assertEqual(
+            [1, -1, -1], list(DataConverters.bcd_to_int_batch(invalid, default=-1))
+        )
+        with self.assertRaises(BCDValueError):
+            DataConverters.bcd_to_int_batch(invalid)
+
+    def test_bcd_to_numpy(self):
+        """Тестируем векторное преобразование BCD."""
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            self.skipTest('numpy не установлен')
+        payloads = [b'\x00\x00\x12\x34', b'\x00\x0a\x00\x00', b'\x09\x99\x99\x99']
+        self.assertEqual(
+            [1234, 0, 9999999],
+            DataConverters.bcd_to_numpy(payloads, default=0).tolist(),
+        )
+        with self.assertRaises(BCDValueError):
+            DataConverters.bcd_to_numpy(payloads)
+
+
+class TestOwenParameters(unittest.TestCase):
+    def test_owen_hash(self):
+        """Тестируем вычисление hash по имени параметра."""
+        fixtures = {
+            'DCNT': b'\xc1\x73',
+            'DSPD': b'\x8f\xc2',
+            'DTMR': b'\xe6\x9c',
+        }
+        for name, expected in fixtures.items():
+            with self.subTest(name=name):
+                self.assertEqual(expected, owen_hash(name))
+        self.assertNotEqual(owen_hash('r.Cn'), owen_hash('rCn'))
+        self.assertEqual(owen_hash('r.Cn'), owen_hash('R.CN'))
+        for name in ('', 'ABCDE', 'A*B'):
+            with self.subTest(name=name), self.assertRaises(ValueError):
+                owen_hash(name)
+
+    def test_parameter_descriptors(self):
+        """Тестируем длину ответа и поиск параметров по hash и имени."""
+        self.assertEqual(
+            {'DCNT': 22, 'DSPD': 22, 'DTMR': 28},
+            {
+                OwenCI8.PARAMS[h].name: OwenCI8.PARAMS[h].response_len
+                for h in OwenCI8.PARAMS
+            },
+        )
+        registry = ParameterRegistry()
+        parameter = registry.register(
+            OwenParameter('DSPD', 4, DataConverters.bcd_to_int)
+        )
+        self.assertIs(parameter, registry[OwenCI8.DSPD])
+        self.assertEqual(OwenCI8.DSPD, registry.hash_of('DSPD'))
+        self.assertNotIn(OwenCI8.DCNT, registry)
+
+    def test_compiled_request(self):
+        """Тестируем подготовленный запрос и проверку длины блока данных."""
+        device = OwenCI8(addr=1)
+        request = device.get_request(OwenCI8.DCNT)
+        self.assertIs(request, device.get_request(OwenCI8.DCNT))
+        self.assertEqual(
+            bytes(device.bin_to_ascii(device.get_command_packet(OwenCI8.DCNT))),
+            request.frame,
+        )
+        self.assertEqual(1234, request.decode(b'\x00\x00\x12\x34'))
+        with self.assertRaises(PacketLenError):
+            request.decode(b'\x12\x34')
+        with self.assertRaises(ValueError):
+            device.get_request(b'\x00\x00')
+
+
+class BrokenPort(OwenBusEmulator):
+    def write(self, data):
+        raise OSError('Порт закрыт')
+
+
+class TestReadMany(unittest.TestCase):
+    def setUp(self):
+        self.devices = [
+            EmulatedCI8(addr=1, pcs_per_min=0),
+            EmulatedCI8(addr=2, online=False),
+            EmulatedCI8(addr=3, pcs_per_min=0),
+        ]
+
+    def test_read_many_statuses(self):
+        """Тестируем результаты пакетного чтения с разными статусами."""
+        bus = OwenBusEmulator(self.devices)
+        results = OwenCI8.read_many(
+            bus,
+            [
+                (OwenCI8(addr=1), OwenCI8.DCNT),
+                (OwenCI8(addr=2), OwenCI8.DCNT),
+                (OwenCI8(addr=3), b'\x00\x00'),
+                (OwenCI8(addr=3), OwenCI8.DTMR),
+            ],
+        )
+        self.assertEqual(
+            [ReadResult.OK, ReadResult.TIMEOUT, ReadResult.ERROR, ReadResult.OK],
+            [result.status for result in results],
+        )
+        self.assertEqual(0, results[0].value)
+        self.assertIsInstance(results[2].error, ValueError)
+        self.assertIsInstance(results[3].value, timedelta)
+
+    def test_read_many_matches_read_parameter(self):
+        """Тестируем совпадение пакетного и одиночного чтения."""
+        bus = OwenBusEmulator(self.devices)
+        devices = [OwenCI8(addr=1), OwenCI8(addr=3)]
+        results = OwenCI8.read_many(bus, [(device, OwenCI8.DCNT) for device in devices])
+        self.assertEqual(
+            [device.read_parameter(bus, OwenCI8.DCNT) for device in devices],
+            [result.value for result in results],
+        )
+
+    def test_read_many_timestamps(self):
+        """Тестируем время обмена в результатах пакетного чтения."""
+        bus = OwenBusEmulator(self.devices)
+        started = time.monotonic()
+        results = OwenCI8.read_many(
+            bus, [(OwenCI8(addr=1), OwenCI8.DCNT), (OwenCI8(addr=3), OwenCI8.DCNT)]
+        )
+        finished = time.monotonic()
+        timestamps = [result.timestamp for result in results]
+        self.assertEqual(sorted(timestamps), timestamps)
+        self.assertLessEqual(started, timestamps[0])
+        self.assertLessEqual(timestamps[-1], finished)
+
+    def test_read_many_stops_on_port_error(self):
+        """Тестируем прекращение обмена при ошибке порта."""
+        results = OwenCI8.read_many(
+            BrokenPort(self.devices),
+            [(OwenCI8(addr=1), OwenCI8.DCNT), (OwenCI8(addr=3), OwenCI8.DCNT)],
+        )
+        self.assertEqual([ReadResult.ERROR] * 2, [result.status for result in results])
+        self.assertIs(results[0].error, results[1].error)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,208 @@
+"""
+Определение скорости счетчиков шин RS-485.
+
+СИ8 принимает запросы только на скорости из собственной конфигурации
+(сетевой параметр bPS), поэтому смена скорости порта без перенастройки
+счетчиков не ускоряет обмен. Опрос на скоростях СИ8 находит скорость,
+на которой отвечает каждый счетчик, расхождение с настройками порта
+и расчетный рост пропускной способности при перенастройке счетчиков
+и порта на большую скорость (перенастройка выполняется конфигуратором).
+Запуск из корня репозитория по настройкам app.settings:
+    python -m app.owen_poller.baudrate
+    python -m app.owen_poller.baudrate --bus default --rates 9600 38400 115200
+"""
+
+import argparse
+import json
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.owen_counter.owen_ci8 import OwenCI8, ReadResult
+from app.transport.tcp import parse_tcp_url
+
+from .capacity import CapacityPlanner
+
+# скорости обмена СИ8, бод
+BAUDRATES = (2400, 4800, 9600, 14400, 19200, 28800, 38400, 57600, 115200)
+
+
+def can_probe(serial_settings: dict[str, Any]) -> bool:
+    """
+    Скорость определяется только для локальных портов: скорость шлюза
+    tcp:// задается в его настройках, журнал воспроизводится как записан.
+    """
+    return bool(
+        serial_settings
+        and not serial_settings.get('replay')
+        and not parse_tcp_url(str(serial_settings.get('port', '')))
+    )
+
+
+def transaction_gain(current: int, target: int, turnaround: float = 0.02) -> float:
+    """
+    Расчетный рост пропускной способности шины при переходе
+    со скорости current на target.
+    """
+    planner = CapacityPlanner()
+    return planner.transaction_time(
+        {'baudrate': current}, OwenCI8.DCNT, turnaround
+    ) / planner.transaction_time({'baudrate': target}, OwenCI8.DCNT, turnaround)
+
+
+@dataclass(slots=True)
+class BaudProbe:
+    """
+    Результат опроса счетчиков шины на разных скоростях.
+    """
+
+    current: int  # скорость порта из настроек, бод
+    devices: list[str]
+    answered: dict[int, list[str]] = field(default_factory=dict)
+    throughput: dict[int, float] = field(default_factory=dict)  # транзакций/с
+
+    @property
+    def rates(self) -> dict[str, int | None]:
+        """
+        Скорость, на которой ответил каждый счетчик, None - не ответил.
+        """
+        rates: dict[str, int | None] = dict.fromkeys(self.devices)
+        for baudrate in sorted(self.answered):
+            for name in self.answered[baudrate]:
+                rates[name] = baudrate
+        return rates
+
+    @property
+    def common(self) -> list[int]:
+        """
+        Скорости, на которых ответили все счетчики шины.
+        """
+        return sorted(
+            baudrate
+            for baudrate, answered in self.answered.items()
+            if len(answered) == len(self.devices)
+        )
+
+    @property
+    def detected(self) -> int | None:
+        """
+        Скорость счетчиков шины, None - счетчики настроены на разные скорости
+        или не отвечают.
+        """
+        common = self.common
+        return common[-1] if common and self.devices else None
+
+    @property
+    def mismatch(self) -> bool:
+        """
+        Счетчики отвечают на скорости, отличной от скорости порта.
+        """
+        return self.detected is not None and self.detected != self.current
+
+    def gain(self, target: int = BAUDRATES[-1], turnaround: float = 0.02) -> float:
+        """
+        Расчетный рост пропускной способности шины, если счетчики и порт
+        перенастроить на скорость target.
+        """
+        return transaction_gain(self.detected or self.current, target, turnaround)
+
+    def report(self, turnaround: float = 0.02) -> dict[str, Any]:
+        target = BAUDRATES[-1]
+        return {
+            'current': self.current,
+            'detected': self.detected,
+            'mismatch': self.mismatch,
+            'rates': self.rates,
+            'target': target,
+            'gain': self.gain(target, turnaround),
+            'answered': self.answered,
+            'throughput': self.throughput,
+        }
+
+
+def probe_baudrates(
+    port: Any,
+    sensors: list[Any],
+    baudrates: Iterable[int] = BAUDRATES,
+    exhaustive: bool = True,
+) -> BaudProbe:
+    """
+    Опрашивает счетчики шины на скоростях baudrates (от большей к меньшей),
+    скорость порта после опроса восстанавливается. Настройки счетчиков
+    не меняются.
+    :param port: открытый порт шины,
+    :param sensors: сенсоры шины (атрибуты name, device, parameter_hash),
+    :param exhaustive: опросить все счетчики на всех скоростях; иначе скорость
+    отбрасывается по первому неответившему счетчику, опрос заканчивается
+    на первой скорости, где ответили все.
+    """
+    current = port.baudrate
+    probe = BaudProbe(current=current, devices=[sensor.name for sensor in sensors])
+    try:
+        for baudrate in sorted(baudrates, reverse=True):
+            port.baudrate = baudrate
+            answered = probe.answered[baudrate] = []
+            elapsed = 0.0
+            for sensor in sensors:
+                started = time.perf_counter()
+                (result,) = OwenCI8.read_many(
+                    port, [(sensor.device, sensor.parameter_hash)]
+                )
+                if result.status == ReadResult.OK:
+                    elapsed += time.perf_counter() - started
+                    answered.append(sensor.name)
+                elif not exhaustive:
+                    break
+            if answered and elapsed > 0:
+                probe.throughput[baudrate] = len(answered) / elapsed
+            if not exhaustive and len(answered) == len(sensors):
+                break
+    finally:
+        port.baudrate = current
+    return probe
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m app.owen_poller.baudrate')
+    parser.add_argument('--bus', nargs='+', help='шины, по умолчанию - все')
+    parser.add_argument('--rates', type=int, nargs='+', default=list(BAUDRATES))
+    parser.add_argument('--turnaround', type=float, default=0.02)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> dict[str, Any]:
+    from types import SimpleNamespace
+
+    from app import settings
+    from app.transport.ports import open_serial
+
+    from .owen_poller import DEFAULT_BUS, SensorsPoller
+
+    args = parse_args(argv)
+    report = {}
+    for bus, serial_settings in SensorsPoller.get_buses_settings(settings).items():
+        if (args.bus and bus not in args.bus) or not can_probe(serial_settings):
+            continue
+        sensors = [
+            SimpleNamespace(
+                name=item['name'],
+                device=OwenCI8(addr=item['addr'], addr_len=item['addr_len']),
+                parameter_hash=item['parameter'],
+            )
+            for item in settings.sensors_settings
+            if item.get('bus', DEFAULT_BUS) == bus
+            and issubclass(item['driver'], OwenCI8)
+        ]
+        port = open_serial(serial_settings, record=False)
+        try:
+            probe = probe_baudrates(port, sensors, args.rates)
+        finally:
+            port.close()
+        report[bus] = probe.report(args.turnaround)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return report
+
+
+if __name__ == '__main__':
+    main()
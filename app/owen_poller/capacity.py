@@ -0,0 +1,254 @@
+import logging
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.owen_counter.owen_ci8 import OwenCI8, ReadResult
+from app.owen_counter.parameters import OWEN_REQUEST_LEN
+
+logger = logging.getLogger(__name__)
+
+# длина ответа параметра, отсутствующего в OwenCI8.PARAMS (другие драйверы)
+MAX_RESPONSE_LEN = max(
+    OwenCI8.PARAMS[parameter_hash].response_len for parameter_hash in OwenCI8.PARAMS
+)
+
+
+def char_time(serial_settings: dict[str, Any]) -> float:
+    """
+    Время передачи символа по шине, с: старт-бит, биты данных,
+    бит четности и стоп-биты. Для шлюзов tcp:// - скорость RS-485 шлюза
+    из baudrate (по умолчанию 9600).
+    """
+    bits = (
+        1
+        + serial_settings.get('bytesize', 8)
+        + (serial_settings.get('parity', 'N') != 'N')
+        + serial_settings.get('stopbits', 1)
+    )
+    return bits / serial_settings.get('baudrate', 9600)
+
+
+def port_timeout(serial_settings: dict[str, Any]) -> float:
+    # timeout=None - ожидание без ограничения, для модели - значение по умолчанию
+    return serial_settings.get('timeout') or 0.2
+
+
+def response_len(parameter_hash: bytes | None) -> int:
+    parameter = OwenCI8.PARAMS.get(parameter_hash)
+    return MAX_RESPONSE_LEN if parameter is None else parameter.response_len
+
+
+@dataclass(slots=True)
+class BusPlan:
+    """
+    Расчет загрузки шины: время транзакций, предельная частота транзакций,
+    запрошенные и назначенные периоды опроса сенсоров.
+    """
+
+    char_time: float  # время передачи символа, с
+    turnaround: float  # задержка ответа устройства, с
+    timeout: float  # таймаут ответа порта, с
+    max_rate: float  # предельная частота успешных транзакций, 1/с
+    utilization: float  # загрузка шины при запрошенных периодах, 1 - 100%
+    requested: dict[str, float] = field(default_factory=dict)
+    intervals: dict[str, float] = field(default_factory=dict)  # назначенные
+    timed_out: list[str] = field(default_factory=list)
+
+    @property
+    def demand_rate(self) -> float:
+        """
+        Запрошенная частота транзакций, 1/с.
+        """
+        return sum(1 / interval for interval in self.requested.values())
+
+    @property
+    def oversubscribed(self) -> bool:
+        return any(
+            self.intervals[name] > requested
+            for name, requested in self.requested.items()
+        )
+
+    def report(self) -> dict[str, Any]:
+        return {
+            'char_time': self.char_time,
+            'turnaround': self.turnaround,
+            'timeout': self.timeout,
+            'max_rate': self.max_rate,
+            'demand_rate': self.demand_rate,
+            'utilization': self.utilization,
+            'oversubscribed': self.oversubscribed,
+            'timed_out': self.timed_out,
+            'sensors': {
+                name: {'requested': requested, 'assigned': self.intervals[name]}
+                for name, requested in self.requested.items()
+            },
+        }
+
+
+class CapacityPlanner:
+    """
+    Модель пропускной способности шин RS-485.
+    Транзакция занимает шину на время передачи запроса и ответа
+    (длины ASCII пакетов из OwenCI8.PARAMS) и задержку ответа устройства,
+    измеряемую по результатам опроса; неотвечающее устройство занимает шину
+    до таймаута порта. Если запрошенные периоды опроса сенсоров
+    не помещаются в max_load загрузки шины, периоды увеличиваются
+    пропорционально, переподписка шины сообщается в журнал.
+    """
+
+    def __init__(
+        self,
+        turnaround: float = 0.02,
+        max_load: float = 0.9,
+        smoothing: float = 0.2,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param turnaround: задержка ответа устройства до первых измерений, с,
+        :param max_load: допустимая загрузка шины, 1 - 100%,
+        :param smoothing: вес нового измерения задержки ответа,
+        :param clock: источник времени.
+        """
+        self.turnaround = turnaround
+        self.max_load = max_load
+        self.smoothing = smoothing
+        self.clock = clock
+        self.turnarounds: dict[str, float] = {}
+        self.plans: dict[str, BusPlan] = {}
+        self.polled: dict[str, float] = {}
+
+    def remove(self, bus: str) -> None:
+        self.turnarounds.pop(bus, None)
+        self.plans.pop(bus, None)
+
+    def forget(self, name: str) -> None:
+        self.polled.pop(name, None)
+
+    def transaction_time(
+        self,
+        serial_settings: dict[str, Any],
+        parameter_hash: bytes | None,
+        turnaround: float,
+        timed_out: bool = False,
+    ) -> float:
+        """
+        Время занятия шины транзакцией чтения параметра, с.
+        """
+        symbol = char_time(serial_settings)
+        if timed_out:
+            return OWEN_REQUEST_LEN * symbol + port_timeout(serial_settings)
+        return (OWEN_REQUEST_LEN + response_len(parameter_hash)) * symbol + turnaround
+
+    def observe(
+        self,
+        bus: str,
+        serial_settings: dict[str, Any],
+        results: Iterable[ReadResult],
+    ) -> None:
+        """
+        Уточняет задержку ответа устройств шины по длительности обменов.
+        """
+        symbol = char_time(serial_settings)
+        turnaround = self.turnarounds.get(bus, self.turnaround)
+        for result in results:
+            parameter = OwenCI8.PARAMS.get(result.parameter_hash)
+            if result.status != ReadResult.OK or parameter is None:
+                continue
+            measured = max(result.duration - parameter.response_len * symbol, 0.0)
+            turnaround += (measured - turnaround) * self.smoothing
+        self.turnarounds[bus] = turnaround
+
+    def plan(
+        self,
+        bus: str,
+        serial_settings: dict[str, Any],
+        sensors: Iterable[Any],
+        interval: float,
+    ) -> BusPlan:
+        """
+        Рассчитывает загрузку шины и назначает периоды опроса сенсоров.
+        :param sensors: сенсоры шины (атрибуты name, parameter_hash, status
+        и interval - запрошенный период опроса, None - interval),
+        :param interval: период опроса по умолчанию, с.
+        """
+        turnaround = self.turnarounds.get(bus, self.turnaround)
+        requested = {}
+        costs = {}
+        timed_out = []
+        for sensor in sensors:
+            timeout = sensor.status == ReadResult.TIMEOUT
+            if timeout:
+                timed_out.append(sensor.name)
+            cost = costs[sensor.name] = self.transaction_time(
+                serial_settings, sensor.parameter_hash, turnaround, timeout
+            )
+            # чаще, чем длится транзакция, сенсор не опросить
+            requested[sensor.name] = max(sensor.interval or interval, cost)
+        utilization = sum(costs[name] / requested[name] for name in requested)
+        scale = max(utilization / self.max_load, 1.0)
+        previous = self.plans.get(bus)
+        plan = self.plans[bus] = BusPlan(
+            char_time=char_time(serial_settings),
+            turnaround=turnaround,
+            timeout=port_timeout(serial_settings),
+            max_rate=1
+            / self.transaction_time(serial_settings, OwenCI8.DCNT, turnaround),
+            utilization=utilization,
+            requested=requested,
+            intervals={name: value * scale for name, value in requested.items()},
+            timed_out=timed_out,
+        )
+        was_oversubscribed = previous is not None and previous.oversubscribed
+        if plan.oversubscribed and not was_oversubscribed:
+            logger.warning(
+                'Шина %s переподписана: загрузка %.0f%% (допустимо %.0f%%), '
+                'периоды опроса увеличены в %.2f раза, не отвечают: %s',
+                bus,
+                utilization * 100,
+                self.max_load * 100,
+                scale,
+                timed_out,
+            )
+        elif was_oversubscribed and not plan.oversubscribed:
+            logger.info('Шина %s: запрошенные периоды опроса выполнимы', bus)
+        return plan
+
+    def select(self, bus: str, sensors: list[Any]) -> list[Any]:
+        """
+        Выбирает сенсоры шины, период опроса которых истек.
+        """
+        plan = self.plans.get(bus)
+        if plan is None:
+            return sensors
+        now = self.clock()
+        selected = []
+        for sensor in sensors:
+            last_polled = self.polled.get(sensor.name)
+            interval = plan.intervals.get(sensor.name, 0.0)
+            if last_polled is None or now - last_polled >= interval:
+                self.polled[sensor.name] = now
+                selected.append(sensor)
+        return selected
+
+    def next_due(self, bus: str, sensors: list[Any], default: float) -> float:
+        """
+        Время до истечения ближайшего периода опроса сенсоров шины, с.
+        """
+        plan = self.plans.get(bus)
+        if plan is None or not sensors:
+            return default
+        now = self.clock()
+        return max(
+            min(
+                self.polled.get(sensor.name, now)
+                + plan.intervals.get(sensor.name, 0.0)
+                - now
+                for sensor in sensors
+            ),
+            0.0,
+        )
+
+    def report(self) -> dict[str, dict[str, Any]]:
+        return {bus: plan.report() for bus, plan in self.plans.items()}
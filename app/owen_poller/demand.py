@@ -0,0 +1,66 @@
+import time
+from collections.abc import Callable, Iterable
+from typing import Any
+
+
+class DemandTracker:
+    """
+    Учитывает интерес потребителей (запросы API, подписки, отправитель)
+    к сенсорам и выбирает сенсоры для очередного цикла опроса.
+    Сенсоры, которые запрашивались за последние window секунд, опрашиваются
+    в каждом цикле, остальные - не чаще раза в keepalive_interval секунд.
+    """
+
+    def __init__(
+        self,
+        window: float = 300.0,
+        keepalive_interval: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param window: время, в течение которого сенсор считается востребованным, с,
+        :param keepalive_interval: период опроса невостребованных сенсоров, с,
+        :param clock: источник времени.
+        """
+        self.window = window
+        self.keepalive_interval = keepalive_interval
+        self.clock = clock
+        self.interest: dict[str, float] = {}
+        self.polled: dict[str, float] = {}
+
+    def is_hot(self, name: str, now: float | None = None) -> bool:
+        if now is None:
+            now = self.clock()
+        last_interest = self.interest.get(name)
+        return last_interest is not None and now - last_interest <= self.window
+
+    def touch(self, names: Iterable[str]) -> list[str]:
+        """
+        Отмечает интерес к сенсорам.
+        :return: сенсоры, которые до этого не были востребованы.
+        """
+        now = self.clock()
+        woken = []
+        for name in names:
+            if not self.is_hot(name, now):
+                woken.append(name)
+            self.interest[name] = now
+        return woken
+
+    def select(self, sensors: list[Any]) -> list[Any]:
+        """
+        Выбирает сенсоры для очередного цикла опроса.
+        :param sensors: сенсоры шины (объекты с атрибутом name).
+        """
+        now = self.clock()
+        selected = []
+        for sensor in sensors:
+            last_polled = self.polled.get(sensor.name)
+            if (
+                last_polled is None
+                or now - last_polled >= self.keepalive_interval
+                or self.is_hot(sensor.name, now)
+            ):
+                self.polled[sensor.name] = now
+                selected.append(sensor)
+        return selected
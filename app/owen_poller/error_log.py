@@ -0,0 +1,118 @@
+import logging
+import time
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class ErrorState:
+    first_at: float
+    summary_at: float
+    total: int = 0
+    counts: Counter = field(default_factory=Counter)
+
+
+class ErrorAggregator:
+    """
+    Агрегирует повторяющиеся ошибки одного источника (сенсора, рабочего центра).
+    Первая ошибка пишется в лог сразу, последующие - периодической сводкой
+    вида "s10: 240 x timeout за последние 120 с", после восстановления источника
+    пишется сообщение о восстановлении.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        summary_interval: float = 120.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param logger: логгер для сообщений,
+        :param summary_interval: период сводки повторяющихся ошибок, с,
+        :param clock: источник времени.
+        """
+        self.logger = logger
+        self.summary_interval = summary_interval
+        self.clock = clock
+        self.states: dict[str, ErrorState] = {}
+
+    def failure(self, key: str, kind: str, msg: str, *args) -> None:
+        """
+        Регистрирует ошибку источника key.
+        :param kind: вид ошибки для сводки,
+        :param msg: сообщение первой ошибки, форматируется логгером с args.
+        """
+        now = self.clock()
+        state = self.states.get(key)
+        if state is None:
+            self.states[key] = ErrorState(first_at=now, summary_at=now, total=1)
+            self.logger.error(msg, *args)
+            return
+        state.total += 1
+        state.counts[kind] += 1
+        if now - state.summary_at >= self.summary_interval:
+            self.logger.error(
+                '%s: %s за последние %.0f с',
+                key,
+                ', '.join(f'{count} x {kind}' for kind, count in state.counts.items()),
+                now - state.summary_at,
+            )
+            state.counts.clear()
+            state.summary_at = now
+
+    def success(self, key: str) -> None:
+        """
+        Регистрирует успешную операцию источника key.
+        """
+        if not self.states:
+            return
+        state = self.states.pop(key, None)
+        if state is not None:
+            self.logger.info(
+                '%s: восстановлен после %d ошибок за %.0f с',
+                key,
+                state.total,
+                self.clock() - state.first_at,
+            )
+
+    def is_failing(self, key: str) -> bool:
+        return key in self.states
+
+
+class RateLimitedLog:
+    """
+    Сообщение об ошибке не чаще раза в interval секунд, число подавленных
+    сообщений пишется со следующим. В отличие от ErrorAggregator не хранит
+    состояние по источникам: подходит для ключей из запросов клиентов
+    (имена сенсоров), число которых не ограничено.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        interval: float = 120.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param logger: логгер для сообщений,
+        :param interval: минимальный интервал между сообщениями, с,
+        :param clock: источник времени.
+        """
+        self.logger = logger
+        self.interval = interval
+        self.clock = clock
+        self.logged_at: float | None = None
+        self.suppressed = 0
+
+    def error(self, msg: str, *args) -> None:
+        now = self.clock()
+        if self.logged_at is not None and now - self.logged_at < self.interval:
+            self.suppressed += 1
+            return
+        if self.suppressed:
+            msg += ' (еще %d сообщений за %.0f с подавлено)'
+            args = (*args, self.suppressed, now - self.logged_at)
+        self.logger.error(msg, *args)
+        self.logged_at = now
+        self.suppressed = 0
@@ -1,3 +1,13 @@
 class DeviceNotFound(Exception):
     def __init__(self, device_name):
         super().__init__(f'Устройство "{device_name}" не найдено')
+
+
+class GroupNotFound(Exception):
+    def __init__(self, group_name):
+        super().__init__(f'Группа "{group_name}" не найдена')
+
+
+class BusUnavailable(Exception):
+    def __init__(self, bus):
+        super().__init__(f'Порт шины "{bus}" недоступен')
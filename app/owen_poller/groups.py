@@ -0,0 +1,159 @@
+from array import array
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, Any
+
+from app.owen_counter.exeptions import ImproperlyConfiguredError
+from app.owen_counter.owen_ci8 import OwenCI8
+
+from .registry import NO_VALUE, OK, STATUS_NAMES
+
+if TYPE_CHECKING:
+    from .registry import SensorRegistry
+
+
+def resolve_groups(
+    groups_settings: dict[str, Iterable[str]], sensor_names: Iterable[str]
+) -> dict[str, list[str]]:
+    """
+    Раскрывает группы сенсоров: участником группы может быть сенсор
+    или другая группа (линия - цех - завод).
+    :return: сенсоры групп без повторов в порядке настроек.
+    """
+    sensor_names = set(sensor_names)
+    resolved: dict[str, list[str]] = {}
+
+    def expand(name: str, path: tuple[str, ...]) -> list[str]:
+        if name in resolved:
+            return resolved[name]
+        if name in path:
+            raise ImproperlyConfiguredError(
+                f'Группа {name} входит сама в себя: {" -> ".join(path + (name,))}.'
+            )
+        members = {}
+        for member in groups_settings[name]:
+            if member in groups_settings:
+                members.update(dict.fromkeys(expand(member, path + (name,))))
+            elif member in sensor_names:
+                members[member] = None
+            else:
+                raise ImproperlyConfiguredError(
+                    f'Сенсор {member} группы {name} не найден в sensors_settings.'
+                )
+        resolved[name] = list(members)
+        return resolved[name]
+
+    for name in groups_settings:
+        expand(name, ())
+    return {name: resolved[name] for name in groups_settings}
+
+
+class GroupAggregates:
+    """
+    Суммарные показатели групп сенсоров: скорость счета (шт/мин), сумма
+    показаний счетчиков и число сенсоров на связи. Обновляются при записи
+    результата опроса участника на разность его вклада, поэтому ответ
+    по группе не зависит от ее размера.
+    Скорость участника - наклон по последним показаниям RecentSamples
+    реестра, участник без связи вклада в скорость не вносит,
+    в сумме показаний остается его последнее значение.
+    Обновление и чтение выполняются под SensorRegistry.lock.
+    """
+
+    def __init__(self, registry: 'SensorRegistry', groups: dict[str, list[str]]):
+        """
+        :param registry: реестр сенсоров,
+        :param groups: сенсоры групп (resolve_groups).
+        """
+        self.registry = registry
+        self.index = {name: slot for slot, name in enumerate(groups)}
+        self.members: list[list[str]] = list(groups.values())
+        self.rates = array('d', [0.0] * len(groups))
+        self.totals = array('q', [0] * len(groups))
+        self.online = array('L', [0] * len(groups))
+        # группы сенсора и его текущий вклад по индексу SensorRegistry
+        self.memberships: dict[int, list[int]] = {}
+        self.member_rates: dict[int, float] = {}
+        self.member_values: dict[int, int] = {}
+        self.member_online: dict[int, bool] = {}
+        for slot, members in enumerate(self.members):
+            for name in members:
+                index = registry.index[name]
+                self.memberships.setdefault(index, []).append(slot)
+        for index in self.memberships:
+            self.member_rates[index] = 0.0
+            self.member_values[index] = 0
+            self.member_online[index] = False
+            self.update(index)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def member_rate(self, index: int) -> float:
+        recent = self.registry.recent
+        if recent is None:
+            return 0.0
+        rate = recent.rate(index, None, OwenCI8.MAX_VALUE, min_samples=2)
+        return 0.0 if rate is None else rate * 60
+
+    def update(self, index: int) -> None:
+        """
+        Пересчитывает вклад сенсора в группы по его состоянию в реестре.
+        """
+        slots = self.memberships.get(index)
+        if slots is None:
+            return
+        registry = self.registry
+        online = registry.statuses[index] == OK
+        value = registry.values[index]
+        if value == NO_VALUE:
+            value = self.member_values[index]
+        rate = self.member_rate(index) if online else 0.0
+        rate_diff = rate - self.member_rates[index]
+        value_diff = value - self.member_values[index]
+        online_diff = online - self.member_online[index]
+        self.member_rates[index] = rate
+        self.member_values[index] = value
+        self.member_online[index] = online
+        for slot in slots:
+            self.totals[slot] += value_diff
+            self.online[slot] += online_diff
+            # без участников на связи сумма скоростей точно 0,
+            # ошибка округления приращений не накапливается
+            if self.online[slot]:
+                self.rates[slot] += rate_diff
+            else:
+                self.rates[slot] = 0.0
+
+    def summary(self, name: str) -> dict[str, Any]:
+        slot = self.index[name]
+        size = len(self.members[slot])
+        return {
+            'name': name,
+            'rate': self.rates[slot],
+            'total': self.totals[slot],
+            'online': self.online[slot],
+            'offline': size - self.online[slot],
+            'size': size,
+        }
+
+    def breakdown(self, name: str) -> list[dict[str, Any]]:
+        """
+        Вклад участников группы.
+        """
+        registry = self.registry
+        breakdown = []
+        for member in self.members[self.index[name]]:
+            index = registry.index[member]
+            value = registry.values[index]
+            breakdown.append(
+                {
+                    'sensor': member,
+                    'value': None if value == NO_VALUE else value,
+                    'rate': self.member_rates[index],
+                    'status': STATUS_NAMES[registry.statuses[index]],
+                }
+            )
+        return breakdown
@@ -0,0 +1,77 @@
+from array import array
+
+from .registry import NO_VALUE
+
+
+class SampleHistory:
+    """
+    История показаний сенсоров: кольцевой буфер из capacity отсчетов
+    на каждый индекс SensorRegistry. Отсчеты всех сенсоров лежат в общих
+    массивах (строка сенсора - capacity элементов), что позволяет
+    обрабатывать историю всех сенсоров векторно без копирования.
+    Отсчет пишется не чаще раза в interval секунд, неудачный опрос
+    записывается как NO_VALUE.
+    """
+
+    def __init__(self, capacity: int = 720, interval: float = 5.0):
+        """
+        :param capacity: количество хранимых отсчетов сенсора,
+        :param interval: минимальный интервал между отсчетами, с.
+        """
+        self.capacity = capacity
+        self.interval = interval
+        self.values = array('q')
+        self.times = array('d')  # time.time() отсчета, 0 - отсчета нет
+        self.heads = array('L')  # позиция следующей записи
+        self.counts = array('L')
+
+    @property
+    def size(self) -> int:
+        return len(self.heads)
+
+    def extend(self, size: int) -> None:
+        missing = size - self.size
+        if missing <= 0:
+            return
+        self.values.extend([NO_VALUE] * (missing * self.capacity))
+        self.times.extend([0.0] * (missing * self.capacity))
+        self.heads.extend([0] * missing)
+        self.counts.extend([0] * missing)
+
+    def reset(self, index: int) -> None:
+        start = index * self.capacity
+        self.times[start : start + self.capacity] = array('d', [0.0] * self.capacity)
+        self.heads[index] = 0
+        self.counts[index] = 0
+
+    def record(self, index: int, wall_time: float, value: int) -> None:
+        capacity = self.capacity
+        start = index * capacity
+        head = self.heads[index]
+        count = self.counts[index]
+        if count and wall_time - self.times[start + (head - 1) % capacity] < (
+            self.interval
+        ):
+            return
+        self.values[start + head] = value
+        self.times[start + head] = wall_time
+        self.heads[index] = (head + 1) % capacity
+        if count < capacity:
+            self.counts[index] = count + 1
+
+    def series(self, index: int) -> tuple[list[float], list[int]]:
+        """
+        Отсчеты сенсора от старых к новым.
+        :return: время отсчетов и значения.
+        """
+        capacity = self.capacity
+        start = index * capacity
+        head = self.heads[index]
+        count = self.counts[index]
+        positions = [
+            start + (head - count + offset) % capacity for offset in range(count)
+        ]
+        return (
+            [self.times[position] for position in positions],
+            [self.values[position] for position in positions],
+        )
@@ -1,51 +1,138 @@
 import asyncio
-import copy
 import dataclasses
 import logging
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Any
 
 from serial import Serial
 
 from app import settings
+from app.alarms.engine import RAISED, AlarmEngine, AlarmRule, build_rules
 from app.api.common import SensorReading
-from app.api.config import configure_logging
-from app.owen_counter.owen_ci8 import OwenCI8
+from app.api.config import get_settings
+from app.owen_counter.exeptions import ImproperlyConfiguredError
+from app.owen_counter.owen_ci8 import OwenCI8, ReadResult
+from app.sinks.pipeline import SinkPipeline
+from app.transport.ports import open_serial
 
-from .exeptions import DeviceNotFound
+from .baudrate import BAUDRATES, BaudProbe, can_probe, probe_baudrates
+from .capacity import CapacityPlanner
+from .demand import DemandTracker
+from .error_log import ErrorAggregator, RateLimitedLog
+from .exeptions import BusUnavailable, DeviceNotFound, GroupNotFound
+from .groups import GroupAggregates, resolve_groups
+from .history import SampleHistory
+from .registry import (
+    NO_VALUE,
+    OK,
+    STATUS_NAMES,
+    UNKNOWN,
+    RateWindow,
+    RecentSamples,
+    SensorRegistry,
+)
+from .reloader import SettingsReloader
+from .supervisor import PortSupervisor, device_present, port_error
+from .timeseries import CompressedHistory
 
-configure_logging()
 logger = logging.getLogger(__name__)
+sensor_errors = ErrorAggregator(logger)
+# имена из запросов клиентов не хранятся: их число не ограничено
+unknown_sensors = RateLimitedLog(logger)
+bus_errors = ErrorAggregator(logger)
 
+DEFAULT_BUS = 'default'
+MICROSECOND = timedelta(microseconds=1)
 
 
-@dataclass
+@dataclass(slots=True)
 class Sensor:
+    """
+    Представление строки SensorRegistry: показание, время и статус опроса
+    хранятся в массивах реестра по индексу index.
+    """
+
     name: str
     device: OwenCI8
     parameter_hash: bytes
     serial: Serial
-    reading: SensorReading = dataclasses.field(default_factory=SensorReading)
-    
-    # reading_time: datetime = datetime.now()
+    registry: SensorRegistry
+    index: int
+    bus: str = DEFAULT_BUS
+    interval: float | None = None  # период опроса, None - POLL_DELAY
+
+    @property
+    def value(self) -> Any:
+        value = self.registry.values[self.index]
+        if value == NO_VALUE:
+            return None
+        if self.parameter_hash == OwenCI8.DTMR:
+            return timedelta(microseconds=value)
+        return value
+
+    @property
+    def reading_time(self) -> datetime | None:
+        wall_time = self.registry.wall_times[self.index]
+        return datetime.fromtimestamp(wall_time) if wall_time else None
+
+    @property
+    def status(self) -> str:
+        return STATUS_NAMES[self.registry.statuses[self.index]]
+
+    @property
+    def reading(self) -> SensorReading:
+        with self.registry.lock:
+            return SensorReading(value=self.value, time=self.reading_time)
 
     def update(self) -> None:
+        result = ReadResult(self.device, self.parameter_hash)
+        started = time.monotonic()
         try:
-            self.reading.value = self.device.read_parameter(
-                self.serial, self.parameter_hash
-            )
-            self.reading.time = datetime.now()
-        except TimeoutError:
-            logger.error(f'Сенсор {self.name} не ответил')
+            result.value = self.device.read_parameter(self.serial, self.parameter_hash)
         except Exception as err:
-            logger.error(f'Сенсор {self.name} {err}')
+            result.set_error(err)
+        result.timestamp = (started + time.monotonic()) / 2
+        with self.registry.lock:
+            self.registry.stamp()
+            self.apply(result)
+
+    def apply(self, result: ReadResult) -> None:
+        """
+        Применяет результат чтения параметра сенсора.
+        Вызывается под registry.lock после registry.stamp().
+        """
+        if result.status == ReadResult.OK:
+            sensor_errors.success(self.name)
+        elif result.status == ReadResult.TIMEOUT:
+            sensor_errors.failure(
+                self.name, 'timeout', 'Сенсор %s не ответил', self.name
+            )
+        else:
+            sensor_errors.failure(
+                self.name,
+                type(result.error).__name__,
+                'Сенсор %s %s',
+                self.name,
+                result.error,
+            )
+        value = result.value
+        if value is None:
+            value = NO_VALUE
+        elif isinstance(value, timedelta):
+            value //= MICROSECOND
+        self.registry.store(self.index, result.status, value, result.timestamp)
 
     def get(self) -> dict[str, Any]:
+        reading = self.reading
         return {
             'name': self.name,
-            'reading': self.reading.value,
-            'reading_time': self.reading.time,
+            'reading': reading.value,
+            'reading_time': reading.time,
         }
 
 
@@ -64,98 +151,802 @@ class NoNameSensor:
             )
             self.reading.time = datetime.now()
         except TimeoutError:
-            logger.error(f'Сенсор {self.id} не ответил')
+            logger.error('Сенсор %s не ответил', self.id)
         except Exception as err:
-            logger.error(f'Сенсор {self.id} {err}')
+            logger.error('Сенсор %s %s', self.id, err)
 
         return {'reading': self.reading.value, 'reading_time': self.reading.time}
 
 
 class SensorsPoller:
+    """
+    Опрос сенсоров по шинам.
+    Порты открываются не при создании, а в цикле опроса своей шины:
+    недоступный порт не мешает работе API и других шин. После ошибки порта
+    или исчезновения устройства опрос шины приостанавливается, порт
+    открывается повторно с интервалом от BUS_REOPEN_MIN_INTERVAL
+    до BUS_REOPEN_INTERVAL секунд (PortSupervisor).
+    """
+
     def __init__(self):
-        if settings.serial_settings:
-            serial = Serial(**settings.serial_settings)
-            serial.close()
-            serial.open()
-        else:
-            serial = None
+        summary_interval = get_settings().error_summary_interval
+        for errors in (sensor_errors, bus_errors):
+            errors.summary_interval = summary_interval
+        unknown_sensors.interval = summary_interval
+        self.ports: dict[str, Any] = {}
+        self.buses_settings: dict[str, dict[str, Any]] = {}
+        # каждая шина опрашивается в своем потоке, блокирующий обмен
+        # с портом или шлюзом не останавливает event loop и другие шины
+        self.executors: dict[str, ThreadPoolExecutor] = {}
+        self.locks: dict[str, asyncio.Lock] = {}
+        self.tasks: dict[str, asyncio.Task] = {}
+        self.wakeups: dict[str, asyncio.Event] = {}
+        # модель пропускной способности шин и периоды опроса сенсоров
+        self.planner = CapacityPlanner(
+            turnaround=getattr(settings, 'BUS_TURNAROUND', 0.02),
+            max_load=getattr(settings, 'BUS_MAX_LOAD', 0.9),
+        )
+        self.supervisor = PortSupervisor(
+            min_interval=getattr(settings, 'BUS_REOPEN_MIN_INTERVAL', 0.25),
+            max_interval=getattr(settings, 'BUS_REOPEN_INTERVAL', 5.0),
+        )
+        # определение скорости счетчиков шин (отчет, порт не переключается)
+        self.baud_probe = getattr(settings, 'BAUD_PROBE', False)
+        self.baud_probes: dict[str, BaudProbe] = {}
+        self.polling = False
+        for bus, serial_settings in self.get_buses_settings(settings).items():
+            self.add_bus(bus, serial_settings, None)
+        # длительная сжатая история, ARCHIVE_SIZE = 0 - не ведется
+        archive_size = getattr(settings, 'ARCHIVE_SIZE', 0)
+        self.registry = SensorRegistry(
+            history=SampleHistory(
+                capacity=getattr(settings, 'HISTORY_SIZE', 720),
+                interval=getattr(settings, 'HISTORY_INTERVAL', 5.0),
+            ),
+            recent=RecentSamples(getattr(settings, 'RATE_SAMPLES', 16)),
+            archive=CompressedHistory(
+                capacity=archive_size,
+                interval=getattr(settings, 'ARCHIVE_INTERVAL', 0.5),
+                block_size=getattr(settings, 'ARCHIVE_BLOCK', 512),
+            )
+            if archive_size
+            else None,
+        )
+        # предыдущие показания для расчета скорости в ответах API
+        self.rates = RateWindow(self.registry)
+        # отдельное окно для запросов агрегаторов (local=true): их запросы
+        # не сокращают интервал расчета скорости для прямых клиентов
+        self.peer_rates = RateWindow(self.registry)
         self.sensors: dict[str, Sensor] = {}
+        self.sensors_settings: dict[str, dict[str, Any]] = {}
+        self.bus_sensors: dict[str, list[Sensor]] = {}
         for sensor_settings in settings.sensors_settings:
-            sensor_name = sensor_settings['name']
-            device = sensor_settings['driver']
-            self.sensors[sensor_name] = Sensor(
-                name=sensor_name,
-                device=device(
-                    addr=sensor_settings['addr'], addr_len=sensor_settings['addr_len']
-                ),
-                parameter_hash=sensor_settings['parameter'],
-                serial=serial,
-            )
-        self.last_readings = {}
+            self.add_sensor(sensor_settings)
+        self.group_sensors()
+        groups = resolve_groups(getattr(settings, 'groups_settings', {}), self.sensors)
+        self.set_groups(groups)
+        self.set_alarms(
+            build_rules(getattr(settings, 'alarm_rules', []), self.sensors, groups)
+        )
+        self.plan_buses()
+        self.demand: DemandTracker | None = None
+        if getattr(settings, 'DEMAND_POLLING', False):
+            self.demand = DemandTracker(
+                window=getattr(settings, 'DEMAND_WINDOW', 300.0),
+                keepalive_interval=getattr(settings, 'KEEPALIVE_INTERVAL', 60.0),
+            )
+        # получатели показаний каждого цикла опроса
+        self.sinks: SinkPipeline | None = None
+        # получатели событий тревог
+        self.alarm_sinks: SinkPipeline | None = None
+        self.reloader: SettingsReloader | None = None
+        if getattr(settings, 'SETTINGS_RELOAD', False):
+            self.reloader = SettingsReloader(
+                settings, interval=getattr(settings, 'SETTINGS_RELOAD_INTERVAL', 2.0)
+            )
+
+    @staticmethod
+    def get_buses_settings(module) -> dict[str, dict[str, Any]]:
+        """
+        Настройки шин: serial_settings - шина по умолчанию,
+        buses_settings - дополнительные порты и шлюзы tcp://host:port.
+        """
+        buses = {DEFAULT_BUS: module.serial_settings}
+        buses.update(getattr(module, 'buses_settings', {}))
+        return buses
+
+    @staticmethod
+    def open_port(serial_settings: dict[str, Any]) -> Any:
+        return open_serial(serial_settings) if serial_settings else None
+
+    def add_bus(self, bus: str, serial_settings: dict[str, Any], port: Any) -> None:
+        self.ports[bus] = port
+        self.buses_settings[bus] = serial_settings
+        self.executors[bus] = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f'bus-{bus}'
+        )
+        self.locks[bus] = asyncio.Lock()
+        if port is not None:
+            self.supervisor.opened(bus)
+        if self.polling:
+            self.start_bus(bus)
+
+    def set_port(self, bus: str, port: Any) -> None:
+        self.ports[bus] = port
+        for sensor in self.sensors.values():
+            if sensor.bus == bus:
+                sensor.serial = port
+
+    async def open_bus(self, bus: str) -> bool:
+        """
+        Открывает порт шины в ее потоке.
+        :return: True, если порт открыт.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            port = await loop.run_in_executor(
+                self.executors[bus], self.open_port, self.buses_settings[bus]
+            )
+        except Exception as err:
+            self.supervisor.open_failed(bus, err)
+            bus_errors.failure(
+                bus,
+                type(err).__name__,
+                'Шина %s: не удалось открыть порт: %s',
+                bus,
+                err,
+            )
+            return False
+        self.set_port(bus, port)
+        bus_errors.success(bus)
+        if (recovery := self.supervisor.opened(bus)) is not None:
+            logger.info('Шина %s: порт восстановлен за %.2f с', bus, recovery)
+        return True
+
+    async def exchange(self, bus: str, call: Callable[[Any], Any]) -> Any:
+        """
+        Выполняет обмен call(port) с портом шины вне цикла опроса:
+        под блокировкой шины и в ее потоке, кадры не смешиваются с опросом.
+        :raise BusUnavailable: порт шины не открыт.
+        """
+        async with self.locks[bus]:
+            port = self.ports[bus]
+            if port is None:
+                raise BusUnavailable(bus)
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executors[bus], call, port
+            )
+
+    async def drop_port(self, bus: str, err: Exception) -> None:
+        """
+        Закрывает потерянный порт шины, опрос шины приостанавливается
+        до повторного открытия порта.
+        """
+        port = self.ports[bus]
+        self.set_port(bus, None)
+        self.supervisor.lost(bus, err)
+        self.mark_offline(bus)
+        bus_errors.failure(
+            bus, type(err).__name__, 'Шина %s: порт потерян: %s', bus, err
+        )
+        if port is not None:
+            with suppress(Exception):
+                await asyncio.get_running_loop().run_in_executor(
+                    self.executors[bus], port.close
+                )
+
+    def mark_offline(self, bus: str) -> None:
+        """
+        Записывает ошибку опроса сенсорам потерянной шины, которые были
+        на связи: до восстановления порта опроса нет, правила тревог
+        по связи и показатели групп учитывают недоступность шины.
+        """
+        registry = self.registry
+        with registry.lock:
+            registry.stamp()
+            for sensor in self.bus_sensors.get(bus, []):
+                if registry.statuses[sensor.index] in (UNKNOWN, OK):
+                    registry.store(sensor.index, ReadResult.ERROR)
+
+    async def probe_bus(self, bus: str) -> None:
+        """
+        Определяет скорость счетчиков шины и сообщает в журнал о расхождении
+        со скоростью порта и о расчетном росте пропускной способности
+        при перенастройке счетчиков. Скорость порта не меняется.
+        """
+        port = self.ports[bus]
+        sensors = [
+            sensor
+            for sensor in self.bus_sensors.get(bus, [])
+            if isinstance(sensor.device, OwenCI8)
+        ]
+        if not sensors:
+            return
+        try:
+            probe = await asyncio.get_running_loop().run_in_executor(
+                self.executors[bus], probe_baudrates, port, sensors, BAUDRATES, False
+            )
+        except Exception as err:
+            bus_errors.failure(
+                bus,
+                type(err).__name__,
+                'Шина %s: ошибка определения скорости: %s',
+                bus,
+                err,
+            )
+            return
+        self.baud_probes[bus] = probe
+        if probe.detected is None:
+            logger.warning(
+                'Шина %s: нет скорости, на которой отвечают все счетчики: %s',
+                bus,
+                probe.answered,
+            )
+            return
+        if probe.mismatch:
+            logger.warning(
+                'Шина %s: счетчики отвечают на %s бод, скорость порта %s бод',
+                bus,
+                probe.detected,
+                probe.current,
+            )
+        turnaround = self.planner.turnarounds.get(bus, self.planner.turnaround)
+        if (gain := probe.gain(BAUDRATES[-1], turnaround)) > 1:
+            logger.info(
+                'Шина %s: перенастройка счетчиков и порта с %s на %s бод '
+                'увеличит пропускную способность в %.1f раза',
+                bus,
+                probe.detected,
+                BAUDRATES[-1],
+                gain,
+            )
+
+    def remove_bus(self, bus: str) -> None:
+        if task := self.tasks.pop(bus, None):
+            task.cancel()
+        self.wakeups.pop(bus, None)
+        self.supervisor.remove(bus)
+        self.planner.remove(bus)
+        self.baud_probes.pop(bus, None)
+        self.locks.pop(bus)
+        self.executors.pop(bus).shutdown(wait=False)
+        self.buses_settings.pop(bus)
+        port = self.ports.pop(bus)
+        if port is not None:
+            with suppress(Exception):
+                port.close()
+
+    @staticmethod
+    def build_device(sensor_settings: dict[str, Any]) -> OwenCI8:
+        """
+        Создает драйвер счетчика, проверяя настройки сенсора.
+        """
+        sensor_name = sensor_settings.get('name')
+        missing = [
+            key
+            for key in ('name', 'driver', 'addr', 'addr_len', 'parameter')
+            if key not in sensor_settings
+        ]
+        if missing:
+            raise ImproperlyConfiguredError(
+                f'Сенсор {sensor_name}: не заданы {", ".join(missing)}.'
+            )
+        return sensor_settings['driver'](
+            addr=sensor_settings['addr'], addr_len=sensor_settings['addr_len']
+        )
+
+    def build_sensor(
+        self,
+        sensor_settings: dict[str, Any],
+        index: int | None = None,
+        device: OwenCI8 | None = None,
+    ) -> Sensor:
+        """
+        :param index: индекс сенсора в реестре, по умолчанию выделяется новый,
+        :param device: драйвер, созданный build_device.
+        """
+        if device is None:
+            device = self.build_device(sensor_settings)
+        sensor_name = sensor_settings['name']
+        bus = sensor_settings.get('bus', DEFAULT_BUS)
+        if bus not in self.ports:
+            raise ImproperlyConfiguredError(
+                f'Шина {bus} сенсора {sensor_name} не найдена в buses_settings.'
+            )
+        return Sensor(
+            name=sensor_name,
+            device=device,
+            parameter_hash=sensor_settings['parameter'],
+            serial=self.ports[bus],
+            registry=self.registry,
+            index=self.registry.allocate(sensor_name) if index is None else index,
+            bus=bus,
+            interval=sensor_settings.get('interval'),
+        )
+
+    def add_sensor(
+        self,
+        sensor_settings: dict[str, Any],
+        index: int | None = None,
+        device: OwenCI8 | None = None,
+    ) -> Sensor:
+        sensor = self.build_sensor(sensor_settings, index, device)
+        self.sensors[sensor.name] = sensor
+        self.sensors_settings[sensor.name] = sensor_settings
+        return sensor
+
+    def remove_sensor(self, sensor_name: str) -> None:
+        sensor = self.sensors.pop(sensor_name)
+        self.sensors_settings.pop(sensor_name)
+        self.registry.release(sensor.index)
+        self.planner.forget(sensor_name)
+
+    def group_sensors(self) -> None:
+        """
+        Обновляет списки сенсоров шин, используемые циклами опроса.
+        """
+        bus_sensors = {bus: [] for bus in self.ports}
+        for sensor in self.sensors.values():
+            bus_sensors[sensor.bus].append(sensor)
+        self.bus_sensors = bus_sensors
+
+    def set_groups(self, groups: dict[str, list[str]]) -> None:
+        """
+        Задает группы сенсоров, показатели групп считаются заново.
+        """
+        with self.registry.lock:
+            self.registry.groups = (
+                GroupAggregates(self.registry, groups) if groups else None
+            )
+
+    def set_alarms(self, rules: list[AlarmRule]) -> None:
+        """
+        Задает правила тревог. Состояние правил, оставшихся без изменений,
+        сохраняется. Вызывается после set_groups.
+        """
+        with self.registry.lock:
+            self.registry.alarms = (
+                AlarmEngine(self.registry, rules, previous=self.registry.alarms)
+                if rules
+                else None
+            )
+
+    def check_alarms(self) -> None:
+        """
+        Проверяет длительность условий тревог по времени
+        и передает события получателям.
+        """
+        with self.registry.lock:
+            if self.registry.alarms is not None:
+                self.registry.alarms.tick(time.monotonic(), time.time())
+        self.publish_alarms()
+
+    def publish_alarms(self) -> None:
+        """
+        Передает события тревог получателям и в журнал.
+        """
+        with self.registry.lock:
+            alarms = self.registry.alarms
+            events = [] if alarms is None else alarms.drain()
+        for event in events:
+            logger.log(
+                logging.WARNING if event['state'] == RAISED else logging.INFO,
+                'Тревога %s (%s): %s, %s = %s',
+                event['rule'],
+                event['subject'],
+                event['state'],
+                event['metric'],
+                event['value'],
+            )
+        if self.alarm_sinks is not None:
+            self.alarm_sinks.publish(events)
+
+    def get_alarms(self) -> list[dict[str, Any]]:
+        with self.registry.lock:
+            alarms = self.registry.alarms
+            return [] if alarms is None else alarms.report()
+
+    def plan_bus(self, bus: str) -> None:
+        self.planner.plan(
+            bus,
+            self.buses_settings[bus],
+            self.bus_sensors.get(bus, []),
+            settings.POLL_DELAY,
+        )
+
+    def plan_buses(self) -> None:
+        """
+        Рассчитывает загрузку шин, переподписанные шины сообщаются в журнал.
+        """
+        for bus in self.ports:
+            self.plan_bus(bus)
+
+    async def apply_settings(self, module) -> None:
+        """
+        Применяет новую конфигурацию без перезапуска.
+        Добавляются, удаляются и изменяются только затронутые шины и сенсоры,
+        показания и открытые порты остальных сохраняются.
+        Настройки сенсоров, групп и правил проверяются до изменения
+        конфигурации: при ошибке конфигурация не меняется. Порты новых
+        и измененных шин открываются в цикле опроса шины (PortSupervisor),
+        как при запуске: недоступный порт не мешает применить остальные
+        изменения. Шины, сенсоры, группы и правила заменяются за один шаг
+        без переключения event loop.
+        """
+        buses_settings = self.get_buses_settings(module)
+        sensors_settings, devices = self.build_devices(
+            module.sensors_settings, buses_settings
+        )
+        groups = resolve_groups(
+            getattr(module, 'groups_settings', {}), sensors_settings
+        )
+        rules = build_rules(
+            getattr(module, 'alarm_rules', []), sensors_settings, groups
+        )
+        removed_buses = [bus for bus in self.ports if bus not in buses_settings]
+        changed_buses = [
+            bus
+            for bus, serial_settings in buses_settings.items()
+            if self.buses_settings.get(bus, serial_settings) != serial_settings
+        ]
+        new_buses = [bus for bus in buses_settings if bus not in self.ports]
+        # дожидаемся завершения обмена на заменяемых шинах
+        locks = [self.locks[bus] for bus in removed_buses + changed_buses]
+        acquired = []
+        try:
+            for lock in locks:
+                await lock.acquire()
+                acquired.append(lock)
+        except BaseException:
+            for lock in acquired:
+                lock.release()
+            raise
+        try:
+            for bus in removed_buses + changed_buses:
+                self.remove_bus(bus)
+            for bus in changed_buses + new_buses:
+                self.add_bus(bus, buses_settings[bus], None)
+            added, removed, modified = self.update_sensors(sensors_settings, devices)
+            self.set_groups(groups)
+            self.set_alarms(rules)
+        finally:
+            for lock in acquired:
+                lock.release()
+        logger.info(
+            'Настройки применены. Шины: +%s -%s ~%s. Сенсоры: +%s -%s ~%s',
+            new_buses,
+            removed_buses,
+            changed_buses,
+            added,
+            removed,
+            modified,
+        )
+
+    def build_devices(
+        self,
+        sensors_settings: list[dict[str, Any]],
+        buses_settings: dict[str, dict[str, Any]],
+    ) -> tuple[dict[str, dict[str, Any]], dict[str, OwenCI8]]:
+        """
+        Проверяет настройки сенсоров и создает их драйверы.
+        :return: настройки и драйверы сенсоров по имени.
+        """
+        by_name = {}
+        devices = {}
+        for sensor_settings in sensors_settings:
+            device = self.build_device(sensor_settings)
+            name = sensor_settings['name']
+            bus = sensor_settings.get('bus', DEFAULT_BUS)
+            if bus not in buses_settings:
+                raise ImproperlyConfiguredError(
+                    f'Шина {bus} сенсора {name} не найдена в buses_settings.'
+                )
+            by_name[name] = sensor_settings
+            devices[name] = device
+        return by_name, devices
+
+    def update_sensors(
+        self,
+        sensors_settings: dict[str, dict[str, Any]],
+        devices: dict[str, OwenCI8],
+    ) -> tuple[list[str], list[str], list[str]]:
+        """
+        Приводит сенсоры к новым настройкам.
+        Измененный сенсор сохраняет показание, если адрес и параметр не изменились.
+        :param devices: драйверы сенсоров, созданные build_device.
+        :return: добавленные, удаленные и измененные сенсоры.
+        """
+        removed = [name for name in self.sensors if name not in sensors_settings]
+        for name in removed:
+            self.remove_sensor(name)
+        added, modified = [], []
+        for name, sensor_settings in sensors_settings.items():
+            current = self.sensors.get(name)
+            if current is None:
+                added.append(name)
+                self.add_sensor(sensor_settings, device=devices[name])
+                continue
+            previous_settings = self.sensors_settings[name]
+            if previous_settings == sensor_settings:
+                # порт шины мог быть открыт заново
+                current.serial = self.ports[current.bus]
+                continue
+            modified.append(name)
+            if all(
+                previous_settings.get(key) == sensor_settings.get(key)
+                for key in ('driver', 'addr', 'addr_len', 'parameter')
+            ):
+                self.add_sensor(sensor_settings, current.index, devices[name])
+            else:
+                self.add_sensor(sensor_settings, device=devices[name])
+                self.registry.release(current.index)
+        self.group_sensors()
+        # скорость счетчиков шины определяется заново
+        for name in added + modified:
+            self.baud_probes.pop(self.sensors[name].bus, None)
+        self.plan_buses()
+        return added, removed, modified
 
     async def poll(self):
         """
-        Цикл опроса устройств.
+        Цикл опроса устройств. Шины опрашиваются параллельно.
+        При SETTINGS_RELOAD отслеживаются изменения файла настроек.
+        """
+        self.polling = True
+        for bus in self.ports:
+            self.start_bus(bus)
+        if self.reloader is not None:
+            await self.reloader.watch(self.apply_settings)
+        else:
+            await asyncio.gather(*self.tasks.values())
+
+    def close(self) -> None:
+        """
+        Останавливает опрос шин и закрывает порты.
         """
+        self.polling = False
+        for bus in list(self.ports):
+            self.remove_bus(bus)
+
+    def start_bus(self, bus: str) -> None:
+        if bus not in self.tasks:
+            self.tasks[bus] = asyncio.create_task(self.poll_bus(bus))
+
+    async def poll_bus(self, bus: str):
+        """
+        Цикл опроса устройств одной шины.
+        """
+        loop = asyncio.get_running_loop()
+        wakeup = self.wakeups[bus] = asyncio.Event()
+        lock = self.locks[bus]
+        executor = self.executors[bus]
         while True:
-            for sensor in self.sensors.values():
-                await asyncio.sleep(0)
-                sensor.update()
-            await asyncio.sleep(settings.POLL_DELAY)
+            waiting = self.ports[bus] is None and self.buses_settings[bus]
+            if waiting and self.supervisor.can_open(bus):
+                async with lock:
+                    await self.open_bus(bus)
+            online = self.ports[bus] is not None
+            if (
+                online
+                and self.baud_probe
+                and bus not in self.baud_probes
+                and can_probe(self.buses_settings[bus])
+            ):
+                async with lock:
+                    await self.probe_bus(bus)
+            sensors = self.bus_sensors.get(bus, [])
+            # сенсоры, период опроса которых истек
+            selected = self.planner.select(bus, sensors) if online else []
+            # получатели показаний и правила тревог ждут все сенсоры
+            if (
+                self.demand is not None
+                and self.sinks is None
+                and self.registry.alarms is None
+            ):
+                selected = self.demand.select(selected)
+            if selected:
+                async with lock:
+                    results, err = await loop.run_in_executor(
+                        executor, self.check_cycle, self.buses_settings[bus], selected
+                    )
+                    if err is not None:
+                        await self.drop_port(bus, err)
+                self.planner.observe(bus, self.buses_settings[bus], results)
+                self.plan_bus(bus)
+                if self.sinks is not None:
+                    self.sinks.publish(self.collect_readings(selected))
+            # тревоги с duration поднимаются и без опроса (порт потерян)
+            self.check_alarms()
+            if self.ports[bus] is None and self.buses_settings[bus]:
+                delay = min(settings.POLL_DELAY, self.supervisor.delay(bus))
+            else:
+                delay = self.planner.next_due(bus, sensors, settings.POLL_DELAY)
+            wakeup.clear()
+            with suppress(TimeoutError):
+                await asyncio.wait_for(wakeup.wait(), delay)
+
+    def collect_readings(self, sensors: list[Sensor]) -> list[dict[str, Any]]:
+        """
+        Показания сенсоров для получателей: значение счетчика
+        (DTMR - мкс, None - нет показания), время отсчета (time.time()) и статус.
+        """
+        registry = self.registry
+        readings = []
+        with registry.lock:
+            for sensor in sensors:
+                index = sensor.index
+                value = registry.values[index]
+                readings.append(
+                    {
+                        'sensor': sensor.name,
+                        'value': None if value == NO_VALUE else value,
+                        'time': registry.wall_times[index],
+                        'status': STATUS_NAMES[registry.statuses[index]],
+                    }
+                )
+        return readings
+
+    def touch(self, names: Iterable[str]) -> None:
+        """
+        Отмечает интерес потребителя к сенсорам в режиме опроса по запросу.
+        Шины невостребованных до этого сенсоров опрашиваются без ожидания.
+        """
+        if self.demand is None:
+            return
+        woken = self.demand.touch(name for name in names if name in self.sensors)
+        for name in woken:
+            if wakeup := self.wakeups.get(self.sensors[name].bus):
+                wakeup.set()
+
+    @classmethod
+    def check_cycle(
+        cls, serial_settings: dict[str, Any], sensors: list[Sensor]
+    ) -> tuple[list[ReadResult], Exception | None]:
+        """
+        Опрашивает сенсоры шины, если устройство порта на месте.
+        :return: результаты опроса и ошибка порта, None - порт исправен.
+        """
+        if not device_present(serial_settings):
+            return [], FileNotFoundError(
+                f'Устройство {serial_settings["port"]} исчезло'
+            )
+        results = cls.poll_cycle(sensors)
+        return results, port_error(results)
+
+    @staticmethod
+    def poll_cycle(sensors: list[Sensor]) -> list[ReadResult]:
+        """
+        Опрашивает сенсоры одной шины пакетной транзакцией.
+        """
+        results = OwenCI8.read_many(
+            sensors[0].serial,
+            [(sensor.device, sensor.parameter_hash) for sensor in sensors],
+        )
+        registry = sensors[0].registry
+        with registry.lock:
+            registry.stamp()
+            for sensor, result in zip(sensors, results, strict=True):
+                sensor.apply(result)
+        return results
 
     def get_sensor_readings(self, sensor_name: str) -> dict[str, Any]:
         try:
-            return self.sensors[sensor_name].get()
+            sensor = self.sensors[sensor_name]
+            self.touch((sensor_name,))
+            return sensor.get()
         except KeyError:
             raise DeviceNotFound(sensor_name) from None
 
-    def get_list_readings(self, work_centers: list[str]) -> list[dict[str, Any]]:
+    def get_group(self, group_name: str, members: bool = True) -> dict[str, Any]:
+        """
+        Суммарные показатели группы сенсоров: скорость счета, шт/мин,
+        сумма показаний, число сенсоров на связи и без связи.
+        :param members: добавить вклад участников группы.
+        """
+        groups = self.registry.groups
+        if groups is None or group_name not in groups:
+            raise GroupNotFound(group_name)
+        with self.registry.lock:
+            response = groups.summary(group_name)
+            if members:
+                response['members'] = groups.breakdown(group_name)
+        if self.demand is not None:
+            self.touch(groups.members[groups.index[group_name]])
+        return response
+
+    def get_groups(self) -> list[dict[str, Any]]:
+        groups = self.registry.groups
+        if groups is None:
+            return []
+        with self.registry.lock:
+            return [groups.summary(name) for name in groups.index]
+
+    def get_list_readings(
+        self,
+        work_centers: list[str],
+        local: bool = False,
+        report_missing: bool = True,
+    ) -> list[dict[str, Any]]:
         """
         Запрос данных по списку slug рабочих центров.
         :param work_centers: Список slug рабочих центров.
+        :param local: Запрос агрегатора: скорость считается от его
+          предыдущего запроса (окно peer_rates), о ненайденных сенсорах
+          сообщает агрегатор.
+        :param report_missing: Сообщать о ненайденных сенсорах.
         :return: Список показаний датчиков.
         """
-        for_sent = []
+        self.touch(work_centers)
         measured_at = datetime.now()
-        for work_center in work_centers:
-            response = {
-                'sensor': work_center,
-                'value': None,
-                'measured_at': measured_at,
-                'status': 'NOT FOUND',
-            }
-            if not (sensor := self.sensors.get(work_center)):
-                logger.error(f'Device {work_center} not found in settings.py')
-                for_sent.append(response)
-                continue
-            current_reading: SensorReading = sensor.reading
-            if current_reading.value is None:
-                response['status'] = 'OFFLINE'
-                for_sent.append(response)
-                continue
-            previous_reading: SensorReading = self.last_readings.get(sensor.name)
-            if previous_reading is None or previous_reading.value is None:
-                self.last_readings[sensor.name] = copy.copy(current_reading)
-                response['status'] = 'OK'
-                for_sent.append(response)
-                continue
-            duration = current_reading.time - previous_reading.time
-            if duration.total_seconds() <= 0:
-                continue
-            if current_reading.value < previous_reading.value:
-                value_diff = sensor.device.MAX_VALUE - previous_reading.value + current_reading.value
-            else:
-                value_diff = current_reading.value - previous_reading.value
-                
-            speed = value_diff / duration.total_seconds() * 60
-            
-            response['value'] = speed
-            response['status'] = 'OK'
-            for_sent.append(response)
-            self.last_readings[sensor.name] = copy.copy(current_reading)
-        logger.debug(f'{for_sent=}')
+        rates = self.peer_rates if local else self.rates
+        with self.registry.lock:
+            for_sent = [
+                self.get_rate_reading(work_center, measured_at, rates)
+                for work_center in work_centers
+            ]
+        if report_missing and not local:
+            log_missing(for_sent)
+        logger.debug('for_sent=%s', for_sent)
         return for_sent
 
+    def get_rate_reading(
+        self, work_center: str, measured_at: datetime, rates: RateWindow
+    ) -> dict[str, Any]:
+        """
+        Скорость счета сенсора с предыдущего запроса, шт/мин.
+        Вызывается под registry.lock.
+        :param rates: окно предыдущих показаний потребителя.
+        :return: показание; известный сенсор без нового показания
+          с предыдущего запроса - OK со скоростью None, агрегатор
+          не заменяет его ответом NOT FOUND другого экземпляра.
+        """
+        response = {
+            'sensor': work_center,
+            'value': None,
+            'measured_at': measured_at,
+            'status': 'NOT FOUND',
+        }
+        if not (sensor := self.sensors.get(work_center)):
+            return response
+        index = sensor.index
+        value = self.registry.values[index]
+        if value == NO_VALUE:
+            response['status'] = 'OFFLINE'
+            return response
+        response['status'] = 'OK'
+        if not rates.has_previous(index):
+            rates.advance(index)
+            return response
+        duration = rates.duration(index)
+        if duration <= 0:
+            return response
+        rate = None
+        if self.registry.recent is not None:
+            rate = self.registry.recent.rate(
+                index, rates.times[index], sensor.device.MAX_VALUE
+            )
+        if rate is None:
+            previous_value = rates.values[index]
+            if value < previous_value:
+                value_diff = sensor.device.MAX_VALUE - previous_value + value
+            else:
+                value_diff = value - previous_value
+            rate = value_diff / duration
+        response['value'] = rate * 60
+        rates.advance(index)
+        return response
+
+
+def log_missing(readings: Iterable[dict[str, Any]]) -> None:
+    """
+    Сообщение о сенсорах со статусом NOT FOUND, не чаще summary_interval.
+    """
+    missing = [item['sensor'] for item in readings if item['status'] == 'NOT FOUND']
+    if missing:
+        unknown_sensors.error(
+            'Devices %s not found in settings.py', ', '.join(missing[:10])
+        )
+
 
 def build_no_name_sensor(sensor_id: int) -> NoNameSensor:
     try:
@@ -166,9 +957,7 @@ def build_no_name_sensor(sensor_id: int) -> NoNameSensor:
     if not settings.serial_settings:
         raise RuntimeError('Serial settings not configured')
 
-    serial = Serial(**settings.serial_settings)
-    serial.close()
-    serial.open()
+    serial = open_serial(settings.serial_settings, record=False)
 
     device_cls = sensor_settings['driver']
 
@@ -0,0 +1,320 @@
+import threading
+import time
+from array import array
+from typing import TYPE_CHECKING
+
+from app.owen_counter.owen_ci8 import ReadResult
+
+if TYPE_CHECKING:
+    from app.alarms.engine import AlarmEngine
+
+    from .groups import GroupAggregates
+    from .history import SampleHistory
+    from .timeseries import CompressedHistory
+
+NO_VALUE = -1  # значения счетчиков СИ8 неотрицательны
+
+UNKNOWN = 0
+OK = 1
+TIMEOUT = 2
+ERROR = 3
+
+STATUS_CODES = {
+    ReadResult.OK: OK,
+    ReadResult.TIMEOUT: TIMEOUT,
+    ReadResult.ERROR: ERROR,
+}
+STATUS_NAMES = {
+    UNKNOWN: 'UNKNOWN',
+    OK: ReadResult.OK,
+    TIMEOUT: ReadResult.TIMEOUT,
+    ERROR: ReadResult.ERROR,
+}
+
+
+class SensorRegistry:
+    """
+    Колоночное хранилище состояния сенсоров.
+    Сенсору выделяется индекс, последние значение, время, статус опроса
+    и счетчики ошибок хранятся в массивах array по этому индексу.
+    Запись показания не создает объектов, объем памяти растет линейно
+    с количеством сенсоров без накладных расходов на объект Python.
+    Запись из потоков шин и чтение из API выполняются под lock.
+    """
+
+    def __init__(
+        self,
+        history: 'SampleHistory | None' = None,
+        recent: 'RecentSamples | None' = None,
+        archive: 'CompressedHistory | None' = None,
+    ):
+        """
+        :param history: история показаний, пополняемая при записи результатов,
+        :param recent: последние показания для расчета скорости счета,
+        :param archive: длительная сжатая история показаний.
+        """
+        self.lock = threading.Lock()
+        self.index: dict[str, int] = {}
+        self.names: list[str | None] = []
+        self.free: list[int] = []
+        self.values = array('q')  # последнее значение, NO_VALUE - нет показания
+        self.times = array('d')  # time.monotonic() последнего показания
+        self.wall_times = array('d')  # time.time() последнего показания
+        self.statuses = array('B')  # статус последнего опроса
+        self.errors = array('L')  # ошибок опроса всего
+        self.consecutive_errors = array('L')  # ошибок подряд
+        self.windows: list[RateWindow] = []
+        self.history = history
+        self.recent = recent
+        self.archive = archive
+        # суммарные показатели групп, обновляемые при записи результатов
+        self.groups: GroupAggregates | None = None
+        # правила тревог, проверяемые при записи результатов
+        self.alarms: AlarmEngine | None = None
+        self.stamp()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def capacity(self) -> int:
+        return len(self.names)
+
+    def allocate(self, name: str) -> int:
+        """
+        Выделяет индекс сенсору. Освобожденные индексы используются повторно.
+        """
+        with self.lock:
+            if self.free:
+                index = self.free.pop()
+                self.names[index] = name
+            else:
+                index = len(self.names)
+                self.names.append(name)
+                self.values.append(NO_VALUE)
+                self.times.append(0.0)
+                self.wall_times.append(0.0)
+                self.statuses.append(UNKNOWN)
+                self.errors.append(0)
+                self.consecutive_errors.append(0)
+                for window in self.windows:
+                    window.extend(len(self.names))
+                if self.history is not None:
+                    self.history.extend(len(self.names))
+                if self.recent is not None:
+                    self.recent.extend(len(self.names))
+                if self.archive is not None:
+                    self.archive.extend(len(self.names))
+            self.index[name] = index
+            return index
+
+    def release(self, index: int) -> None:
+        with self.lock:
+            name = self.names[index]
+            if self.index.get(name) == index:
+                del self.index[name]
+            self.names[index] = None
+            self.clear(index)
+            self.errors[index] = 0
+            self.consecutive_errors[index] = 0
+            if self.history is not None:
+                self.history.reset(index)
+            if self.archive is not None:
+                self.archive.reset(index)
+            self.free.append(index)
+
+    def clear(self, index: int) -> None:
+        """
+        Сбрасывает показание сенсора (например, после смены адреса).
+        """
+        self.values[index] = NO_VALUE
+        self.times[index] = 0.0
+        self.wall_times[index] = 0.0
+        self.statuses[index] = UNKNOWN
+        for window in self.windows:
+            window.reset(index)
+        if self.recent is not None:
+            self.recent.reset(index)
+
+    def stamp(self) -> None:
+        """
+        Фиксирует время записи пакета показаний: ответы пакетной транзакции
+        записываются после ее окончания, время одно на пакет.
+        Вызывается под lock перед store.
+        """
+        self.now = time.monotonic()
+        self.wall_now = time.time()
+
+    def store(
+        self, index: int, status: str, value: int = NO_VALUE, timestamp: float = 0.0
+    ) -> None:
+        """
+        Записывает результат опроса. Вызывается под lock.
+        :param timestamp: time.monotonic() обмена с устройством,
+        0 - время записи пакета (stamp).
+        """
+        code = STATUS_CODES[status]
+        self.statuses[index] = code
+        now, wall_now = self.now, self.wall_now
+        if timestamp:
+            wall_now -= now - timestamp
+            now = timestamp
+        if code == OK:
+            self.values[index] = value
+            self.times[index] = now
+            self.wall_times[index] = wall_now
+            self.consecutive_errors[index] = 0
+            if self.recent is not None:
+                self.recent.record(index, now, value)
+        else:
+            self.errors[index] += 1
+            self.consecutive_errors[index] += 1
+            value = NO_VALUE
+        if self.history is not None:
+            self.history.record(index, wall_now, value)
+        if self.archive is not None:
+            self.archive.record(index, wall_now, value)
+        if self.groups is not None:
+            self.groups.update(index)
+        if self.alarms is not None:
+            self.alarms.update(index, now, wall_now)
+
+    def attach(self, window: 'RateWindow') -> None:
+        with self.lock:
+            window.extend(self.capacity)
+            self.windows.append(window)
+
+
+class RateWindow:
+    """
+    Предыдущие показания сенсоров для расчета скорости счета потребителем
+    (API, отправитель). Хранятся в массивах по индексам SensorRegistry,
+    поэтому расчет не копирует объекты показаний.
+    """
+
+    def __init__(self, registry: SensorRegistry):
+        self.registry = registry
+        self.values = array('q')
+        self.times = array('d')
+        registry.attach(self)
+
+    def extend(self, capacity: int) -> None:
+        missing = capacity - len(self.values)
+        if missing > 0:
+            self.values.extend([NO_VALUE] * missing)
+            self.times.extend([0.0] * missing)
+
+    def reset(self, index: int) -> None:
+        self.values[index] = NO_VALUE
+        self.times[index] = 0.0
+
+    def has_previous(self, index: int) -> bool:
+        return self.values[index] != NO_VALUE
+
+    def duration(self, index: int) -> float:
+        """
+        Время между текущим и предыдущим показанием, с.
+        """
+        return self.registry.times[index] - self.times[index]
+
+    def advance(self, index: int) -> None:
+        """
+        Запоминает текущее показание сенсора как предыдущее.
+        """
+        self.values[index] = self.registry.values[index]
+        self.times[index] = self.registry.times[index]
+
+
+class RecentSamples:
+    """
+    Последние capacity показаний сенсоров (time.monotonic(), значение)
+    в кольцевых буферах по индексам SensorRegistry.
+    Скорость счета считается методом наименьших квадратов по всем показаниям
+    окна, поэтому погрешность времени отдельного опроса (очередь шины,
+    повторы, задержка ответа) сглаживается и опрос можно учащать,
+    не получая более шумную скорость.
+    """
+
+    def __init__(self, capacity: int = 16):
+        """
+        :param capacity: количество хранимых показаний сенсора.
+        """
+        self.capacity = capacity
+        self.values = array('q')
+        self.times = array('d')
+        self.heads = array('L')  # позиция следующей записи
+        self.counts = array('L')
+
+    @property
+    def size(self) -> int:
+        return len(self.heads)
+
+    def extend(self, size: int) -> None:
+        missing = size - self.size
+        if missing <= 0:
+            return
+        self.values.extend([NO_VALUE] * (missing * self.capacity))
+        self.times.extend([0.0] * (missing * self.capacity))
+        self.heads.extend([0] * missing)
+        self.counts.extend([0] * missing)
+
+    def reset(self, index: int) -> None:
+        self.heads[index] = 0
+        self.counts[index] = 0
+
+    def record(self, index: int, timestamp: float, value: int) -> None:
+        capacity = self.capacity
+        head = self.heads[index]
+        self.values[index * capacity + head] = value
+        self.times[index * capacity + head] = timestamp
+        self.heads[index] = (head + 1) % capacity
+        self.counts[index] = min(self.counts[index] + 1, capacity)
+
+    def rate(
+        self, index: int, since: float | None, max_value: int, min_samples: int = 3
+    ) -> float | None:
+        """
+        Скорость счета по показаниям начиная с since (время предыдущего
+        расчета, None - все показания буфера), шт/с.
+        Переполнение счетчика учитывается.
+        :return: None, если показание since вытеснено из буфера или показаний
+        меньше min_samples - по умолчанию трех, для двух точна разность.
+        """
+        capacity = self.capacity
+        start = index * capacity
+        count = self.counts[index]
+        first = self.heads[index] - count
+        if not count:
+            return None
+        if since is None:
+            since = self.times[start + first % capacity]
+        elif self.times[start + first % capacity] > since:
+            return None
+        times = []
+        values = []
+        previous = None
+        total = 0
+        for offset in range(count):
+            position = start + (first + offset) % capacity
+            timestamp = self.times[position]
+            if timestamp < since:
+                continue
+            value = self.values[position]
+            if previous is not None:
+                diff = value - previous
+                total += diff if diff >= 0 else max_value - previous + value
+            previous = value
+            times.append(timestamp)
+            values.append(total)
+        if len(times) < max(min_samples, 2):
+            return None
+        mean_time = sum(times) / len(times)
+        mean_value = sum(values) / len(values)
+        variance = sum((t - mean_time) ** 2 for t in times)
+        if variance <= 0:
+            return None
+        covariance = sum(
+            (t - mean_time) * (v - mean_value)
+            for t, v in zip(times, values, strict=True)
+        )
+        return covariance / variance
@@ -0,0 +1,75 @@
+import asyncio
+import importlib.util
+import logging
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from types import ModuleType
+
+logger = logging.getLogger(__name__)
+
+
+class SettingsReloader:
+    """
+    Отслеживает изменения файла настроек и применяет их без перезапуска.
+    Новый файл загружается в отдельный модуль, при ошибке загрузки
+    или применения продолжает действовать текущая конфигурация.
+    """
+
+    def __init__(self, module: ModuleType, interval: float = 2.0):
+        """
+        :param module: модуль настроек (app.settings),
+        :param interval: период проверки файла, с.
+        """
+        self.module = module
+        self.path = Path(module.__file__)
+        self.interval = interval
+        self.signature = self.stat()
+
+    def stat(self) -> tuple[int, int] | None:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def changed(self) -> bool:
+        signature = self.stat()
+        if signature is None or signature == self.signature:
+            return False
+        self.signature = signature
+        return True
+
+    def load(self) -> ModuleType:
+        spec = importlib.util.spec_from_file_location(self.module.__name__, self.path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    async def reload(self, apply: Callable[[ModuleType], Awaitable[None]]) -> bool:
+        """
+        Загружает и применяет файл настроек.
+        :return: True, если настройки применены.
+        """
+        try:
+            module = self.load()
+            await apply(module)
+        except Exception:
+            logger.exception(
+                'Не удалось применить настройки %s, действует прежняя конфигурация',
+                self.path,
+            )
+            return False
+        # остальные значения (POLL_DELAY и др.) читаются из модуля настроек
+        self.module.__dict__.update(
+            (key, value)
+            for key, value in vars(module).items()
+            if not key.startswith('__')
+        )
+        return True
+
+    async def watch(self, apply: Callable[[ModuleType], Awaitable[None]]) -> None:
+        logger.info('Отслеживаются изменения настроек %s', self.path)
+        while True:
+            await asyncio.sleep(self.interval)
+            if self.changed():
+                await self.reload(apply)
@@ -0,0 +1,166 @@
+import os
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from app.transport.tcp import parse_tcp_url
+
+try:
+    from termios import error as TermiosError
+except ImportError:  # Windows
+    TermiosError = OSError
+
+# ошибки порта: serial.SerialException - подкласс OSError, сброс буферов
+# отключенного адаптера поднимает termios.error
+PORT_ERRORS = (OSError, TermiosError)
+
+
+@dataclass(slots=True)
+class PortState:
+    online: bool = False
+    down_since: float | None = None  # начало недоступности порта
+    attempts: int = 0  # неудачные попытки открытия подряд
+    reopen_at: float = 0.0
+    losses: int = 0
+    recoveries: int = 0
+    last_error: str | None = None
+    last_recovery: float | None = None  # время восстановления, с
+    max_recovery: float = 0.0
+    total_downtime: float = 0.0
+
+
+class PortSupervisor:
+    """
+    Следит за портами шин: после ошибки ввода-вывода или исчезновения
+    устройства (переподключение USB-RS485) опрос шины приостанавливается,
+    порт открывается заново с нарастающим интервалом от min_interval
+    до max_interval, время восстановления измеряется.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 0.25,
+        max_interval: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param min_interval: интервал первой повторной попытки открытия, с,
+        :param max_interval: максимальный интервал между попытками, с,
+        :param clock: источник времени.
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.clock = clock
+        self.states: dict[str, PortState] = {}
+
+    def state(self, bus: str) -> PortState:
+        if (state := self.states.get(bus)) is None:
+            state = self.states[bus] = PortState()
+        return state
+
+    def remove(self, bus: str) -> None:
+        self.states.pop(bus, None)
+
+    def can_open(self, bus: str) -> bool:
+        state = self.state(bus)
+        return not state.online and self.clock() >= state.reopen_at
+
+    def delay(self, bus: str) -> float:
+        """
+        Время до следующей попытки открытия порта, с.
+        """
+        return max(self.state(bus).reopen_at - self.clock(), 0.0)
+
+    def backoff(self, attempts: int) -> float:
+        return min(self.min_interval * 2 ** max(attempts - 1, 0), self.max_interval)
+
+    def lost(self, bus: str, err: Exception | str) -> None:
+        """
+        Порт потерян: потеря считается неудачной попыткой, следующая
+        попытка открытия - с нарастающим интервалом от числа попыток.
+        """
+        now = self.clock()
+        state = self.state(bus)
+        state.losses += 1
+        state.online = False
+        state.down_since = now
+        state.attempts += 1
+        state.reopen_at = now + self.backoff(state.attempts)
+        state.last_error = str(err)
+
+    def open_failed(self, bus: str, err: Exception) -> float:
+        """
+        :return: интервал до следующей попытки открытия, с.
+        """
+        now = self.clock()
+        state = self.state(bus)
+        if state.down_since is None:
+            state.down_since = now
+        state.attempts += 1
+        interval = self.backoff(state.attempts)
+        state.reopen_at = now + interval
+        state.last_error = str(err)
+        return interval
+
+    def opened(self, bus: str) -> float | None:
+        """
+        Порт открыт.
+        :return: время восстановления после потери порта, с.
+        """
+        now = self.clock()
+        state = self.state(bus)
+        recovery = None
+        if state.down_since is not None and state.losses > state.recoveries:
+            recovery = now - state.down_since
+            state.recoveries += 1
+            state.last_recovery = recovery
+            state.max_recovery = max(state.max_recovery, recovery)
+            state.total_downtime += recovery
+        state.online = True
+        state.down_since = None
+        state.attempts = 0
+        return recovery
+
+    def report(self) -> dict[str, dict[str, Any]]:
+        now = self.clock()
+        return {
+            bus: {
+                'online': state.online,
+                'down_for': None
+                if state.down_since is None
+                else now - state.down_since,
+                'attempts': state.attempts,
+                'losses': state.losses,
+                'recoveries': state.recoveries,
+                'last_recovery': state.last_recovery,
+                'max_recovery': state.max_recovery,
+                'total_downtime': state.total_downtime,
+                'last_error': state.last_error,
+            }
+            for bus, state in self.states.items()
+        }
+
+
+def device_present(serial_settings: dict[str, Any]) -> bool:
+    """
+    Проверяет наличие файла устройства локального порта.
+    Для шлюзов tcp:// и воспроизведения журнала всегда True.
+    """
+    if not serial_settings or serial_settings.get('replay'):
+        return True
+    port = str(serial_settings.get('port') or '')
+    if not port or parse_tcp_url(port) or '://' in port:
+        return True
+    return os.path.exists(port)
+
+
+def port_error(results: list[Any]) -> Exception | None:
+    """
+    Ошибка порта (не таймаут устройства) в результатах пакетного чтения.
+    """
+    for result in results:
+        err = result.error
+        if isinstance(err, PORT_ERRORS) and not isinstance(err, TimeoutError):
+            return err
+    return None
@@ -0,0 +1,1058 @@
+import asyncio
+import importlib.util
+import logging
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+from app.alarms.engine import build_rules
+from app.benchmarks.environment import install_module
+from app.dummy.emulator import EmulatedCI8, OwenBusEmulator
+from app.dummy.gateway import EmulatedGateway
+from app.dummy.serial_port import EmulatedSerialPort
+from app.owen_counter.exeptions import ImproperlyConfiguredError
+from app.owen_counter.owen_ci8 import OwenCI8, ReadResult
+from app.transport.ports import open_serial
+
+from .baudrate import probe_baudrates
+from .capacity import CapacityPlanner
+from .demand import DemandTracker
+from .error_log import ErrorAggregator, RateLimitedLog
+from .exeptions import GroupNotFound
+from .groups import GroupAggregates, resolve_groups
+from .registry import (
+    ERROR,
+    NO_VALUE,
+    OK,
+    TIMEOUT,
+    RateWindow,
+    RecentSamples,
+    SensorRegistry,
+)
+from .reloader import SettingsReloader
+from .supervisor import PortSupervisor
+from .timeseries import CompressedHistory, decode_series
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestErrorAggregator(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.logger = logging.getLogger('test_error_log')
+        self.errors = ErrorAggregator(
+            self.logger, summary_interval=120, clock=self.clock
+        )
+
+    def test_first_failure_logged_and_repeats_aggregated(self):
+        """Тестируем запись первой ошибки и подавление повторов до сводки."""
+        with self.assertLogs(self.logger, level=logging.ERROR) as logs:
+            for _ in range(241):
+                self.errors.failure('s10', 'timeout', 'Сенсор %s не ответил', 's10')
+                self.clock.now += 0.5
+        self.assertEqual(2, len(logs.records))
+        self.assertEqual('Сенсор s10 не ответил', logs.records[0].getMessage())
+        self.assertEqual(
+            's10: 240 x timeout за последние 120 с', logs.records[1].getMessage()
+        )
+
+    def test_summary_groups_error_kinds(self):
+        """Тестируем сводку по нескольким видам ошибок."""
+        self.errors.failure('s10', 'timeout', 'first')
+        with self.assertLogs(self.logger, level=logging.ERROR) as logs:
+            self.errors.failure('s10', 'timeout', 'ignored')
+            self.errors.failure('s10', 'PacketDecodeError', 'ignored')
+            self.clock.now = 121
+            self.errors.failure('s10', 'timeout', 'ignored')
+        self.assertEqual(
+            's10: 2 x timeout, 1 x PacketDecodeError за последние 121 с',
+            logs.records[0].getMessage(),
+        )
+
+    def test_recovery_logged_once(self):
+        """Тестируем сообщение о восстановлении источника."""
+        self.errors.failure('s10', 'timeout', 'first')
+        self.errors.failure('s10', 'timeout', 'second')
+        self.clock.now = 30
+        with self.assertLogs(self.logger, level=logging.INFO) as logs:
+            self.errors.success('s10')
+            self.errors.success('s10')
+        self.assertEqual(
+            ['s10: восстановлен после 2 ошибок за 30 с'],
+            [record.getMessage() for record in logs.records],
+        )
+        self.assertFalse(self.errors.is_failing('s10'))
+
+    def test_rate_limited_log_keeps_no_state_per_key(self):
+        """Тестируем ограничение частоты сообщений без хранения ключей."""
+        log = RateLimitedLog(self.logger, interval=120, clock=self.clock)
+        with self.assertLogs(self.logger, level=logging.ERROR) as logs:
+            for step in range(241):
+                log.error('Device %s not found', f'typo{step}')
+                self.clock.now += 0.5
+        self.assertEqual(
+            [
+                'Device typo0 not found',
+                'Device typo240 not found (еще 239 сообщений за 120 с подавлено)',
+            ],
+            [record.getMessage() for record in logs.records],
+        )
+
+
+class TestDemandTracker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.demand = DemandTracker(window=60, keepalive_interval=30, clock=self.clock)
+        self.sensors = [SimpleNamespace(name=name) for name in ('s1', 's2', 's3')]
+
+    def select(self) -> list[str]:
+        return [sensor.name for sensor in self.demand.select(self.sensors)]
+
+    def test_unobserved_sensors_polled_at_keepalive_rate(self):
+        """Тестируем опрос невостребованных сенсоров раз в keepalive_interval."""
+        self.assertEqual(['s1', 's2', 's3'], self.select())
+        self.clock.now = 10
+        self.assertEqual([], self.select())
+        self.clock.now = 30
+        self.assertEqual(['s1', 's2', 's3'], self.select())
+
+    def test_requested_sensor_polled_every_cycle(self):
+        """Тестируем опрос востребованного сенсора в каждом цикле."""
+        self.select()
+        self.clock.now = 1
+        self.assertEqual(['s2'], self.demand.touch(['s2']))
+        self.assertEqual([], self.demand.touch(['s2']))
+        for now in (1, 2, 3):
+            self.clock.now = now
+            self.assertEqual(['s2'], self.select())
+
+    def test_interest_expires_after_window(self):
+        """Тестируем возврат к редкому опросу после окончания интереса."""
+        self.demand.touch(['s1'])
+        self.select()
+        self.clock.now = 59
+        self.assertEqual(['s1', 's2', 's3'], self.select())
+        self.clock.now = 62
+        self.assertEqual([], self.select())
+        self.assertEqual(['s1'], self.demand.touch(['s1']))
+
+
+class TestSettingsReloader(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / 'settings.py'
+        self.write("sensors_settings = [{'name': 's1'}]\nPOLL_DELAY = 0.5\n")
+        spec = importlib.util.spec_from_file_location('test_settings', self.path)
+        self.module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.module)
+        self.reloader = SettingsReloader(self.module, interval=0)
+        self.applied = []
+
+    def write(self, text: str) -> None:
+        self.path.write_text(text)
+        # mtime меняется не чаще такта файловой системы
+        stat = self.path.stat()
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    async def apply(self, module) -> None:
+        if not module.sensors_settings:
+            raise ValueError('Нет сенсоров')
+        self.applied.append([item['name'] for item in module.sensors_settings])
+
+    def reload(self) -> bool:
+        return asyncio.run(self.reloader.reload(self.apply))
+
+    def test_changed_file_applied(self):
+        """Тестируем применение измененного файла настроек."""
+        self.assertFalse(self.reloader.changed())
+        self.write(
+            "sensors_settings = [{'name': 's1'}, {'name': 's2'}]\nPOLL_DELAY = 1\n"
+        )
+        self.assertTrue(self.reloader.changed())
+        self.assertFalse(self.reloader.changed())
+        self.assertTrue(self.reload())
+        self.assertEqual([['s1', 's2']], self.applied)
+        self.assertEqual(1, self.module.POLL_DELAY)
+
+    def test_invalid_settings_keep_configuration(self):
+        """Тестируем сохранение конфигурации при ошибке в новом файле."""
+        for text in ('sensors_settings = [', 'sensors_settings = []\nPOLL_DELAY = 1\n'):
+            self.write(text)
+            with self.assertLogs('app.owen_poller.reloader', level=logging.ERROR):
+                self.assertFalse(self.reload())
+        self.assertEqual([], self.applied)
+        self.assertEqual([{'name': 's1'}], self.module.sensors_settings)
+        self.assertEqual(0.5, self.module.POLL_DELAY)
+
+
+class TestApplySettings(unittest.TestCase):
+    def sensor(self, name: str, addr: int, **extra) -> dict:
+        return {
+            'name': name,
+            'driver': OwenCI8,
+            'addr': addr,
+            'addr_len': 8,
+            'parameter': OwenCI8.DCNT,
+            **extra,
+        }
+
+    def test_invalid_sensor_keeps_configuration(self):
+        """Тестируем неизменность конфигурации при ошибке в настройках сенсора."""
+        module = install_module([self.sensor('s1', 1), self.sensor('s2', 2)])
+        module.groups_settings = {'line1': ['s1', 's2']}
+        from .owen_poller import SensorsPoller
+
+        poller = SensorsPoller()
+        self.addCleanup(poller.close)
+        module.buses_settings = {'line2': {}}
+        module.groups_settings = {'line2': ['s3']}
+        invalid = (
+            self.sensor('s3', 300, bus='line2'),
+            {'name': 's3', 'addr': 3, 'addr_len': 8, 'parameter': OwenCI8.DCNT},
+        )
+        for sensor_settings in invalid:
+            module.sensors_settings = [self.sensor('s1', 1), sensor_settings]
+            with self.assertRaises(ImproperlyConfiguredError):
+                asyncio.run(poller.apply_settings(module))
+            self.assertEqual(['s1', 's2'], list(poller.sensors))
+            self.assertEqual(['default'], list(poller.ports))
+            self.assertIn('line1', poller.registry.groups)
+        module.sensors_settings = [
+            self.sensor('s1', 1),
+            self.sensor('s3', 3, bus='line2'),
+        ]
+        asyncio.run(poller.apply_settings(module))
+        self.assertEqual(['s1', 's3'], list(poller.sensors))
+        self.assertEqual(['default', 'line2'], list(poller.ports))
+        self.assertIn('line2', poller.registry.groups)
+
+    def test_unavailable_new_port_does_not_block_reload(self):
+        """Тестируем применение настроек при недоступном порте новой шины."""
+        module = install_module([self.sensor('s1', 1)], poll_delay=0.02)
+        module.BUS_REOPEN_MIN_INTERVAL = 0.02
+        from .owen_poller import SensorsPoller
+
+        async def reload(poller: SensorsPoller) -> dict:
+            task = asyncio.create_task(poller.poll())
+            try:
+                await poller.apply_settings(module)
+                await asyncio.sleep(0.1)
+                return poller.supervisor.report()['line2']
+            finally:
+                task.cancel()
+                poller.close()
+
+        poller = SensorsPoller()
+        module.buses_settings = {'line2': {'port': '/nonexistent/ttyOWEN'}}
+        module.sensors_settings = [
+            self.sensor('s1', 1),
+            self.sensor('s2', 2),
+            self.sensor('s3', 3, bus='line2'),
+        ]
+        module.groups_settings = {'line1': ['s1', 's2']}
+        with self.assertLogs('app.owen_poller.owen_poller', level=logging.INFO):
+            report = asyncio.run(reload(poller))
+        self.assertEqual(['s1', 's2', 's3'], list(poller.sensors))
+        self.assertIn('line1', poller.registry.groups)
+        self.assertFalse(report['online'])
+        self.assertGreaterEqual(report['attempts'], 1)
+
+
+class TestRateReadings(unittest.TestCase):
+    def test_aggregator_requests_use_own_window(self):
+        """Тестируем расчет скорости для агрегатора в отдельном окне."""
+        install_module(
+            [
+                {
+                    'name': 's1',
+                    'driver': OwenCI8,
+                    'addr': 1,
+                    'addr_len': 8,
+                    'parameter': OwenCI8.DCNT,
+                }
+            ]
+        )
+        from .owen_poller import SensorsPoller
+
+        poller = SensorsPoller()
+        self.addCleanup(poller.close)
+        sensor = poller.sensors['s1']
+        sensor.serial = OwenBusEmulator([EmulatedCI8(addr=1, pcs_per_min=6000)])
+        poller.poll_cycle([sensor])
+        self.assertIsNone(poller.get_list_readings(['s1'])[0]['value'])
+        time.sleep(0.01)
+        poller.poll_cycle([sensor])
+        with self.assertNoLogs('app.owen_poller.owen_poller', level=logging.ERROR):
+            peer = poller.get_list_readings(['s1', 's9'], local=True)
+        self.assertEqual(['OK', 'NOT FOUND'], [item['status'] for item in peer])
+        (direct,) = poller.get_list_readings(['s1'])
+        self.assertIsNotNone(direct['value'])
+        with self.assertLogs('app.owen_poller.owen_poller', level=logging.ERROR):
+            poller.get_list_readings(['s9'])
+
+    def test_repeated_query_keeps_known_sensor(self):
+        """Тестируем повторный запрос до следующего опроса."""
+        install_module(
+            [
+                {
+                    'name': 's1',
+                    'driver': OwenCI8,
+                    'addr': 1,
+                    'addr_len': 8,
+                    'parameter': OwenCI8.DCNT,
+                }
+            ]
+        )
+        from app.federation.aggregator import merge
+
+        from .owen_poller import SensorsPoller
+
+        poller = SensorsPoller()
+        self.addCleanup(poller.close)
+        sensor = poller.sensors['s1']
+        sensor.serial = OwenBusEmulator([EmulatedCI8(addr=1, pcs_per_min=6000)])
+        poller.poll_cycle([sensor])
+        time.sleep(0.01)
+        poller.poll_cycle([sensor])
+        poller.get_list_readings(['s1'])
+        with self.assertNoLogs('app.owen_poller.owen_poller', level=logging.ERROR):
+            local = poller.get_list_readings(['s1'], report_missing=False)
+        self.assertEqual(
+            [('s1', 'OK', None)],
+            [(item['sensor'], item['status'], item['value']) for item in local],
+        )
+        peer = [{'sensor': 's1', 'value': None, 'status': 'NOT FOUND'}]
+        (merged,) = merge(['s1'], [(None, local), ('http://peer', peer)])
+        self.assertEqual((None, 'OK'), (merged['peer'], merged['status']))
+
+
+class TestSensorRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = SensorRegistry()
+        self.rates = RateWindow(self.registry)
+        self.indexes = [self.registry.allocate(f's{i}') for i in range(3)]
+
+    def test_store_results(self):
+        """Тестируем запись статуса, значения и счетчиков ошибок."""
+        index = self.indexes[1]
+        self.registry.store(index, ReadResult.OK, 10)
+        self.registry.store(index, ReadResult.TIMEOUT)
+        self.assertEqual(TIMEOUT, self.registry.statuses[index])
+        self.registry.store(index, ReadResult.ERROR)
+        self.assertEqual(10, self.registry.values[index])
+        self.assertEqual(ERROR, self.registry.statuses[index])
+        self.assertEqual(2, self.registry.consecutive_errors[index])
+        self.registry.store(index, ReadResult.OK, 12)
+        self.assertEqual(OK, self.registry.statuses[index])
+        self.assertEqual(2, self.registry.errors[index])
+        self.assertEqual(0, self.registry.consecutive_errors[index])
+        self.assertEqual(NO_VALUE, self.registry.values[self.indexes[0]])
+
+    def test_released_index_reused_and_cleared(self):
+        """Тестируем повторное использование освобожденного индекса."""
+        index = self.indexes[0]
+        self.registry.store(index, ReadResult.TIMEOUT)
+        self.registry.store(index, ReadResult.OK, 5)
+        self.rates.advance(index)
+        self.registry.release(index)
+        self.assertEqual(index, self.registry.allocate('s9'))
+        self.assertEqual(3, len(self.registry))
+        self.assertEqual(NO_VALUE, self.registry.values[index])
+        self.assertEqual(0, self.registry.errors[index])
+        self.assertFalse(self.rates.has_previous(index))
+        self.assertEqual(index, self.registry.index['s9'])
+
+    def test_window_extended_with_registry(self):
+        """Тестируем окно скорости для сенсоров, добавленных позже."""
+        index = self.registry.allocate('s3')
+        self.registry.store(index, ReadResult.OK, 100)
+        self.rates.advance(index)
+        self.registry.times[index] += 30
+        self.registry.values[index] = 160
+        self.assertEqual(30, self.rates.duration(index))
+        self.assertEqual(100, self.rates.values[index])
+
+
+class TestRecentSamples(unittest.TestCase):
+    def setUp(self):
+        self.registry = SensorRegistry(recent=RecentSamples(capacity=8))
+        self.recent = self.registry.recent
+        self.index = self.registry.allocate('s1')
+
+    def store(self, timestamp: float, value: int) -> None:
+        self.registry.stamp()
+        self.registry.store(self.index, ReadResult.OK, value, timestamp)
+
+    def test_timestamp_shifts_reading_time(self):
+        """Тестируем запись времени обмена вместо времени записи пакета."""
+        self.registry.stamp()
+        timestamp = self.registry.now - 0.5
+        self.registry.store(self.index, ReadResult.OK, 10, timestamp)
+        self.assertEqual(timestamp, self.registry.times[self.index])
+        self.assertAlmostEqual(
+            self.registry.wall_now - 0.5, self.registry.wall_times[self.index]
+        )
+
+    def test_least_squares_rate_with_jitter(self):
+        """Тестируем скорость по окну показаний при неравномерном опросе."""
+        # 10 шт/с, показание снято в середине обмена, запись пакета - позже
+        jitter = [0.0, 0.3, -0.2, 0.25, -0.3, 0.1]
+        for step, shift in enumerate(jitter):
+            self.store(100 + step + shift, 1000 + round((step + shift) * 10))
+        rate = self.recent.rate(self.index, 100.0, OwenCI8.MAX_VALUE)
+        self.assertAlmostEqual(10.0, rate, delta=0.05)
+
+    def test_overflow_unwrapped(self):
+        """Тестируем учет переполнения счетчика."""
+        for step in range(1, 5):
+            self.store(step, (OwenCI8.MAX_VALUE - 10 + step * 10) % OwenCI8.MAX_VALUE)
+        self.assertAlmostEqual(
+            10.0, self.recent.rate(self.index, 1.0, OwenCI8.MAX_VALUE)
+        )
+
+    def test_no_rate_without_anchor(self):
+        """Тестируем отказ от расчета без показания начала окна."""
+        for step in range(1, 11):
+            self.store(step, step * 10)
+        # показание t=1 вытеснено из буфера
+        self.assertIsNone(self.recent.rate(self.index, 1.0, OwenCI8.MAX_VALUE))
+        # меньше трех показаний - скорость по разности
+        self.assertIsNone(self.recent.rate(self.index, 9.0, OwenCI8.MAX_VALUE))
+        self.assertAlmostEqual(
+            10.0, self.recent.rate(self.index, 5.0, OwenCI8.MAX_VALUE)
+        )
+        self.registry.clear(self.index)
+        self.assertIsNone(self.recent.rate(self.index, 5.0, OwenCI8.MAX_VALUE))
+
+
+class TestCompressedHistory(unittest.TestCase):
+    def setUp(self):
+        self.registry = SensorRegistry(
+            archive=CompressedHistory(capacity=20, interval=0.5, block_size=8)
+        )
+        self.archive = self.registry.archive
+        self.index = self.registry.allocate('s1')
+
+    def record(self, samples: list[tuple[float, int]]) -> None:
+        for wall_time, value in samples:
+            self.archive.record(self.index, wall_time, value)
+
+    def decode(self, start: float | None = None, end: float | None = None) -> list:
+        return list(decode_series(*self.archive.snapshot(self.index), start, end))
+
+    def test_round_trip(self):
+        """Тестируем восстановление отсчетов с пропусками и переполнением."""
+        samples = [
+            (1000.0, 5),
+            (1000.5, 7),
+            (1001.0, NO_VALUE),
+            (1001.503, 9),
+            (1002.01, OwenCI8.MAX_VALUE),
+            (1002.6, 0),
+            (1004.75, 3),
+            (1005.25, 2**40),
+            (1005.75, 2**40),
+            (1006.25, 1),
+        ]
+        self.record(samples)
+        self.assertEqual(samples, self.decode())
+        self.assertEqual([8], self.archive.series[self.index].counts)
+
+    def test_interval_and_retention(self):
+        """Тестируем прореживание по interval и удаление старых блоков."""
+        self.record([(1000 + step * 0.25, step) for step in range(100)])
+        values = [value for _, value in self.decode()]
+        # не меньше capacity последних отсчетов, удаляются блоки целиком
+        self.assertEqual(list(range(48, 100, 2)), values)
+        self.assertEqual(26, self.archive.stats()['samples'])
+        self.registry.release(self.index)
+        self.assertEqual([], self.decode())
+
+    def test_range_seek(self):
+        """Тестируем выборку интервала [start, end) с пропуском блоков."""
+        self.archive.capacity = 1000
+        self.record([(1000 + step * 0.5, step) for step in range(100)])
+        # равномерный опрос: байт времени и байт разности значения,
+        # начало блока - несколько байт
+        self.assertLess(self.archive.stats()['bytes_per_sample'], 2.5)
+        samples = self.decode(start=1020.2, end=1030)
+        self.assertEqual(list(range(41, 60)), [value for _, value in samples])
+        self.assertEqual([], self.decode(start=1100))
+        self.assertEqual([(1049.5, 99)], self.decode(start=1049.5))
+
+    def test_recorded_by_registry(self):
+        """Тестируем запись результатов опроса в длительную историю."""
+        for step in range(1, 4):
+            self.registry.stamp()
+            self.registry.store(self.index, ReadResult.OK, step * 10, timestamp=step)
+        self.registry.stamp()
+        self.registry.store(self.index, ReadResult.TIMEOUT, timestamp=4)
+        values = [value for _, value in self.decode()]
+        self.assertEqual([10, 20, 30, NO_VALUE], values)
+
+
+def bus_sensor(
+    name: str, status: str = ReadResult.OK, interval: float | None = None
+) -> SimpleNamespace:
+    return SimpleNamespace(
+        name=name, parameter_hash=OwenCI8.DCNT, status=status, interval=interval
+    )
+
+
+class TestCapacityPlanner(unittest.TestCase):
+    serial_settings = {'baudrate': 9600, 'timeout': 0.2}
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.planner = CapacityPlanner(turnaround=0.02, clock=self.clock)
+
+    def test_transaction_time(self):
+        """Тестируем время транзакции по длинам пакетов и скорости шины."""
+        # запрос 14 символов, ответ DCNT 22, DTMR 28, символ 8N1 - 10 бит
+        cases = [
+            (OwenCI8.DCNT, False, 36 * 10 / 9600 + 0.02),
+            (OwenCI8.DTMR, False, 42 * 10 / 9600 + 0.02),
+            (OwenCI8.DCNT, True, 14 * 10 / 9600 + 0.2),
+        ]
+        for parameter_hash, timed_out, expected in cases:
+            with self.subTest(parameter_hash=parameter_hash, timed_out=timed_out):
+                self.assertAlmostEqual(
+                    expected,
+                    self.planner.transaction_time(
+                        self.serial_settings, parameter_hash, 0.02, timed_out
+                    ),
+                )
+        even_parity = {'baudrate': 19200, 'parity': 'E', 'stopbits': 2}
+        self.assertAlmostEqual(
+            36 * 12 / 19200,
+            self.planner.transaction_time(even_parity, OwenCI8.DCNT, 0.0),
+        )
+
+    def test_oversubscribed_bus_intervals_stretched(self):
+        """Тестируем увеличение периодов опроса переподписанной шины."""
+        sensors = [bus_sensor(f's{i}') for i in range(7)]
+        plan = self.planner.plan('default', self.serial_settings, sensors, 0.5)
+        self.assertFalse(plan.oversubscribed)
+        self.assertEqual(0.5, plan.intervals['s0'])
+        sensors += [bus_sensor('lost', ReadResult.TIMEOUT), bus_sensor('s8', None, 5)]
+        with self.assertLogs('app.owen_poller.capacity', logging.WARNING):
+            plan = self.planner.plan('default', self.serial_settings, sensors, 0.5)
+        utilization = 7 * 0.0575 / 0.5 + (14 / 960 + 0.2) / 0.5 + 0.0575 / 5
+        self.assertAlmostEqual(utilization, plan.utilization)
+        scale = utilization / 0.9
+        self.assertAlmostEqual(0.5 * scale, plan.intervals['s0'])
+        self.assertAlmostEqual(5 * scale, plan.intervals['s8'])
+        self.assertEqual(['lost'], plan.timed_out)
+        report = self.planner.report()['default']
+        self.assertTrue(report['oversubscribed'])
+        self.assertAlmostEqual(1 / 0.0575, report['max_rate'])
+        self.assertAlmostEqual(16.2, report['demand_rate'])
+
+    def test_turnaround_measured(self):
+        """Тестируем уточнение задержки ответа по длительности обменов."""
+        planner = CapacityPlanner(turnaround=0.02, smoothing=0.5)
+        result = ReadResult(OwenCI8(addr=1), OwenCI8.DCNT, duration=22 / 960 + 0.01)
+        failed = ReadResult(OwenCI8(addr=2), OwenCI8.DCNT, status=ReadResult.TIMEOUT)
+        planner.observe('default', self.serial_settings, [result, failed])
+        self.assertAlmostEqual(0.015, planner.turnarounds['default'])
+
+    def test_select_due_sensors(self):
+        """Тестируем выбор сенсоров по назначенным периодам опроса."""
+        sensors = [bus_sensor('s1'), bus_sensor('s2', interval=2)]
+        self.planner.plan('default', self.serial_settings, sensors, 0.5)
+        self.assertEqual(sensors, self.planner.select('default', sensors))
+        self.assertEqual(0.5, self.planner.next_due('default', sensors, 0.5))
+        self.clock.now = 0.5
+        self.assertEqual([sensors[0]], self.planner.select('default', sensors))
+        self.clock.now = 2
+        self.assertEqual(sensors, self.planner.select('default', sensors))
+        self.assertEqual(0.5, self.planner.next_due('default', [], 0.5))
+
+
+class TestBusIsolation(unittest.TestCase):
+    def setUp(self):
+        self.gateway = EmulatedGateway(
+            OwenBusEmulator([EmulatedCI8(addr=1), EmulatedCI8(addr=2)])
+        ).start()
+        self.addCleanup(self.gateway.stop)
+        sensors_settings = [
+            {
+                'name': f's{addr}',
+                'driver': OwenCI8,
+                'addr': addr,
+                'addr_len': 8,
+                'parameter': OwenCI8.DCNT,
+                'bus': bus,
+            }
+            for addr, bus in ((1, 'gateway'), (2, 'gateway'), (3, 'default'))
+        ]
+        module = install_module(
+            sensors_settings, {'port': '/dev/ttyOWEN-missing'}, poll_delay=0.02
+        )
+        module.buses_settings = {'gateway': {'port': self.gateway.url}}
+
+    def test_missing_port_does_not_stop_other_buses(self):
+        """Тестируем опрос шины при недоступном порте другой шины."""
+        from .owen_poller import SensorsPoller
+
+        async def poll() -> SensorsPoller:
+            poller = SensorsPoller()
+            self.assertEqual({'default': None, 'gateway': None}, poller.ports)
+            task = asyncio.create_task(poller.poll())
+            await asyncio.sleep(0.3)
+            task.cancel()
+            poller.close()
+            return poller
+
+        with self.assertLogs(
+            'app.owen_poller.owen_poller', level=logging.ERROR
+        ) as logs:
+            poller = asyncio.run(poll())
+        self.assertIsInstance(poller.sensors['s1'].reading.value, int)
+        self.assertIsInstance(poller.sensors['s2'].reading.value, int)
+        self.assertIsNone(poller.sensors['s3'].reading.value)
+        # повторные попытки открыть порт не чаще BUS_REOPEN_INTERVAL
+        self.assertEqual(1, len(logs.records))
+        self.assertIn('default', logs.records[0].getMessage())
+
+
+class TestPortSupervisor(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.supervisor = PortSupervisor(
+            min_interval=0.25, max_interval=2, clock=self.clock
+        )
+
+    def test_backoff_bounded(self):
+        """Тестируем нарастающий интервал повторного открытия."""
+        intervals = [
+            self.supervisor.open_failed('default', OSError('нет порта'))
+            for _ in range(6)
+        ]
+        self.assertEqual([0.25, 0.5, 1, 2, 2, 2], intervals)
+        self.assertFalse(self.supervisor.can_open('default'))
+        self.clock.now = 2
+        self.assertTrue(self.supervisor.can_open('default'))
+        # порт при запуске не был потерян - времени восстановления нет
+        self.assertIsNone(self.supervisor.opened('default'))
+
+    def test_time_to_recover(self):
+        """Тестируем измерение времени восстановления после потери порта."""
+        self.supervisor.opened('default')
+        self.clock.now = 10
+        self.supervisor.lost('default', OSError('Input/output error'))
+        self.clock.now = 10.25
+        self.assertTrue(self.supervisor.can_open('default'))
+        self.supervisor.open_failed('default', OSError('нет порта'))
+        self.clock.now = 11.5
+        self.assertEqual(1.5, self.supervisor.opened('default'))
+        report = self.supervisor.report()['default']
+        self.assertEqual(
+            (1, 1, 1.5),
+            (report['losses'], report['recoveries'], report['max_recovery']),
+        )
+        self.assertTrue(report['online'])
+
+
+class TestPortRecovery(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / 'ttyOWEN'
+        self.bus = OwenBusEmulator([EmulatedCI8(addr=1, pcs_per_min=6000)])
+        sensors_settings = [
+            {
+                'name': 's1',
+                'driver': OwenCI8,
+                'addr': 1,
+                'addr_len': 8,
+                'parameter': OwenCI8.DCNT,
+            }
+        ]
+        module = install_module(
+            sensors_settings,
+            {'port': str(self.path), 'baudrate': 115200, 'timeout': 0.05},
+            poll_delay=0.02,
+        )
+        # обмен с pty без задержки ответа, опрос укладывается в poll_delay
+        module.BUS_TURNAROUND = 0
+        module.BUS_REOPEN_MIN_INTERVAL = 0.02
+        module.BUS_REOPEN_INTERVAL = 0.1
+
+    def test_reconnect_after_adapter_loss(self):
+        """Тестируем повторное открытие порта после отключения адаптера."""
+        from .owen_poller import SensorsPoller
+
+        async def wait_reading(poller: SensorsPoller, after: float) -> None:
+            while (poller.sensors['s1'].reading.value or 0) <= after:
+                await asyncio.sleep(0.01)
+
+        async def poll() -> dict:
+            port = EmulatedSerialPort(self.bus, self.path).start()
+            poller = SensorsPoller()
+            task = asyncio.create_task(poller.poll())
+            try:
+                await asyncio.wait_for(wait_reading(poller, 0), 2)
+                port.stop()
+                await asyncio.sleep(0.3)
+                self.assertIsNone(poller.ports['default'])
+                value = poller.sensors['s1'].reading.value
+                port = EmulatedSerialPort(self.bus, self.path).start()
+                await asyncio.wait_for(wait_reading(poller, value), 2)
+                return poller.supervisor.report()['default']
+            finally:
+                task.cancel()
+                poller.close()
+                port.stop()
+
+        with self.assertLogs('app.owen_poller.owen_poller', level=logging.INFO) as logs:
+            report = asyncio.run(poll())
+        self.assertEqual((1, 1), (report['losses'], report['recoveries']))
+        # недоступность - время ожидания до нового порта и не более интервала
+        self.assertGreaterEqual(report['last_recovery'], 0.3)
+        self.assertLess(report['last_recovery'], 0.3 + 0.5)
+        messages = [record.getMessage() for record in logs.records]
+        self.assertTrue(any('порт потерян' in message for message in messages))
+        self.assertTrue(any('порт восстановлен' in message for message in messages))
+
+    def test_offline_alarm_raised_after_port_loss(self):
+        """Тестируем тревогу по связи с duration при потерянном порте."""
+        from .owen_poller import SensorsPoller
+
+        async def poll() -> tuple[list[dict], str]:
+            port = EmulatedSerialPort(self.bus, self.path).start()
+            poller = SensorsPoller()
+            poller.set_alarms(
+                build_rules(
+                    [
+                        {
+                            'name': 'offline',
+                            'sensors': ['s1'],
+                            'metric': 'offline',
+                            'op': '==',
+                            'threshold': 1,
+                            'duration': 0.3,
+                        }
+                    ],
+                    poller.sensors,
+                    [],
+                )
+            )
+            task = asyncio.create_task(poller.poll())
+            try:
+                while poller.sensors['s1'].reading.value is None:
+                    await asyncio.sleep(0.01)
+                port.stop()
+                await asyncio.sleep(0.15)
+                self.assertEqual([], poller.get_alarms())
+                await asyncio.sleep(0.4)
+                return poller.get_alarms(), poller.sensors['s1'].status
+            finally:
+                task.cancel()
+                poller.close()
+                port.stop()
+
+        with self.assertLogs('app.owen_poller.owen_poller', level=logging.INFO) as logs:
+            alarms, status = asyncio.run(poll())
+        self.assertEqual(['offline'], [alarm['rule'] for alarm in alarms])
+        self.assertEqual(ReadResult.ERROR, status)
+        messages = [record.getMessage() for record in logs.records]
+        self.assertTrue(any('Тревога offline (s1): raised' in m for m in messages))
+
+
+class TestRefusedGateway(unittest.TestCase):
+    def setUp(self):
+        # адрес остановленного шлюза: подключение отклоняется
+        gateway = EmulatedGateway(OwenBusEmulator([EmulatedCI8(addr=1)])).start()
+        gateway.stop()
+        sensors_settings = [
+            {
+                'name': 's1',
+                'driver': OwenCI8,
+                'addr': 1,
+                'addr_len': 8,
+                'parameter': OwenCI8.DCNT,
+            }
+        ]
+        module = install_module(
+            sensors_settings, {'port': gateway.url, 'timeout': 0.05}, poll_delay=0.02
+        )
+        module.BUS_REOPEN_MIN_INTERVAL = 0.05
+        module.BUS_REOPEN_INTERVAL = 0.4
+
+    def test_unreachable_gateway_backs_off(self):
+        """Тестируем недоступный шлюз: без ложных восстановлений, с паузами."""
+        from .owen_poller import SensorsPoller
+
+        async def poll() -> dict:
+            poller = SensorsPoller()
+            task = asyncio.create_task(poller.poll())
+            try:
+                await asyncio.sleep(1.2)
+                return poller.supervisor.report()['default']
+            finally:
+                task.cancel()
+                poller.close()
+
+        with self.assertLogs('app.owen_poller.owen_poller', level=logging.INFO) as logs:
+            report = asyncio.run(poll())
+        self.assertFalse(report['online'])
+        self.assertEqual((0, 0), (report['losses'], report['recoveries']))
+        # попытки через 0.05, 0.1, 0.2, 0.4, 0.4 с: не больше 6 за 1.2 с
+        self.assertGreaterEqual(report['attempts'], 4)
+        self.assertLessEqual(report['attempts'], 6)
+        messages = [record.getMessage() for record in logs.records]
+        self.assertFalse(any('восстановлен' in message for message in messages))
+
+
+def probe_sensors(*addrs: int) -> list[SimpleNamespace]:
+    return [
+        SimpleNamespace(
+            name=f's{addr}', device=OwenCI8(addr=addr), parameter_hash=OwenCI8.DCNT
+        )
+        for addr in addrs
+    ]
+
+
+class TestBaudProbe(unittest.TestCase):
+    rates = (9600, 19200, 38400, 57600)
+
+    def setUp(self):
+        # счетчики настроены на 38400, порт - на 9600
+        self.bus = OwenBusEmulator(
+            [EmulatedCI8(addr=1, baudrate=38400), EmulatedCI8(addr=2, baudrate=38400)]
+        )
+
+    def test_counters_rate_detected(self):
+        """Тестируем определение скорости счетчиков, отличной от скорости порта."""
+        probe = probe_baudrates(self.bus, probe_sensors(1, 2), self.rates)
+        self.assertEqual({'s1': 38400, 's2': 38400}, probe.rates)
+        self.assertEqual([], probe.answered[9600])
+        self.assertEqual([38400], probe.common)
+        self.assertEqual(38400, probe.detected)
+        self.assertTrue(probe.mismatch)
+        self.assertEqual(9600, self.bus.baudrate)
+        # 36 символов запроса и ответа по 10 бит и задержка ответа
+        expected = (360 / 38400 + 0.02) / (360 / 115200 + 0.02)
+        self.assertAlmostEqual(expected, probe.gain(115200, 0.02))
+        report = probe.report()
+        self.assertEqual((38400, 115200), (report['detected'], report['target']))
+
+    def test_probe_stops_at_first_common_rate(self):
+        """Тестируем сокращенный опрос при запуске опроса шины."""
+        probe = probe_baudrates(
+            self.bus, probe_sensors(1, 2), self.rates, exhaustive=False
+        )
+        self.assertEqual({57600: [], 38400: ['s1', 's2']}, probe.answered)
+        self.assertEqual(38400, probe.detected)
+
+    def test_counters_at_different_rates(self):
+        """Тестируем отчет о счетчиках, настроенных на разные скорости."""
+        self.bus.devices[OwenCI8(addr=1).addr].baudrate = 19200
+        self.bus.devices[OwenCI8(addr=2).addr].baudrate = 9600
+        probe = probe_baudrates(self.bus, probe_sensors(1, 2), self.rates)
+        self.assertEqual({'s1': 19200, 's2': 9600}, probe.rates)
+        self.assertIsNone(probe.detected)
+        self.assertFalse(probe.mismatch)
+
+
+class TestBaudReport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / 'ttyOWEN'
+        # время передачи по линии зависит от скорости, установленной на pty
+        self.bus = OwenBusEmulator(
+            [
+                EmulatedCI8(addr=1, pcs_per_min=6000, baudrate=38400),
+                EmulatedCI8(addr=2, pcs_per_min=6000, baudrate=38400),
+            ],
+            realtime=True,
+        )
+        self.serial_settings = {'port': str(self.path), 'timeout': 0.1}
+        self.port = EmulatedSerialPort(self.bus, self.path).start()
+        self.addCleanup(self.port.stop)
+
+    def test_throughput_measured_on_pty(self):
+        """Тестируем опрос на pty: счетчики отвечают только на своей скорости."""
+        port = open_serial({**self.serial_settings, 'baudrate': 38400})
+        try:
+            probe = probe_baudrates(port, probe_sensors(1, 2), (9600, 38400, 115200))
+        finally:
+            port.close()
+        self.assertEqual(38400, probe.detected)
+        self.assertFalse(probe.mismatch)
+        self.assertEqual([], probe.answered[115200])
+        self.assertEqual([38400], list(probe.throughput))
+
+    def test_mismatch_reported_without_switching(self):
+        """Тестируем отчет о расхождении скоростей без переключения порта."""
+        module = install_module(
+            [
+                {
+                    'name': f's{addr}',
+                    'driver': OwenCI8,
+                    'addr': addr,
+                    'addr_len': 8,
+                    'parameter': OwenCI8.DCNT,
+                }
+                for addr in (1, 2)
+            ],
+            {**self.serial_settings, 'baudrate': 9600},
+            poll_delay=0.05,
+        )
+        module.BAUD_PROBE = True
+        from .owen_poller import SensorsPoller
+
+        async def wait_probe(poller: SensorsPoller) -> None:
+            while 'default' not in poller.baud_probes:
+                await asyncio.sleep(0.01)
+
+        async def poll() -> tuple[dict, dict, Any]:
+            poller = SensorsPoller()
+            task = asyncio.create_task(poller.poll())
+            try:
+                await asyncio.wait_for(wait_probe(poller), 3)
+                await asyncio.sleep(0.3)
+                return (
+                    poller.buses_settings['default'],
+                    poller.baud_probes['default'].report(),
+                    poller.sensors['s1'].reading.value,
+                )
+            finally:
+                task.cancel()
+                poller.close()
+
+        with self.assertLogs('app.owen_poller.owen_poller', level=logging.INFO) as logs:
+            serial_settings, report, value = asyncio.run(poll())
+        self.assertEqual(9600, serial_settings['baudrate'])
+        self.assertEqual(9600, self.bus.baudrate)
+        self.assertEqual((9600, 38400, True), tuple(report.values())[:3])
+        # порт не переключен - счетчики не отвечают
+        self.assertIsNone(value)
+        self.assertTrue(
+            any('отвечают на 38400' in record.getMessage() for record in logs.records)
+        )
+
+
+class TestSensorGroups(unittest.TestCase):
+    groups_settings = {
+        'line1': ['s1', 's2'],
+        'line2': ['s3'],
+        'plant': ['line1', 'line2', 's1'],
+    }
+
+    def setUp(self):
+        self.registry = SensorRegistry(recent=RecentSamples(capacity=8))
+        for name in ('s1', 's2', 's3'):
+            self.registry.allocate(name)
+        self.registry.groups = GroupAggregates(
+            self.registry, resolve_groups(self.groups_settings, self.registry.index)
+        )
+        self.groups = self.registry.groups
+
+    def store(self, name: str, timestamp: float, status: str, value: int = NO_VALUE):
+        self.registry.stamp()
+        self.registry.store(self.registry.index[name], status, value, timestamp)
+
+    def test_resolve_nested_groups(self):
+        """Тестируем раскрытие вложенных групп без повторов сенсоров."""
+        groups = resolve_groups(self.groups_settings, ['s1', 's2', 's3'])
+        self.assertEqual(['s1', 's2', 's3'], groups['plant'])
+        with self.assertRaises(ImproperlyConfiguredError):
+            resolve_groups({'line1': ['s9']}, ['s1'])
+        with self.assertRaises(ImproperlyConfiguredError):
+            resolve_groups({'a': ['b'], 'b': ['s1', 'a']}, ['s1'])
+
+    def test_aggregates_updated_incrementally(self):
+        """Тестируем обновление показателей групп при записи показаний."""
+        # s1 - 60 шт/мин, s2 - 120 шт/мин, s3 молчит
+        for step in range(1, 5):
+            self.store('s1', step, ReadResult.OK, 100 + step)
+            self.store('s2', step, ReadResult.OK, 200 + step * 2)
+            self.store('s3', step, ReadResult.TIMEOUT)
+        plant = self.groups.summary('plant')
+        self.assertAlmostEqual(180.0, plant['rate'])
+        self.assertEqual(104 + 208, plant['total'])
+        self.assertEqual((2, 1, 3), (plant['online'], plant['offline'], plant['size']))
+        self.store('s2', 5, ReadResult.TIMEOUT)
+        line1 = self.groups.summary('line1')
+        self.assertAlmostEqual(60.0, line1['rate'])
+        # последнее показание сенсора без связи остается в сумме
+        self.assertEqual(104 + 208, line1['total'])
+        self.assertEqual(1, line1['online'])
+        self.store('s1', 5, ReadResult.ERROR)
+        self.assertEqual(0.0, self.groups.summary('line1')['rate'])
+        self.assertEqual(0, self.groups.summary('line2')['online'])
+        members = self.groups.breakdown('line1')
+        self.assertEqual(['s1', 's2'], [member['sensor'] for member in members])
+        self.assertEqual([104, 208], [member['value'] for member in members])
+        self.assertEqual(['ERROR', 'TIMEOUT'], [member['status'] for member in members])
+
+    def test_incremental_matches_rebuild(self):
+        """Тестируем совпадение приращений с расчетом с нуля."""
+        statuses = [ReadResult.OK, ReadResult.OK, ReadResult.TIMEOUT]
+        for step in range(1, 30):
+            for offset, name in enumerate(('s1', 's2', 's3')):
+                status = statuses[(step + offset) % 3]
+                self.store(name, step + offset / 10, status, step * (offset + 1))
+        rebuilt = GroupAggregates(
+            self.registry, resolve_groups(self.groups_settings, self.registry.index)
+        )
+        for name in self.groups_settings:
+            expected = rebuilt.summary(name)
+            actual = self.groups.summary(name)
+            self.assertAlmostEqual(expected.pop('rate'), actual.pop('rate'))
+            self.assertEqual(expected, actual)
+
+    def test_poller_groups(self):
+        """Тестируем группы опроса и их изменение при применении настроек."""
+        sensors_settings = [
+            {
+                'name': f's{addr}',
+                'driver': OwenCI8,
+                'addr': addr,
+                'addr_len': 8,
+                'parameter': OwenCI8.DCNT,
+            }
+            for addr in (1, 2)
+        ]
+        module = install_module(sensors_settings)
+        module.groups_settings = {'line1': ['s1', 's2']}
+        from .owen_poller import SensorsPoller
+
+        poller = SensorsPoller()
+        bus = OwenBusEmulator([EmulatedCI8(addr=1), EmulatedCI8(addr=2, online=False)])
+        for sensor in poller.sensors.values():
+            sensor.serial = bus
+        poller.poll_cycle(list(poller.sensors.values()))
+        group = poller.get_group('line1')
+        self.assertEqual((1, 1), (group['online'], group['offline']))
+        self.assertEqual(['OK', 'TIMEOUT'], [m['status'] for m in group['members']])
+        self.assertNotIn('members', poller.get_group('line1', members=False))
+        self.assertEqual(['line1'], [item['name'] for item in poller.get_groups()])
+        module.groups_settings = {'line2': ['s2']}
+        asyncio.run(poller.apply_settings(module))
+        self.assertEqual(0, poller.get_group('line2')['online'])
+        with self.assertRaises(GroupNotFound):
+            poller.get_group('line1')
+        module.groups_settings = {'line3': ['s9']}
+        with self.assertRaises(ImproperlyConfiguredError):
+            asyncio.run(poller.apply_settings(module))
+        self.assertIn('line2', poller.registry.groups)
+        poller.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,247 @@
+from bisect import bisect_right
+from collections.abc import Iterator
+
+from .registry import NO_VALUE
+
+# пустой токен значения - отсчет без показания
+MISSING = 0
+
+
+def zigzag(number: int) -> int:
+    # знаковое число в беззнаковое: 0, -1, 1, -2... -> 0, 1, 2, 3...
+    return number << 1 if number >= 0 else (-number << 1) - 1
+
+
+def write_varint(buffer: bytearray, number: int) -> None:
+    while number >= 0x80:
+        buffer.append(number & 0x7F | 0x80)
+        number >>= 7
+    buffer.append(number)
+
+
+class SeriesBlocks:
+    """
+    Сжатая история одного сенсора: последовательность блоков до block_size
+    отсчетов. Время хранится в миллисекундах разностью разностей
+    (при равномерном опросе - 0, один байт), значение - разностью
+    с предыдущим показанием; оба - zigzag varint. Блок декодируется
+    независимо: начальное время блока хранится в индексе starts,
+    по которому поиск интервала пропускает блоки целиком.
+    """
+
+    __slots__ = (
+        'blocks',
+        'starts',
+        'counts',
+        'buffer',
+        'start',
+        'count',
+        'last_time',
+        'last_delta',
+        'last_value',
+    )
+
+    def __init__(self):
+        self.blocks: list[bytes] = []  # закрытые блоки
+        self.starts: list[int] = []  # время первого отсчета блока, мс
+        self.counts: list[int] = []  # отсчетов в закрытом блоке
+        self.buffer = bytearray()  # открытый блок
+        self.start = 0
+        self.count = 0
+        self.last_time = 0
+        self.last_delta = 0
+        self.last_value = 0
+
+    @property
+    def size(self) -> int:
+        return sum(self.counts) + self.count
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(block) for block in self.blocks) + len(self.buffer)
+
+    def append(self, time_ms: int, value: int, block_size: int) -> None:
+        if self.count == block_size:
+            self.seal()
+        if not self.count:
+            self.start = self.last_time = time_ms
+            self.last_delta = 0
+            self.last_value = 0
+        delta = time_ms - self.last_time
+        buffer = self.buffer
+        write_varint(buffer, zigzag(delta - self.last_delta))
+        if value == NO_VALUE:
+            buffer.append(MISSING)
+        else:
+            write_varint(buffer, zigzag(value - self.last_value) << 1 | 1)
+            self.last_value = value
+        self.last_time = time_ms
+        self.last_delta = delta
+        self.count += 1
+
+    def seal(self) -> None:
+        self.blocks.append(bytes(self.buffer))
+        self.starts.append(self.start)
+        self.counts.append(self.count)
+        self.buffer = bytearray()
+        self.count = 0
+
+    def trim(self, capacity: int) -> None:
+        """
+        Удаляет старые закрытые блоки, пока без них остается capacity отсчетов.
+        """
+        total = self.size
+        dropped = 0
+        while dropped < len(self.counts) and total - self.counts[dropped] >= capacity:
+            total -= self.counts[dropped]
+            dropped += 1
+        if dropped:
+            del self.blocks[:dropped]
+            del self.starts[:dropped]
+            del self.counts[:dropped]
+
+    def snapshot(self) -> tuple[list[int], list[bytes]]:
+        """
+        Копия индекса и блоков для декодирования без блокировки:
+        закрытые блоки неизменяемы, открытый копируется.
+        """
+        starts = self.starts.copy()
+        blocks = self.blocks.copy()
+        if self.count:
+            starts.append(self.start)
+            blocks.append(bytes(self.buffer))
+        return starts, blocks
+
+
+def decode_block(block: bytes, start: int) -> Iterator[tuple[int, int]]:
+    """
+    Отсчеты блока: время, мс, и значение (NO_VALUE - нет показания).
+    """
+    position = 0
+    size = len(block)
+    time_ms = start
+    delta = 0
+    value = 0
+    while position < size:
+        number = block[position]
+        position += 1
+        if number & 0x80:
+            number &= 0x7F
+            shift = 7
+            while True:
+                byte = block[position]
+                position += 1
+                number |= (byte & 0x7F) << shift
+                if not byte & 0x80:
+                    break
+                shift += 7
+        delta += number >> 1 if not number & 1 else -((number + 1) >> 1)
+        time_ms += delta
+        number = block[position]
+        position += 1
+        if number & 0x80:
+            number &= 0x7F
+            shift = 7
+            while True:
+                byte = block[position]
+                position += 1
+                number |= (byte & 0x7F) << shift
+                if not byte & 0x80:
+                    break
+                shift += 7
+        if number == MISSING:
+            yield time_ms, NO_VALUE
+            continue
+        number >>= 1
+        value += number >> 1 if not number & 1 else -((number + 1) >> 1)
+        yield time_ms, value
+
+
+def decode_series(
+    starts: list[int],
+    blocks: list[bytes],
+    start: float | None = None,
+    end: float | None = None,
+) -> Iterator[tuple[float, int]]:
+    """
+    Потоковое декодирование снимка SeriesBlocks.snapshot() в интервале
+    [start, end) (time.time()): блоки до начала интервала пропускаются
+    по индексу, декодирование останавливается на конце интервала.
+    """
+    first = 0
+    start_ms = None
+    if start is not None:
+        start_ms = round(start * 1000)
+        first = max(bisect_right(starts, start_ms) - 1, 0)
+    end_ms = None if end is None else round(end * 1000)
+    for position in range(first, len(blocks)):
+        if end_ms is not None and starts[position] >= end_ms:
+            return
+        for time_ms, value in decode_block(blocks[position], starts[position]):
+            if start_ms is not None and time_ms < start_ms:
+                continue
+            if end_ms is not None and time_ms >= end_ms:
+                return
+            yield time_ms / 1000, value
+
+
+class CompressedHistory:
+    """
+    Длительная история показаний сенсоров в сжатых блоках (SeriesBlocks)
+    на каждый индекс SensorRegistry: счетчики монотонны и опрашиваются
+    почти равномерно, поэтому отсчет занимает 2-3 байта вместо 16 байт
+    массивов SampleHistory. Хранится не меньше capacity последних отсчетов
+    сенсора, старые блоки удаляются целиком. Отсчет пишется не чаще
+    раза в interval секунд, время - с точностью до миллисекунды.
+    Запись и снимок (snapshot) выполняются под SensorRegistry.lock,
+    декодирование (decode_series) - без блокировки.
+    """
+
+    def __init__(
+        self, capacity: int = 172800, interval: float = 0.5, block_size: int = 512
+    ):
+        """
+        :param capacity: количество хранимых отсчетов сенсора,
+        :param interval: минимальный интервал между отсчетами, с,
+        :param block_size: отсчетов в блоке - шаг поиска по времени.
+        """
+        self.capacity = capacity
+        self.interval_ms = round(interval * 1000)
+        self.block_size = block_size
+        self.series: list[SeriesBlocks] = []
+
+    @property
+    def size(self) -> int:
+        return len(self.series)
+
+    def extend(self, size: int) -> None:
+        self.series.extend(SeriesBlocks() for _ in range(size - self.size))
+
+    def reset(self, index: int) -> None:
+        self.series[index] = SeriesBlocks()
+
+    def record(self, index: int, wall_time: float, value: int) -> None:
+        series = self.series[index]
+        time_ms = round(wall_time * 1000)
+        if (series.count or series.blocks) and (
+            time_ms - series.last_time < self.interval_ms
+        ):
+            return
+        series.append(time_ms, value, self.block_size)
+        if series.count == 1 and series.blocks:
+            series.trim(self.capacity)
+
+    def snapshot(self, index: int) -> tuple[list[int], list[bytes]]:
+        return self.series[index].snapshot()
+
+    def stats(self) -> dict[str, int | float]:
+        """
+        Объем истории: отсчеты, байты блоков и байт на отсчет.
+        """
+        samples = sum(series.size for series in self.series)
+        nbytes = sum(series.nbytes for series in self.series)
+        return {
+            'samples': samples,
+            'bytes': nbytes,
+            'bytes_per_sample': nbytes / samples if samples else 0.0,
+        }
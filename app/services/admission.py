@@ -0,0 +1,386 @@
+import asyncio
+import ipaddress
+import json
+import math
+import time
+from collections.abc import Callable, Iterable
+from typing import Any
+
+# классы запросов по приоритету: состояние сервиса и тревоги допускаются
+# всегда, чтение показаний - в пределах лимитов, тяжелые запросы
+# (опрос порта, аналитика, выгрузка) - в пределах своего лимита
+SYSTEM = 'system'
+READ = 'read'
+HEAVY = 'heavy'
+PRIORITIES = (SYSTEM, READ, HEAVY)
+
+ROUTES = (
+    ('/test_sensor/', HEAVY),
+    ('/analytics/', HEAVY),
+    ('/history/', HEAVY),
+    ('/alarms/', SYSTEM),
+    ('/admission/', SYSTEM),
+    ('/buses/', SYSTEM),
+    ('/capacity/', SYSTEM),
+    ('/baudrate/', SYSTEM),
+    ('/sinks/', SYSTEM),
+    ('/peers/', SYSTEM),
+)
+
+
+def classify(path: str) -> str:
+    """
+    Класс запроса по адресу, неизвестные адреса - read: в пределах лимитов.
+    """
+    if path == '/':
+        return SYSTEM
+    for prefix, priority in ROUTES:
+        if path.startswith(prefix):
+            return priority
+    return READ
+
+
+def client_address(
+    scope, trusted_proxies: Iterable[ipaddress.IPv4Network | ipaddress.IPv6Network]
+) -> str:
+    """
+    Адрес клиента запроса: за доверенным прокси (nginx) - из заголовка
+    X-Real-IP, иначе - адрес соединения.
+    :param trusted_proxies: сети доверенных прокси (ipaddress.ip_network).
+    """
+    client = scope['client'][0] if scope.get('client') else ''
+    if not trusted_proxies:
+        return client
+    try:
+        address = ipaddress.ip_address(client)
+    except ValueError:
+        return client
+    if not any(address in network for network in trusted_proxies):
+        return client
+    for name, value in scope.get('headers', ()):
+        if name == b'x-real-ip':
+            return value.decode('latin-1').strip() or client
+    return client
+
+
+class TokenBucket:
+    """
+    Ограничение частоты: rate запросов в секунду, до burst подряд.
+    """
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now: float) -> bool:
+        self.refill(now)
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def wait(self) -> float:
+        """
+        Время до следующего токена, с.
+        """
+        return max(1 - self.tokens, 0.0) / self.rate
+
+
+class AdmissionController:
+    """
+    Допуск запросов API, чтобы всплеск запросов не задерживал опрос шин,
+    отправку показаний и тревог в том же event loop.
+    Запросы read и heavy ограничиваются общим числом одновременных
+    запросов и частотой, а также числом одновременных запросов и частотой
+    каждого клиента; heavy - еще и своим числом одновременных запросов.
+    Запросы system не ограничиваются частотой и имеют резерв
+    system_reserve сверх max_concurrency.
+    Задержка event loop измеряется monitor(): пока она больше max_lag,
+    запросы read и heavy отклоняются независимо от лимитов.
+    Отклоненный запрос read получает последний успешный ответ на тот же
+    адрес не старше stale_ttl секунд, иначе - 429 с Retry-After.
+    Лимит 0 отключает ограничение.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 32,
+        heavy_concurrency: int = 2,
+        system_reserve: int = 8,
+        client_concurrency: int = 8,
+        rate: float = 200.0,
+        client_rate: float = 20.0,
+        client_burst: int = 40,
+        stale_ttl: float = 30.0,
+        max_lag: float = 0.05,
+        max_clients: int = 1024,
+        max_cached: int = 256,
+        trusted_proxies: Iterable[str] = (),
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param max_concurrency: одновременных запросов read и heavy,
+        :param heavy_concurrency: одновременных запросов heavy,
+        :param system_reserve: запросов system сверх max_concurrency,
+        :param client_concurrency: одновременных запросов клиента,
+        :param rate: запросов read и heavy в секунду,
+        :param client_rate: запросов клиента в секунду,
+        :param client_burst: запросов клиента подряд,
+        :param stale_ttl: возраст ответа, отдаваемого при перегрузке, с,
+        :param max_lag: допустимая задержка event loop, с,
+        :param max_clients: клиентов с отдельными лимитами,
+        :param max_cached: ответов для перегрузки,
+        :param trusted_proxies: адреса и сети прокси, адрес клиента
+          за которыми берется из X-Real-IP,
+        :param clock: источник времени.
+        """
+        self.max_concurrency = max_concurrency
+        self.heavy_concurrency = heavy_concurrency
+        self.system_reserve = system_reserve
+        self.client_concurrency = client_concurrency
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.stale_ttl = stale_ttl
+        self.max_lag = max_lag
+        self.lag = 0.0
+        self.max_clients = max_clients
+        self.max_cached = max_cached
+        self.trusted_proxies = [
+            ipaddress.ip_network(proxy, strict=False) for proxy in trusted_proxies
+        ]
+        self.clock = clock
+        self.bucket = TokenBucket(rate, rate, clock()) if rate else None
+        self.client_buckets: dict[str, TokenBucket] = {}
+        self.in_flight = dict.fromkeys(PRIORITIES, 0)
+        self.client_in_flight: dict[str, int] = {}
+        self.stats = {
+            priority: {'admitted': 0, 'rejected': 0, 'stale': 0}
+            for priority in PRIORITIES
+        }
+        # адрес запроса - время, заголовки и тело ответа
+        self.cache: dict[str, tuple[float, list[tuple[bytes, bytes]], bytes]] = {}
+
+    @classmethod
+    def from_settings(cls, settings) -> 'AdmissionController':
+        return cls(
+            max_concurrency=settings.api_max_concurrency,
+            heavy_concurrency=settings.api_heavy_concurrency,
+            system_reserve=settings.api_system_reserve,
+            client_concurrency=settings.api_client_concurrency,
+            rate=settings.api_rate,
+            client_rate=settings.api_client_rate,
+            client_burst=settings.api_client_burst,
+            stale_ttl=settings.api_stale_ttl,
+            max_lag=settings.api_max_lag,
+            trusted_proxies=settings.api_trusted_proxies,
+        )
+
+    def client_bucket(self, client: str, now: float) -> TokenBucket | None:
+        if not self.client_rate:
+            return None
+        bucket = self.client_buckets.pop(client, None)
+        if bucket is None:
+            bucket = TokenBucket(self.client_rate, self.client_burst, now)
+            # вытесняется клиент, обращавшийся раньше всех
+            if len(self.client_buckets) >= self.max_clients:
+                del self.client_buckets[next(iter(self.client_buckets))]
+        self.client_buckets[client] = bucket
+        return bucket
+
+    def admit(self, client: str, priority: str) -> float | None:
+        """
+        Допускает запрос, допущенный запрос завершается release().
+        :return: None - запрос допущен, иначе - рекомендуемая пауза
+        перед повтором, с.
+        """
+        retry_after = self.check(client, priority)
+        if retry_after is not None:
+            self.stats[priority]['rejected'] += 1
+            return retry_after
+        self.stats[priority]['admitted'] += 1
+        self.in_flight[priority] += 1
+        self.client_in_flight[client] = self.client_in_flight.get(client, 0) + 1
+        return None
+
+    def check(self, client: str, priority: str) -> float | None:
+        in_flight = sum(self.in_flight.values())
+        if priority == SYSTEM:
+            if self.max_concurrency and (
+                in_flight >= self.max_concurrency + self.system_reserve
+            ):
+                return 1.0
+            return None
+        if self.max_lag and self.lag > self.max_lag:
+            return 1.0
+        # запросы system не занимают лимит read и heavy
+        if (
+            self.max_concurrency
+            and in_flight - self.in_flight[SYSTEM] >= self.max_concurrency
+        ):
+            return 1.0
+        if (
+            priority == HEAVY
+            and self.heavy_concurrency
+            and self.in_flight[HEAVY] >= self.heavy_concurrency
+        ):
+            return 1.0
+        if (
+            self.client_concurrency
+            and self.client_in_flight.get(client, 0) >= self.client_concurrency
+        ):
+            return 1.0
+        now = self.clock()
+        bucket = self.client_bucket(client, now)
+        if bucket is not None and not bucket.take(now):
+            return bucket.wait()
+        if self.bucket is not None and not self.bucket.take(now):
+            # токен клиента возвращается: запрос не выполнен
+            if bucket is not None:
+                bucket.tokens += 1
+            return self.bucket.wait()
+        return None
+
+    async def monitor(self, interval: float = 0.02) -> None:
+        """
+        Измеряет задержку event loop: опоздание пробуждения после sleep.
+        Всплеск учитывается сразу, спад - постепенно.
+        """
+        while True:
+            started = self.clock()
+            await asyncio.sleep(interval)
+            lag = max(self.clock() - started - interval, 0.0)
+            self.lag = max(lag, self.lag * 0.5)
+
+    def release(self, client: str, priority: str) -> None:
+        self.in_flight[priority] -= 1
+        count = self.client_in_flight[client] - 1
+        if count:
+            self.client_in_flight[client] = count
+        else:
+            del self.client_in_flight[client]
+
+    def remember(
+        self, key: str, headers: list[tuple[bytes, bytes]], body: bytes
+    ) -> None:
+        if not self.stale_ttl:
+            return
+        self.cache.pop(key, None)
+        if len(self.cache) >= self.max_cached:
+            del self.cache[next(iter(self.cache))]
+        self.cache[key] = (self.clock(), headers, body)
+
+    def stale(self, key: str) -> tuple[float, list[tuple[bytes, bytes]], bytes] | None:
+        """
+        :return: возраст, с, заголовки и тело последнего ответа на адрес.
+        """
+        cached = self.cache.get(key)
+        if cached is None:
+            return None
+        age = self.clock() - cached[0]
+        if age > self.stale_ttl:
+            del self.cache[key]
+            return None
+        self.stats[READ]['stale'] += 1
+        return age, cached[1], cached[2]
+
+    def report(self) -> dict[str, Any]:
+        return {
+            'lag': self.lag,
+            'in_flight': dict(self.in_flight),
+            'clients': len(self.client_in_flight),
+            'cached': len(self.cache),
+            **self.stats,
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware допуска запросов. Контроллер берется из
+    app.state.admission, None - запросы не ограничиваются.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        admission: AdmissionController | None = None
+        if scope['type'] == 'http':
+            admission = getattr(scope['app'].state, 'admission', None)
+        if admission is None:
+            await self.app(scope, receive, send)
+            return
+        client = client_address(scope, admission.trusted_proxies)
+        priority = classify(scope['path'])
+        retry_after = admission.admit(client, priority)
+        key = scope['path'] + '?' + scope['query_string'].decode('latin-1')
+        if retry_after is not None:
+            stale = admission.stale(key) if priority == READ else None
+            if stale is None:
+                await self.reject(send, retry_after)
+            else:
+                await self.send_stale(send, *stale)
+            return
+        if priority != READ or scope['method'] != 'GET':
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                admission.release(client, priority)
+            return
+        # успешный ответ сохраняется для отдачи при перегрузке
+        response: dict[str, Any] = {}
+        chunks: list[bytes] = []
+
+        async def send_wrapper(message) -> None:
+            if message['type'] == 'http.response.start':
+                response.update(message)
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+                if not message.get('more_body') and response.get('status') == 200:
+                    admission.remember(key, response['headers'], b''.join(chunks))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            admission.release(client, priority)
+
+    @staticmethod
+    async def reject(send, retry_after: float) -> None:
+        body = json.dumps({'detail': 'Too many requests'}).encode()
+        await send(
+            {
+                'type': 'http.response.start',
+                'status': 429,
+                'headers': [
+                    (b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode()),
+                    (b'retry-after', str(math.ceil(retry_after)).encode()),
+                ],
+            }
+        )
+        await send({'type': 'http.response.body', 'body': body})
+
+    @staticmethod
+    async def send_stale(
+        send, age: float, headers: list[tuple[bytes, bytes]], body: bytes
+    ) -> None:
+        await send(
+            {
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    *headers,
+                    (b'age', str(int(age)).encode()),
+                    (b'x-admission', b'stale'),
+                ],
+            }
+        )
+        await send({'type': 'http.response.body', 'body': body})
@@ -1,13 +1,15 @@
+import asyncio
 import dataclasses
+import functools
 import logging
-from contextlib import suppress
+import time
+from collections.abc import Callable
 from datetime import datetime
+from typing import Any
 
-from serial import Serial
-
-from app import settings
 from app.api.common import SensorReading
 from app.owen_counter.owen_ci8 import OwenCI8
+from app.owen_poller.exeptions import BusUnavailable
 
 logger = logging.getLogger(__name__)
 
@@ -26,48 +28,114 @@ class SensorProbeService:
     """
 
     ADDR_LEN = 8
-    PARAMETER_HASH = b'\xc1\x73'
+    PARAMETER_HASH = OwenCI8.DCNT
     DEVICE_CLS = OwenCI8
 
     @classmethod
-    def probe(cls, *, addr: int) -> ProbeResult:
-        if not settings.serial_settings:
-            raise RuntimeError('Serial settings not configured')
+    def probe(cls, serial: Any, *, addr: int) -> ProbeResult:
+        """
+        :param serial: открытый порт шины, на которой опрашивается адрес.
+        """
+        device = cls.DEVICE_CLS(addr=addr, addr_len=cls.ADDR_LEN)
 
-        serial = Serial(**settings.serial_settings)
-        serial.close()
-        serial.open()
+        reading = SensorReading()
 
         try:
-            device = cls.DEVICE_CLS(addr=addr, addr_len=cls.ADDR_LEN)
+            reading.value = device.read_parameter(
+                serial,
+                cls.PARAMETER_HASH,
+            )
+            reading.time = datetime.now()
 
-            reading = SensorReading()
+            status = 'OK' if reading.value is not None else 'OFFLINE'
 
-            try:
-                reading.value = device.read_parameter(
-                    serial,
-                    cls.PARAMETER_HASH,
-                )
-                reading.time = datetime.now()
+        except TimeoutError:
+            logger.error('Sensor %s timeout', addr)
+            return ProbeResult(
+                addr=addr,
+                value=None,
+                measured_at=None,
+                status='TIMEOUT',
+            )
 
-                status = 'OK' if reading.value is not None else 'OFFLINE'
+        return ProbeResult(
+            addr=addr,
+            value=reading.value,
+            measured_at=reading.time,
+            status=status,
+        )
 
-            except TimeoutError:
-                logger.error(f'Sensor {addr} timeout')
-                return ProbeResult(
-                    addr=addr,
-                    value=None,
-                    measured_at=None,
-                    status='TIMEOUT',
-                )
 
+class ProbeCoalescer:
+    """
+    Объединяет одновременные опросы одного адреса в одну транзакцию
+    и кэширует результат на ttl секунд.
+    Опрос выполняется через опрос шины (SensorsPoller.exchange): в потоке
+    шины под ее блокировкой, между циклами опроса, по уже открытому порту.
+    Если порт шины не открыт, возвращается статус BUS_UNAVAILABLE.
+    """
+
+    BUS_UNAVAILABLE = 'BUS UNAVAILABLE'
+
+    def __init__(
+        self,
+        poller: Any,
+        bus: str,
+        probe: Callable[..., ProbeResult] = SensorProbeService.probe,
+        ttl: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param poller: опрос шин SensorsPoller,
+        :param bus: шина, на которой опрашиваются адреса,
+        :param probe: функция опроса probe(port, addr=...),
+        :param ttl: время жизни результата, с (0 - без кэша),
+        :param clock: источник времени.
+        """
+        self.poller = poller
+        self.bus = bus
+        self.probe = probe
+        self.ttl = ttl
+        self.clock = clock
+        self.inflight: dict[int, asyncio.Future] = {}
+        self.results: dict[int, tuple[float, ProbeResult]] = {}
+
+    def cached(self, addr: int) -> ProbeResult | None:
+        cached = self.results.get(addr)
+        if cached is None:
+            return None
+        measured_at, result = cached
+        if self.clock() - measured_at >= self.ttl:
+            del self.results[addr]
+            return None
+        return result
+
+    async def probe_addr(self, addr: int) -> ProbeResult:
+        if (result := self.cached(addr)) is not None:
+            return result
+        future = self.inflight.get(addr)
+        if future is None:
+            future = asyncio.ensure_future(self.run_probe(addr))
+            self.inflight[addr] = future
+            future.add_done_callback(lambda done: self.complete(addr, done))
+        # отмена одного запроса не отменяет общий опрос
+        return await asyncio.shield(future)
+
+    async def run_probe(self, addr: int) -> ProbeResult:
+        try:
+            return await self.poller.exchange(
+                self.bus, functools.partial(self.probe, addr=addr)
+            )
+        except BusUnavailable:
             return ProbeResult(
-                addr=addr,
-                value=reading.value,
-                measured_at=reading.time,
-                status=status,
+                addr=addr, value=None, measured_at=None, status=self.BUS_UNAVAILABLE
             )
 
-        finally:
-            with suppress(Exception):
-                serial.close()
+    def complete(self, addr: int, future: asyncio.Future) -> None:
+        self.inflight.pop(addr, None)
+        if self.ttl <= 0 or future.cancelled() or future.exception() is not None:
+            return
+        result = future.result()
+        # порт шины может открыться до истечения ttl
+        if result.status != self.BUS_UNAVAILABLE:
+            self.results[addr] = (self.clock(), result)
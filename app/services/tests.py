@@ -0,0 +1,308 @@
+import asyncio
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from app.benchmarks.environment import install_module
+
+from .admission import (
+    HEAVY,
+    READ,
+    SYSTEM,
+    AdmissionController,
+    AdmissionMiddleware,
+    classify,
+)
+from .sensor_probe import ProbeCoalescer, ProbeResult
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestProbeCoalescer(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.calls = []
+        self.threads = []
+        self.lock = threading.Lock()
+        install_module([])
+        from app.owen_poller.owen_poller import DEFAULT_BUS, SensorsPoller
+
+        self.poller = SensorsPoller()
+        self.addCleanup(self.poller.close)
+        self.port = object()
+        self.poller.set_port(DEFAULT_BUS, self.port)
+        self.probes = ProbeCoalescer(
+            self.poller, DEFAULT_BUS, self.probe, ttl=5, clock=self.clock
+        )
+
+    def probe(self, port, *, addr: int) -> ProbeResult:
+        self.assertIs(self.port, port)
+        with self.lock:
+            self.calls.append(addr)
+            self.threads.append(threading.current_thread().name)
+        time.sleep(0.05)
+        if addr < 0:
+            raise OSError('Input/output error')
+        return ProbeResult(
+            addr=addr, value=len(self.calls), measured_at=None, status='OK'
+        )
+
+    def gather(self, *addrs: int) -> list:
+        async def run():
+            return await asyncio.gather(
+                *(self.probes.probe_addr(addr) for addr in addrs),
+                return_exceptions=True,
+            )
+
+        return asyncio.run(run())
+
+    def test_concurrent_probes_share_transaction(self):
+        """Тестируем один опрос на одновременные запросы одного адреса."""
+        results = self.gather(*[7] * 10, 8)
+        self.assertEqual([7, 8], self.calls)
+        self.assertEqual(1, len({id(result) for result in results[:10]}))
+        self.assertEqual({}, self.probes.inflight)
+
+    def test_result_cached_for_ttl(self):
+        """Тестируем кэширование результата на ttl."""
+        first = self.gather(7)[0]
+        self.clock.now = 4.9
+        self.assertIs(first, self.gather(7)[0])
+        self.clock.now = 5
+        self.assertIsNot(first, self.gather(7)[0])
+        self.assertEqual([7, 7], self.calls)
+
+    def test_errors_not_cached(self):
+        """Тестируем передачу ошибки всем ожидающим без кэширования."""
+        results = self.gather(-1, -1)
+        self.assertTrue(all(isinstance(result, OSError) for result in results))
+        self.gather(-1)
+        self.assertEqual([-1, -1], self.calls)
+
+    def test_event_loop_not_blocked(self):
+        """Тестируем выполнение опроса вне event loop."""
+
+        async def run():
+            ticks = 0
+            task = asyncio.create_task(self.probes.probe_addr(7))
+            while not task.done():
+                ticks += 1
+                await asyncio.sleep(0.005)
+            return ticks
+
+        self.assertGreater(asyncio.run(run()), 3)
+
+    def test_probe_waits_for_bus_cycle(self):
+        """Тестируем опрос адреса между циклами опроса шины, в ее потоке."""
+        from app.owen_poller.owen_poller import DEFAULT_BUS
+
+        def cycle():
+            self.threads.append(threading.current_thread().name)
+            time.sleep(0.1)
+            self.calls.append('cycle')
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            async with self.poller.locks[DEFAULT_BUS]:
+                probe = asyncio.create_task(self.probes.probe_addr(7))
+                await loop.run_in_executor(self.poller.executors[DEFAULT_BUS], cycle)
+            return await probe
+
+        result = asyncio.run(run())
+        self.assertEqual(['cycle', 7], self.calls)
+        self.assertEqual(2, result.value)
+        self.assertEqual(1, len(set(self.threads)))
+        self.assertTrue(self.threads[0].startswith('bus-'))
+
+    def test_bus_unavailable(self):
+        """Тестируем ответ без открытого порта шины."""
+        from app.owen_poller.owen_poller import DEFAULT_BUS
+
+        self.poller.set_port(DEFAULT_BUS, None)
+        (result,) = self.gather(7)
+        self.assertEqual(ProbeCoalescer.BUS_UNAVAILABLE, result.status)
+        self.assertEqual([], self.calls)
+        self.assertEqual({}, self.probes.results)
+
+
+class TestAdmissionController(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.admission = AdmissionController(
+            max_concurrency=4,
+            heavy_concurrency=1,
+            system_reserve=2,
+            client_concurrency=3,
+            rate=10,
+            client_rate=2,
+            client_burst=3,
+            stale_ttl=30,
+            clock=self.clock,
+        )
+
+    def test_classify(self):
+        """Тестируем классы запросов по адресу."""
+        self.assertEqual(READ, classify('/sensors/s1'))
+        self.assertEqual(HEAVY, classify('/test_sensor/7'))
+        self.assertEqual(SYSTEM, classify('/alarms/'))
+        self.assertEqual(SYSTEM, classify('/'))
+        # неизвестные адреса - в пределах лимитов
+        self.assertEqual(READ, classify('/unknown/'))
+
+    def test_client_rate_limited(self):
+        """Тестируем ограничение частоты запросов клиента."""
+        for _ in range(3):
+            self.assertIsNone(self.admission.admit('a', READ))
+            self.admission.release('a', READ)
+        self.assertAlmostEqual(0.5, self.admission.admit('a', READ))
+        # другие клиенты и запросы system не ограничиваются
+        self.assertIsNone(self.admission.admit('b', READ))
+        self.assertIsNone(self.admission.admit('a', SYSTEM))
+        self.clock.now = 0.5
+        self.assertIsNone(self.admission.admit('a', READ))
+        self.assertEqual(1, self.admission.report()[READ]['rejected'])
+
+    def test_global_rate_limited(self):
+        """Тестируем общее ограничение частоты без расхода токенов клиента."""
+        for client in range(10):
+            self.assertIsNone(self.admission.admit(str(client), READ))
+            self.admission.release(str(client), READ)
+        self.assertAlmostEqual(0.1, self.admission.admit('a', READ))
+        self.assertEqual(3, self.admission.client_buckets['a'].tokens)
+
+    def test_concurrency_and_priorities(self):
+        """Тестируем лимиты одновременных запросов и резерв system."""
+        self.assertIsNone(self.admission.admit('a', HEAVY))
+        self.assertIsNotNone(self.admission.admit('b', HEAVY))
+        self.assertIsNone(self.admission.admit('a', READ))
+        self.assertIsNone(self.admission.admit('a', READ))
+        # не больше client_concurrency запросов клиента
+        self.assertIsNotNone(self.admission.admit('a', READ))
+        self.assertIsNone(self.admission.admit('b', READ))
+        # не больше max_concurrency, system - в пределах резерва
+        self.assertIsNotNone(self.admission.admit('c', READ))
+        self.assertIsNone(self.admission.admit('c', SYSTEM))
+        self.assertIsNone(self.admission.admit('c', SYSTEM))
+        self.assertIsNotNone(self.admission.admit('c', SYSTEM))
+        self.admission.release('a', HEAVY)
+        self.assertIsNone(self.admission.admit('b', HEAVY))
+        report = self.admission.report()
+        self.assertEqual({SYSTEM: 2, READ: 3, HEAVY: 1}, report['in_flight'])
+        self.assertEqual(3, report['clients'])
+
+    def test_event_loop_lag_sheds_requests(self):
+        """Тестируем отклонение запросов при задержке event loop."""
+        self.admission.lag = 0.2
+        self.assertIsNotNone(self.admission.admit('a', READ))
+        self.assertIsNone(self.admission.admit('a', SYSTEM))
+
+    def test_stale_response(self):
+        """Тестируем ответ из кэша не старше stale_ttl."""
+        self.admission.remember('/sensors/?', [], b'[]')
+        self.clock.now = 30
+        self.assertEqual((30, [], b'[]'), self.admission.stale('/sensors/?'))
+        self.clock.now = 31
+        self.assertIsNone(self.admission.stale('/sensors/?'))
+        self.assertEqual(1, self.admission.report()[READ]['stale'])
+
+
+class TestAdmissionMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.admission = AdmissionController(
+            client_rate=1, client_burst=1, clock=self.clock
+        )
+        self.calls = 0
+
+    async def endpoint(self, scope, receive, send):
+        self.calls += 1
+        if scope['path'] == '/error/':
+            raise RuntimeError('endpoint failed')
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': f'{self.calls}'.encode()})
+
+    def request(
+        self,
+        path: str,
+        query: bytes = b'',
+        client: str = '10.0.0.1',
+        headers: list[tuple[bytes, bytes]] | None = None,
+    ) -> tuple[int, dict, bytes]:
+        app = SimpleNamespace(state=SimpleNamespace(admission=self.admission))
+        scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': query,
+            'headers': headers or [],
+            'client': (client, 50000),
+            'app': app,
+        }
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(AdmissionMiddleware(self.endpoint)(scope, None, send))
+        start, body = messages
+        return start['status'], dict(start['headers']), body['body']
+
+    def test_rejected_read_gets_stale_response(self):
+        """Тестируем ответ из кэша и 429 отклоненным запросам."""
+        self.assertEqual(
+            (200, b'1'), self.request('/sensors/', b'work_centers=s1')[::2]
+        )
+        status, headers, body = self.request('/sensors/', b'work_centers=s1')
+        self.assertEqual((200, b'1'), (status, body))
+        self.assertEqual(b'stale', headers[b'x-admission'])
+        status, headers, _ = self.request('/sensors/', b'work_centers=s2')
+        self.assertEqual((429, b'1'), (status, headers[b'retry-after']))
+        self.assertEqual(1, self.calls)
+
+    def test_client_behind_trusted_proxy(self):
+        """Тестируем лимиты клиентов за доверенным прокси по X-Real-IP."""
+        self.admission = AdmissionController(
+            client_rate=1,
+            client_burst=1,
+            trusted_proxies=['172.16.0.0/12'],
+            clock=self.clock,
+        )
+        for address in (b'192.168.1.10', b'192.168.1.11'):
+            status, _, _ = self.request(
+                '/sensors/s1', client='172.18.0.3', headers=[(b'x-real-ip', address)]
+            )
+            self.assertEqual(200, status)
+        status, _, _ = self.request(
+            '/sensors/s2',
+            client='172.18.0.3',
+            headers=[(b'x-real-ip', b'192.168.1.10')],
+        )
+        self.assertEqual(429, status)
+        # заголовок клиента не из доверенной сети не учитывается
+        for query in (b'1', b'2'):
+            status, _, _ = self.request(
+                '/sensors/s3',
+                query,
+                client='10.0.0.2',
+                headers=[(b'x-real-ip', b'192.168.1.1' + query)],
+            )
+        self.assertEqual(429, status)
+        self.assertIn('10.0.0.2', self.admission.client_buckets)
+
+    def test_released_after_error(self):
+        """Тестируем освобождение лимитов при ошибке обработчика."""
+        with self.assertRaises(RuntimeError):
+            self.request('/error/')
+        self.assertEqual({SYSTEM: 0, READ: 0, HEAVY: 0}, self.admission.in_flight)
+        self.assertEqual({}, self.admission.client_in_flight)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, TextIO
+
+from .pipeline import Sink
+
+
+def serialize(reading: dict[str, Any]) -> dict[str, Any]:
+    """
+    Показание для JSON: время отсчета (time.time()) в ISO 8601.
+    """
+    wall_time = reading['time']
+    return {
+        **reading,
+        'time': datetime.fromtimestamp(wall_time).isoformat() if wall_time else None,
+    }
+
+
+class FileSink(Sink):
+    """
+    Дописывает показания в локальный файл NDJSON.
+    """
+
+    name = 'file'
+
+    def __init__(self, path: str | Path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = Path(path)
+        self.file: TextIO | None = None
+
+    def append(self, readings: list[dict[str, Any]]) -> None:
+        if self.file is None:
+            self.file = self.path.open('a', encoding='utf-8')
+        self.file.writelines(
+            json.dumps(serialize(reading), ensure_ascii=False) + '\n'
+            for reading in readings
+        )
+        self.file.flush()
+
+    async def write(self, readings: list[dict[str, Any]]) -> None:
+        await self.run_blocking(self.append, readings)
+
+    async def close(self) -> None:
+        if self.file is not None:
+            await self.run_blocking(self.file.close)
+            self.file = None
+        await super().close()
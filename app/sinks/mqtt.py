@@ -0,0 +1,188 @@
+import asyncio
+import json
+from contextlib import suppress
+from typing import Any
+from urllib.parse import urlsplit
+
+from .file import serialize
+from .pipeline import Sink
+
+# Пакеты MQTT 3.1.1
+CONNECT = 0x10
+CONNACK = 0x20
+PUBLISH = 0x30
+DISCONNECT = 0xE0
+PROTOCOL_LEVEL = 4
+CLEAN_SESSION = 0x02
+USERNAME_FLAG = 0x80
+PASSWORD_FLAG = 0x40
+
+
+def encode_length(length: int) -> bytes:
+    """
+    Оставшаяся длина пакета: по 7 бит в байте, старший бит - продолжение.
+    """
+    encoded = bytearray()
+    while True:
+        length, byte = divmod(length, 128)
+        encoded.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(encoded)
+
+
+def encode_string(value: str | bytes) -> bytes:
+    if isinstance(value, str):
+        value = value.encode()
+    return len(value).to_bytes(2, 'big') + value
+
+
+def packet(header: int, body: bytes) -> bytes:
+    return bytes((header,)) + encode_length(len(body)) + body
+
+
+class MqttClient:
+    """
+    Минимальный клиент MQTT 3.1.1 для публикации с QoS 0
+    по постоянному соединению. Keep alive отключен.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 1883,
+        client_id: str = 'owen-pulse-counter',
+        username: str | None = None,
+        password: str | None = None,
+        timeout: float = 5.0,
+    ):
+        self.host = host
+        self.port = port
+        self.client_id = client_id
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> 'MqttClient':
+        """
+        :param url: mqtt://[user:password@]host[:port]
+        """
+        parts = urlsplit(url)
+        return cls(
+            parts.hostname or '127.0.0.1',
+            parts.port or 1883,
+            username=parts.username,
+            password=parts.password,
+            **kwargs,
+        )
+
+    @property
+    def connected(self) -> bool:
+        # брокер ничего не присылает после CONNACK, поэтому конец потока
+        # чтения означает закрытое брокером соединение
+        return (
+            self.writer is not None
+            and not self.writer.is_closing()
+            and not self.reader.at_eof()
+        )
+
+    async def connect(self) -> None:
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        flags = CLEAN_SESSION
+        payload = encode_string(self.client_id)
+        if self.username is not None:
+            flags |= USERNAME_FLAG
+            payload += encode_string(self.username)
+            if self.password is not None:
+                flags |= PASSWORD_FLAG
+                payload += encode_string(self.password)
+        body = (
+            encode_string('MQTT')
+            + bytes((PROTOCOL_LEVEL, flags))
+            + (0).to_bytes(2, 'big')
+            + payload
+        )
+        self.writer.write(packet(CONNECT, body))
+        try:
+            response = await asyncio.wait_for(self.reader.readexactly(4), self.timeout)
+        except (asyncio.IncompleteReadError, TimeoutError):
+            await self.close()
+            raise ConnectionError('Брокер MQTT не ответил на CONNECT') from None
+        if response[0] != CONNACK or response[3] != 0:
+            await self.close()
+            raise ConnectionError(f'Брокер MQTT отклонил подключение: {response[3]}')
+
+    def publish(self, topic: str, payload: bytes, retain: bool = False) -> None:
+        """
+        Добавляет пакет PUBLISH в буфер соединения, отправка - flush().
+        """
+        self.writer.write(packet(PUBLISH | retain, encode_string(topic) + payload))
+
+    async def flush(self) -> None:
+        await asyncio.wait_for(self.writer.drain(), self.timeout)
+
+    async def close(self) -> None:
+        writer, self.writer, self.reader = self.writer, None, None
+        if writer is None:
+            return
+        with suppress(Exception):
+            if not writer.is_closing():
+                writer.write(packet(DISCONNECT, b''))
+            writer.close()
+            await writer.wait_closed()
+
+
+class MqttSink(Sink):
+    """
+    Публикует показания в MQTT, каждый сенсор - в свой топик topic/<сенсор>.
+    Накопленные пакеты показаний отправляются одной записью в сокет
+    по постоянному соединению, при ошибке соединение открывается заново.
+    """
+
+    name = 'mqtt'
+
+    def __init__(
+        self,
+        url: str,
+        topic: str = 'owen/sensors',
+        retain: bool = False,
+        timeout: float = 5.0,
+        **kwargs,
+    ):
+        """
+        :param url: адрес брокера mqtt://[user:password@]host[:port],
+        :param topic: префикс топиков сенсоров,
+        :param retain: сохранять последнее показание на брокере.
+        """
+        super().__init__(**kwargs)
+        self.client = MqttClient.from_url(url, timeout=timeout)
+        self.topic = topic.rstrip('/')
+        self.retain = retain
+        self.connects = 0
+
+    async def write(self, readings: list[dict[str, Any]]) -> None:
+        for attempt in range(2):
+            try:
+                if not self.client.connected:
+                    await self.client.connect()
+                    self.connects += 1
+                for reading in readings:
+                    self.client.publish(
+                        f'{self.topic}/{reading["sensor"]}',
+                        json.dumps(serialize(reading)).encode(),
+                        retain=self.retain,
+                    )
+                await self.client.flush()
+                return
+            except (OSError, TimeoutError):
+                await self.client.close()
+                if attempt:
+                    raise
+
+    async def close(self) -> None:
+        await self.client.close()
+        await super().close()
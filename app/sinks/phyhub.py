@@ -0,0 +1,99 @@
+import logging
+import time
+from collections.abc import Callable
+from typing import Any
+
+import requests
+
+from app.owen_counter.owen_ci8 import OwenCI8
+
+from .pipeline import Sink
+
+logger = logging.getLogger(__name__)
+
+
+class PhyHubSink(Sink):
+    """
+    Отправляет в PhyHub скорость счета сенсоров (шт/мин) раз в interval
+    секунд. Скорость считается по показаниям опроса с предыдущей отправки,
+    соединение с PhyHub постоянное.
+    """
+
+    name = 'phyhub'
+
+    def __init__(
+        self,
+        url: str,
+        token: str,
+        timeout: float = 1.5,
+        interval: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        **kwargs,
+    ):
+        """
+        :param url: адрес приемника данных,
+        :param token: токен приемника данных,
+        :param timeout: таймаут запроса, с,
+        :param interval: период отправки, с,
+        :param clock: источник времени.
+        """
+        super().__init__(**kwargs)
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+        self.interval = interval
+        self.clock = clock
+        self.session = requests.Session()
+        self.sent_at: float | None = None
+        # (значение, time.time()) последнего показания и показания при отправке
+        self.latest: dict[str, tuple[int, float]] = {}
+        self.previous: dict[str, tuple[int, float]] = {}
+
+    def collect_rates(self) -> list[dict[str, Any]]:
+        """
+        Скорость счета сенсоров с предыдущей отправки, шт/мин.
+        """
+        for_sent = []
+        for name, (value, wall_time) in self.latest.items():
+            previous = self.previous.get(name)
+            if previous is None:
+                self.previous[name] = (value, wall_time)
+                continue
+            previous_value, previous_time = previous
+            duration = wall_time - previous_time
+            if duration <= 0:
+                continue
+            if value < previous_value:
+                value_diff = OwenCI8.MAX_VALUE - previous_value + value
+            else:
+                value_diff = value - previous_value
+            for_sent.append({'sensor': name, 'value': value_diff / duration * 60})
+            self.previous[name] = (value, wall_time)
+        return for_sent
+
+    def post(self, for_sent: list[dict[str, Any]]) -> Any:
+        response = self.session.post(
+            url=self.url,
+            headers={'Authorization': f'Token {self.token}'},
+            json=for_sent,
+            timeout=self.timeout,
+        )
+        return response.json()
+
+    async def write(self, readings: list[dict[str, Any]]) -> None:
+        for reading in readings:
+            if reading['status'] == 'OK' and reading['value'] is not None:
+                self.latest[reading['sensor']] = (reading['value'], reading['time'])
+        now = self.clock()
+        if self.sent_at is not None and now - self.sent_at < self.interval:
+            return
+        self.sent_at = now
+        for_sent = self.collect_rates()
+        logger.debug('for_sent=%s', for_sent)
+        if for_sent:
+            logger.info('Отправка данных в PhyHub..')
+            logger.info(await self.run_blocking(self.post, for_sent))
+
+    async def close(self) -> None:
+        self.session.close()
+        await super().close()
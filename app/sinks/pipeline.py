@@ -0,0 +1,191 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from typing import Any
+
+from app.owen_poller.error_log import ErrorAggregator
+
+logger = logging.getLogger(__name__)
+sink_errors = ErrorAggregator(logger)
+
+
+class Sink(ABC):
+    """
+    Получатель показаний. Пакеты показаний от опроса складываются
+    в собственную очередь размера queue_size и обрабатываются своей задачей,
+    поэтому медленный получатель не задерживает опрос и другие получатели.
+    При переполнении очереди отбрасывается самый старый пакет.
+    Блокирующие операции выполняются в собственном потоке (run_blocking).
+    Подкласс реализует write.
+    """
+
+    name = 'sink'
+
+    def __init__(self, queue_size: int = 100, max_batch: int = 50):
+        """
+        :param queue_size: размер очереди пакетов,
+        :param max_batch: максимальное число пакетов, обрабатываемых за раз.
+        """
+        self.queue: asyncio.Queue[list[dict[str, Any]]] = asyncio.Queue(queue_size)
+        self.max_batch = max_batch
+        self.executor: ThreadPoolExecutor | None = None
+        self.dropped = 0
+        self.written = 0
+        self.failures = 0
+        self.last_error: str | None = None
+
+    def offer(self, readings: list[dict[str, Any]]) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(readings)
+
+    async def run(self) -> None:
+        while True:
+            # пакеты очереди общие для всех получателей: дополняется копия
+            batch = list(await self.queue.get())
+            for _ in range(self.max_batch - 1):
+                if self.queue.empty():
+                    break
+                batch.extend(self.queue.get_nowait())
+            try:
+                await self.write(batch)
+            except Exception as err:
+                self.failures += 1
+                self.last_error = str(err)
+                sink_errors.failure(
+                    self.name,
+                    type(err).__name__,
+                    'Получатель %s: ошибка записи: %s',
+                    self.name,
+                    err,
+                )
+                continue
+            self.written += len(batch)
+            sink_errors.success(self.name)
+
+    @abstractmethod
+    async def write(self, readings: list[dict[str, Any]]) -> None:
+        """
+        Записывает пакет показаний, ошибка учитывается в failures.
+        """
+
+    async def run_blocking(self, func, *args) -> Any:
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f'sink-{self.name}'
+            )
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, func, *args
+        )
+
+    async def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+    def report(self) -> dict[str, Any]:
+        return {
+            'queued': self.queue.qsize(),
+            'dropped': self.dropped,
+            'written': self.written,
+            'failures': self.failures,
+            'last_error': self.last_error,
+        }
+
+
+class SinkPipeline:
+    """
+    Раздает показания каждого цикла опроса всем получателям.
+    """
+
+    def __init__(self, sinks: Iterable[Sink]):
+        self.sinks = list(sinks)
+        self.tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        self.tasks = [asyncio.create_task(sink.run()) for sink in self.sinks]
+
+    def publish(self, readings: list[dict[str, Any]]) -> None:
+        """
+        Передает пакет показаний получателям, не ожидая их обработки.
+        Вызывается из event loop.
+        """
+        if not readings:
+            return
+        for sink in self.sinks:
+            sink.offer(readings)
+
+    async def close(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        for task in self.tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+        self.tasks = []
+        for sink in self.sinks:
+            with suppress(Exception):
+                await sink.close()
+
+    def report(self) -> dict[str, dict[str, Any]]:
+        return {sink.name: sink.report() for sink in self.sinks}
+
+
+def build_pipeline(settings) -> SinkPipeline | None:
+    """
+    Получатели показаний из настроек SINKS (phyhub, mqtt, file).
+    POLLER_ACTIVE включает отправку в PhyHub.
+    :return: None, если получатели не заданы.
+    """
+    names = list(dict.fromkeys(settings.sinks))
+    if settings.poller_active and 'phyhub' not in names:
+        names.insert(0, 'phyhub')
+    sinks = []
+    for name in names:
+        if name == 'phyhub':
+            from .phyhub import PhyHubSink
+
+            sink = PhyHubSink(
+                url=settings.receiver_url,
+                token=settings.receiver_token,
+                timeout=settings.poller_connection_timeout,
+                interval=settings.phyhub_interval,
+                queue_size=settings.sink_queue_size,
+            )
+        elif name == 'mqtt':
+            from .mqtt import MqttSink
+
+            sink = MqttSink(
+                url=settings.mqtt_url,
+                topic=settings.mqtt_topic,
+                queue_size=settings.sink_queue_size,
+            )
+        elif name == 'file':
+            from .file import FileSink
+
+            sink = FileSink(settings.sink_file, queue_size=settings.sink_queue_size)
+        else:
+            raise ValueError(f'Неизвестный получатель показаний: {name}')
+        sinks.append(sink)
+    return SinkPipeline(sinks) if sinks else None
+
+
+def build_alarm_pipeline(settings) -> SinkPipeline | None:
+    """
+    Получатели событий тревог из настроек ALARM_WEBHOOKS.
+    :return: None, если получатели не заданы.
+    """
+    from .webhook import WebhookSink
+
+    sinks = [
+        WebhookSink(
+            url,
+            timeout=settings.poller_connection_timeout,
+            name=f'webhook {url}',
+            queue_size=settings.sink_queue_size,
+        )
+        for url in dict.fromkeys(settings.alarm_webhooks)
+    ]
+    return SinkPipeline(sinks) if sinks else None
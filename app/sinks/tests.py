@@ -0,0 +1,203 @@
+import asyncio
+import json
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+from app.dummy.mqtt_broker import EmulatedBroker
+
+from .file import FileSink
+from .mqtt import MqttSink, encode_length
+from .phyhub import PhyHubSink
+from .pipeline import Sink, SinkPipeline
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def reading(name: str, value: int | None, wall_time: float = 1000.0) -> dict:
+    return {'sensor': name, 'value': value, 'time': wall_time, 'status': 'OK'}
+
+
+class RecordingSink(Sink):
+    def __init__(self, name: str, delay: float = 0.0, fail: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+
+    async def write(self, readings):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            self.fail = False
+            raise OSError('Получатель недоступен')
+        self.batches.append(readings)
+
+
+async def settle(*sinks: Sink, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while any(not sink.queue.empty() for sink in sinks):
+        if time.monotonic() > deadline:
+            raise TimeoutError
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+
+
+class TestSinkPipeline(unittest.TestCase):
+    def test_slow_sink_does_not_stall_others(self):
+        """Тестируем независимые ограниченные очереди получателей."""
+
+        async def run():
+            fast = RecordingSink('fast', max_batch=1)
+            slow = RecordingSink('slow', delay=0.2, queue_size=2)
+            pipeline = SinkPipeline([fast, slow])
+            pipeline.start()
+            started = time.perf_counter()
+            for step in range(10):
+                pipeline.publish([reading('s1', step)])
+                await asyncio.sleep(0.01)
+            elapsed = time.perf_counter() - started
+            await settle(fast)
+            report = pipeline.report()
+            await pipeline.close()
+            return fast, elapsed, report
+
+        fast, elapsed, report = asyncio.run(run())
+        self.assertLess(elapsed, 0.2)
+        self.assertEqual(list(range(10)), [batch[0]['value'] for batch in fast.batches])
+        self.assertEqual(10, report['fast']['written'])
+        self.assertGreater(report['slow']['dropped'], 0)
+        self.assertLess(report['slow']['written'], 10)
+
+    def test_sink_without_write_rejected(self):
+        """Тестируем ошибку создания получателя без write."""
+
+        class Incomplete(Sink):
+            name = 'incomplete'
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_failed_write_does_not_stop_sink(self):
+        """Тестируем продолжение работы получателя после ошибки записи."""
+
+        async def run():
+            sink = RecordingSink('flaky', fail=True, max_batch=1)
+            pipeline = SinkPipeline([sink])
+            pipeline.start()
+            pipeline.publish([reading('s1', 1)])
+            await settle(sink)
+            pipeline.publish([reading('s1', 2)])
+            await settle(sink)
+            await pipeline.close()
+            return sink
+
+        with self.assertLogs('app.sinks.pipeline'):
+            sink = asyncio.run(run())
+        self.assertEqual((1, 1), (sink.failures, sink.written))
+        self.assertEqual(2, sink.batches[0][0]['value'])
+
+
+class TestMqttSink(unittest.TestCase):
+    def setUp(self):
+        self.broker = EmulatedBroker().start()
+        self.addCleanup(self.broker.stop)
+
+    def test_encode_length(self):
+        """Тестируем кодирование оставшейся длины пакета MQTT."""
+        self.assertEqual(b'\x00', encode_length(0))
+        self.assertEqual(b'\x7f', encode_length(127))
+        self.assertEqual(b'\x80\x01', encode_length(128))
+        self.assertEqual(b'\xff\xff\x7f', encode_length(2_097_151))
+
+    def test_publish_per_sensor_topic_over_one_connection(self):
+        """Тестируем публикацию в топики сенсоров по постоянному соединению."""
+
+        async def run():
+            sink = MqttSink(self.broker.url, topic='plant/owen/')
+            pipeline = SinkPipeline([sink])
+            pipeline.start()
+            for step in range(3):
+                pipeline.publish([reading('s1', step), reading('s2', None)])
+                await settle(sink)
+            self.broker.drop_clients()
+            await asyncio.sleep(0.05)
+            pipeline.publish([reading('s1', 3)])
+            await settle(sink)
+            await pipeline.close()
+            return sink
+
+        sink = asyncio.run(run())
+        time.sleep(0.05)
+        topics = [topic for topic, _ in self.broker.messages]
+        self.assertEqual(['plant/owen/s1', 'plant/owen/s2'] * 3, topics[:6])
+        payloads = [json.loads(payload) for _, payload in self.broker.messages]
+        self.assertEqual(
+            [0, None, 1, None, 2, None], [p['value'] for p in payloads[:6]]
+        )
+        self.assertEqual(
+            datetime.fromtimestamp(1000.0).isoformat(), payloads[0]['time']
+        )
+        # соединение восстанавливается после обрыва, публикации не теряются
+        self.assertEqual(('plant/owen/s1', 3), (topics[-1], payloads[-1]['value']))
+        self.assertEqual(2, sink.connects)
+        self.assertEqual(2, self.broker.connects)
+
+
+class TestFileSink(unittest.TestCase):
+    def test_ndjson_appended(self):
+        """Тестируем дозапись показаний в файл NDJSON."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = Path(tmp.name) / 'readings.ndjson'
+
+        async def run():
+            sink = FileSink(path)
+            await sink.write([reading('s1', 1), reading('s2', None, 0.0)])
+            await sink.write([reading('s1', 2)])
+            await sink.close()
+
+        asyncio.run(run())
+        rows = [json.loads(line) for line in path.read_text().splitlines()]
+        self.assertEqual([1, None, 2], [row['value'] for row in rows])
+        self.assertIsNone(rows[1]['time'])
+
+
+class TestPhyHubSink(unittest.TestCase):
+    def test_rates_sent_every_interval(self):
+        """Тестируем отправку скорости счета раз в interval с учетом переполнения."""
+        clock = FakeClock()
+        sent = []
+
+        class Sink(PhyHubSink):
+            def post(self, for_sent):
+                sent.append(for_sent)
+                return {}
+
+        sink = Sink('http://127.0.0.1:8000/', 'token', interval=30, clock=clock)
+
+        async def run():
+            await sink.write([reading('s1', 100, 1000.0), reading('s2', 9_999_990)])
+            clock.now = 10
+            await sink.write([reading('s1', 200, 1010.0)])
+            clock.now = 30
+            await sink.write([reading('s1', 400, 1030.0), reading('s2', 20, 1030.0)])
+            await sink.close()
+
+        asyncio.run(run())
+        self.assertEqual(
+            [[{'sensor': 's1', 'value': 600.0}, {'sensor': 's2', 'value': 58.0}]],
+            sent,
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import time
+from typing import Any
+
+import requests
+
+from .file import serialize
+from .pipeline import Sink
+
+
+class WebhookSink(Sink):
+    """
+    Отправляет накопленные записи одним POST запросом JSON массива
+    по постоянному соединению. Неудачная отправка повторяется
+    до attempts раз с тем же содержимым.
+    """
+
+    name = 'webhook'
+
+    def __init__(
+        self,
+        url: str,
+        timeout: float = 1.5,
+        attempts: int = 3,
+        retry_delay: float = 0.5,
+        name: str | None = None,
+        **kwargs,
+    ):
+        """
+        :param url: адрес получателя,
+        :param timeout: таймаут запроса, с,
+        :param attempts: число попыток отправки,
+        :param retry_delay: пауза перед повторной попыткой, с,
+        :param name: имя получателя в отчете конвейера.
+        """
+        super().__init__(**kwargs)
+        if name is not None:
+            self.name = name
+        self.url = url
+        self.timeout = timeout
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self.session = requests.Session()
+
+    def post(self, items: list[dict[str, Any]]) -> None:
+        body = [serialize(item) for item in items]
+        for attempt in range(1, self.attempts + 1):
+            try:
+                response = self.session.post(self.url, json=body, timeout=self.timeout)
+                response.raise_for_status()
+                return
+            except requests.RequestException:
+                if attempt == self.attempts:
+                    raise
+                time.sleep(self.retry_delay)
+
+    async def write(self, items: list[dict[str, Any]]) -> None:
+        await self.run_blocking(self.post, items)
+
+    async def close(self) -> None:
+        self.session.close()
+        await super().close()
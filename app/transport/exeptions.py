@@ -0,0 +1,5 @@
+class ReplayMismatchError(Exception):
+    def __init__(self, expected, actual):
+        super().__init__(
+            f'Запрос не совпадает с журналом обмена: {actual}. Ожидалось: {expected}.'
+        )
@@ -0,0 +1,44 @@
+from typing import Any
+
+from serial import Serial
+
+from .recorder import RecordingSerial
+from .replay import ReplaySerial
+from .tcp import TcpSerial, parse_tcp_url
+
+
+def open_serial(serial_settings: dict[str, Any], record: bool = True) -> Any:
+    """
+    Открывает порт по настройкам serial_settings.
+    Порт вида tcp://host:port открывается через шлюз Ethernet - RS-485.
+    Кроме параметров serial.Serial поддерживаются ключи:
+      - record: файл журнала обмена, в который пишется весь трафик порта;
+      - replay: файл журнала обмена, воспроизводимого вместо порта;
+      - replay_speed: ускорение воспроизведения (0 - без задержек);
+      - replay_mode: режим сопоставления запросов ReplaySerial.
+    :param record: вести журнал обмена, если он задан в настройках.
+      Вспомогательные подключения к тому же порту журнал не ведут.
+    """
+    serial_settings = dict(serial_settings)
+    record_path = serial_settings.pop('record', None)
+    replay_path = serial_settings.pop('replay', None)
+    replay_speed = serial_settings.pop('replay_speed', 1.0)
+    replay_mode = serial_settings.pop('replay_mode', ReplaySerial.BY_REQUEST)
+    if replay_path:
+        return ReplaySerial(
+            replay_path, speed=replay_speed, mode=replay_mode, **serial_settings
+        )
+    if parse_tcp_url(str(serial_settings.get('port', ''))):
+        serial = TcpSerial(**serial_settings)
+        try:
+            serial.connect()
+        except OSError:
+            serial.close()
+            raise
+    else:
+        serial = Serial(**serial_settings)
+        serial.close()
+        serial.open()
+    if record and record_path:
+        return RecordingSerial(serial, record_path)
+    return serial
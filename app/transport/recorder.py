@@ -0,0 +1,115 @@
+import struct
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO
+
+# Формат журнала обмена:
+#   заголовок: MAGIC + <d (время начала записи, unix time)
+#   запись:    <QBH (смещение от начала записи, нс; направление; длина) + байты
+MAGIC = b'OWENREC1'
+HEADER = struct.Struct('<d')
+RECORD = struct.Struct('<QBH')
+
+TX = 0
+RX = 1
+
+
+@dataclass(slots=True)
+class TrafficRecord:
+    offset_ns: int
+    direction: int
+    data: bytes
+
+
+def read_records(path: str | Path) -> tuple[float, list[TrafficRecord]]:
+    """
+    Читает журнал обмена.
+    :return: время начала записи и список записей.
+    """
+    raw = Path(path).read_bytes()
+    if raw[: len(MAGIC)] != MAGIC:
+        raise ValueError(f'{path} не является журналом обмена')
+    position = len(MAGIC)
+    (started_at,) = HEADER.unpack_from(raw, position)
+    position += HEADER.size
+    return started_at, list(_iter_records(raw, position))
+
+
+def _iter_records(raw: bytes, position: int) -> Iterator[TrafficRecord]:
+    while position + RECORD.size <= len(raw):
+        offset_ns, direction, length = RECORD.unpack_from(raw, position)
+        position += RECORD.size
+        # обрезанная последняя запись (процесс был остановлен при записи)
+        if position + length > len(raw):
+            return
+        yield TrafficRecord(offset_ns, direction, raw[position : position + length])
+        position += length
+
+
+class RecordingSerial:
+    """
+    Прозрачная обертка над портом, записывающая все переданные и принятые байты
+    с метками времени в двоичный журнал.
+    Пустой прием (таймаут) также записывается.
+    """
+
+    BUFFER_SIZE: int = 64 * 1024
+    FLUSH_INTERVAL_NS: int = 1_000_000_000
+
+    def __init__(self, serial_if: Any, path: str | Path):
+        """
+        :param serial_if: порт с интерфейсом serial.Serial,
+        :param path: файл журнала.
+        """
+        self.serial_if = serial_if
+        self.path = Path(path)
+        self._file: BinaryIO = self.path.open('wb')
+        self._file.write(MAGIC + HEADER.pack(time.time()))
+        self._buffer = bytearray()
+        self._started = time.monotonic_ns()
+        self._flushed = self._started
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.serial_if, name)
+
+    @property
+    def baudrate(self) -> int:
+        return self.serial_if.baudrate
+
+    @baudrate.setter
+    def baudrate(self, value: int) -> None:
+        # подбор скорости шины меняет скорость порта на ходу
+        self.serial_if.baudrate = value
+
+    def _record(self, direction: int, data: bytes) -> None:
+        now = time.monotonic_ns()
+        self._buffer += RECORD.pack(now - self._started, direction, len(data))
+        self._buffer += data
+        if (
+            len(self._buffer) >= self.BUFFER_SIZE
+            or now - self._flushed >= self.FLUSH_INTERVAL_NS
+        ):
+            self.flush_records()
+
+    def flush_records(self) -> None:
+        self._file.write(self._buffer)
+        self._file.flush()
+        self._buffer.clear()
+        self._flushed = time.monotonic_ns()
+
+    def write(self, data: bytes | bytearray) -> int | None:
+        self._record(TX, bytes(data))
+        return self.serial_if.write(data)
+
+    def read(self, size: int = 1) -> bytes:
+        data = self.serial_if.read(size)
+        self._record(RX, data)
+        return data
+
+    def close(self) -> None:
+        self.serial_if.close()
+        if not self._file.closed:
+            self.flush_records()
+            self._file.close()
@@ -0,0 +1,148 @@
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+
+from .exeptions import ReplayMismatchError
+from .recorder import RX, TX, TrafficRecord, read_records
+
+
+class ReplaySerial:
+    """
+    Порт, воспроизводящий журнал обмена, записанный RecordingSerial.
+
+    Режимы сопоставления запросов:
+      - sequential: запросы должны идти в записанном порядке;
+      - by_request: ответ выбирается из очереди ответов на тот же запрос,
+        что позволяет менять порядок опроса (планировщик) при воспроизведении.
+
+    Задержка ответа относительно запроса воспроизводится с ускорением speed,
+    при speed = 0 ответы выдаются без задержек.
+    """
+
+    SEQUENTIAL = 'sequential'
+    BY_REQUEST = 'by_request'
+
+    def __init__(
+        self,
+        path: str | Path,
+        speed: float = 1.0,
+        mode: str = BY_REQUEST,
+        loop: bool = False,
+        timeout: float | None = None,
+        **kwargs,
+    ):
+        """
+        :param path: файл журнала,
+        :param speed: ускорение воспроизведения (1 - исходная скорость),
+        :param mode: режим сопоставления запросов,
+        :param loop: начинать журнал заново после окончания.
+        """
+        if mode not in (self.SEQUENTIAL, self.BY_REQUEST):
+            raise ValueError(f'Неизвестный режим воспроизведения: {mode}')
+        self.path = Path(path)
+        self.speed = speed
+        self.mode = mode
+        self.loop = loop
+        self.timeout = timeout
+        self.is_open = True
+        _, self.records = read_records(self.path)
+        self.exchanges = self._build_exchanges(self.records)
+        self._rewind()
+        self._pending: deque[tuple[int, bytes]] = deque()
+        self._rx_buffer = bytearray()
+        self._tx_offset_ns = 0
+        self._tx_time = 0.0
+
+    @staticmethod
+    def _build_exchanges(
+        records: list[TrafficRecord],
+    ) -> list[tuple[TrafficRecord, list[TrafficRecord]]]:
+        """
+        Группирует записи в транзакции: запрос и следующие за ним приемы.
+        """
+        exchanges = []
+        for record in records:
+            if record.direction == TX:
+                exchanges.append((record, []))
+            elif record.direction == RX and exchanges:
+                exchanges[-1][1].append(record)
+        return exchanges
+
+    def _rewind(self) -> None:
+        self._sequence = deque(self.exchanges)
+        self._by_request: dict[bytes, deque] = defaultdict(deque)
+        for exchange in self.exchanges:
+            self._by_request[exchange[0].data].append(exchange)
+
+    def _next_exchange(
+        self, data: bytes
+    ) -> tuple[TrafficRecord, list[TrafficRecord]] | None:
+        if self.mode == self.SEQUENTIAL:
+            if not self._sequence:
+                return None
+            exchange = self._sequence.popleft()
+            if exchange[0].data != data:
+                raise ReplayMismatchError(expected=exchange[0].data, actual=data)
+            return exchange
+        queue = self._by_request.get(data)
+        return queue.popleft() if queue else None
+
+    @property
+    def exhausted(self) -> bool:
+        if self.mode == self.SEQUENTIAL:
+            return not self._sequence
+        return not any(self._by_request.values())
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._rx_buffer)
+
+    def open(self) -> None:
+        self.is_open = True
+
+    def close(self) -> None:
+        self.is_open = False
+
+    def reset_input_buffer(self) -> None:
+        self._rx_buffer.clear()
+        self._pending.clear()
+
+    def flush(self) -> None:
+        pass
+
+    def write(self, data: bytes | bytearray) -> int:
+        data = bytes(data)
+        exchange = self._next_exchange(data)
+        if exchange is None and self.loop and self.exchanges:
+            self._rewind()
+            exchange = self._next_exchange(data)
+        self._pending.clear()
+        if exchange is not None:
+            request, responses = exchange
+            self._tx_offset_ns = request.offset_ns
+            self._tx_time = time.monotonic()
+            self._pending.extend(
+                (response.offset_ns, response.data) for response in responses
+            )
+        return len(data)
+
+    def _wait_until(self, offset_ns: int) -> None:
+        if not self.speed:
+            return
+        delay = (offset_ns - self._tx_offset_ns) / 1e9 / self.speed
+        remaining = self._tx_time + delay - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def read(self, size: int = 1) -> bytes:
+        # при исходном размере чтения одна запись приема соответствует одному read
+        if not self._rx_buffer and self._pending:
+            offset_ns, data = self._pending.popleft()
+            self._wait_until(offset_ns)
+            self._rx_buffer += data
+        elif not self._rx_buffer and self.speed and self.timeout:
+            # транзакция не найдена в журнале - устройство молчит
+            time.sleep(self.timeout / self.speed)
+        chunk = bytes(self._rx_buffer[:size])
+        del self._rx_buffer[:size]
+        return chunk
@@ -0,0 +1,277 @@
+import logging
+import socket
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+TCP_SCHEME = 'tcp'
+
+
+def parse_tcp_url(url: str) -> tuple[str, int] | None:
+    """
+    Разбирает адрес шлюза вида tcp://host:port.
+    :return: (host, port) или None, если адрес не является адресом шлюза.
+    """
+    parts = urlsplit(url)
+    if parts.scheme != TCP_SCHEME:
+        return None
+    if not parts.hostname or not parts.port:
+        raise ValueError(f'Неверный адрес шлюза: {url}. Ожидалось tcp://host:port')
+    return parts.hostname, parts.port
+
+
+class TcpConnection:
+    """
+    Постоянное соединение со шлюзом Ethernet - RS-485.
+    После обрыва соединение восстанавливается при следующем обращении,
+    неудачные попытки подключения повторяются с экспоненциальной задержкой.
+    Соединение разделяют все TcpSerial шлюза: транзакция (запрос и ответ)
+    выполняется под lock, users - число открытых TcpSerial.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        connect_timeout: float = 1.0,
+        backoff_min: float = 0.5,
+        backoff_max: float = 30.0,
+    ):
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.lock = threading.RLock()
+        self.users = 0
+        self.sock: socket.socket | None = None
+        self.backoff = backoff_min
+        self.retry_at = 0.0
+        self.reconnects = 0
+
+    @property
+    def name(self) -> str:
+        return f'{TCP_SCHEME}://{self.host}:{self.port}'
+
+    @property
+    def connected(self) -> bool:
+        return self.sock is not None
+
+    def connect(self) -> socket.socket:
+        if self.sock is not None:
+            return self.sock
+        now = time.monotonic()
+        if now < self.retry_at:
+            raise ConnectionError(
+                f'Шлюз {self.name} недоступен, повтор через {self.retry_at - now:.1f} с'
+            )
+        try:
+            sock = socket.create_connection(
+                (self.host, self.port), timeout=self.connect_timeout
+            )
+        except OSError:
+            self.retry_at = now + self.backoff
+            self.backoff = min(self.backoff * 2, self.backoff_max)
+            raise
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        if self.reconnects:
+            logger.info('Соединение со шлюзом %s восстановлено', self.name)
+        self.reconnects += 1
+        self.backoff = self.backoff_min
+        self.retry_at = 0.0
+        self.sock = sock
+        return sock
+
+    def drop(self) -> None:
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            finally:
+                self.sock = None
+
+    def discard_input(self) -> None:
+        if self.sock is None:
+            return
+        self.sock.setblocking(False)
+        try:
+            while self.sock.recv(4096):
+                pass
+            # recv вернул b'' - шлюз закрыл соединение
+            self.drop()
+        except (BlockingIOError, InterruptedError):
+            self.sock.setblocking(True)
+        except OSError:
+            self.drop()
+
+    def send(self, data: bytes) -> None:
+        sock = self.connect()
+        try:
+            sock.sendall(data)
+        except OSError:
+            self.drop()
+            raise
+
+    def recv(self, size: int, timeout: float | None) -> bytes:
+        """
+        Принимает до size байт в течение timeout, как serial.Serial.read.
+        """
+        sock = self.connect()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        data = bytearray()
+        try:
+            while len(data) < size:
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    sock.settimeout(remaining)
+                else:
+                    sock.settimeout(None)
+                try:
+                    chunk = sock.recv(size - len(data))
+                except TimeoutError:
+                    break
+                if not chunk:
+                    self.drop()
+                    raise ConnectionResetError(f'Шлюз {self.name} закрыл соединение')
+                data += chunk
+        except OSError:
+            self.drop()
+            raise
+        return bytes(data)
+
+    def close(self) -> None:
+        with self.lock:
+            self.drop()
+
+
+class TcpConnectionPool:
+    """
+    Пул постоянных соединений со шлюзами. Одно соединение на шлюз,
+    соединение закрывается, когда его освобождает последний TcpSerial.
+    """
+
+    def __init__(self, **connection_kwargs):
+        self.connection_kwargs = connection_kwargs
+        self.connections: dict[tuple[str, int], TcpConnection] = {}
+        self.lock = threading.Lock()
+
+    def get(self, host: str, port: int, **connection_kwargs) -> TcpConnection:
+        with self.lock:
+            connection = self.connections.get((host, port))
+            if connection is None:
+                connection = TcpConnection(
+                    host, port, **{**self.connection_kwargs, **connection_kwargs}
+                )
+                self.connections[(host, port)] = connection
+            connection.users += 1
+            return connection
+
+    def release(self, connection: TcpConnection) -> None:
+        with self.lock:
+            connection.users -= 1
+            if connection.users > 0:
+                return
+            self.connections.pop((connection.host, connection.port), None)
+        connection.close()
+
+    def close(self) -> None:
+        with self.lock:
+            for connection in self.connections.values():
+                connection.close()
+            self.connections.clear()
+
+
+default_pool = TcpConnectionPool()
+
+
+class TcpSerial:
+    """
+    Порт Owen поверх TCP с интерфейсом serial.Serial
+    для шлюзов Ethernet - RS-485 в прозрачном режиме.
+    Порты одного шлюза разделяют соединение пула: close() освобождает
+    только этот порт, обмен других пользователей шлюза не прерывается.
+    """
+
+    def __init__(
+        self,
+        port: str,
+        timeout: float | None = 0.2,
+        connect_timeout: float = 1.0,
+        backoff_min: float = 0.5,
+        backoff_max: float = 30.0,
+        pool: TcpConnectionPool | None = None,
+        **kwargs,
+    ):
+        """
+        :param port: адрес шлюза tcp://host:port,
+        :param timeout: таймаут ответа, с,
+        :param connect_timeout: таймаут подключения, с,
+        :param backoff_min: начальная задержка повторного подключения, с,
+        :param backoff_max: максимальная задержка повторного подключения, с,
+        :param pool: пул соединений.
+        Параметры линии (baudrate и др.) задаются в настройках шлюза и игнорируются.
+        """
+        address = parse_tcp_url(port)
+        if address is None:
+            raise ValueError(f'Неверный адрес шлюза: {port}. Ожидалось tcp://host:port')
+        self.port = port
+        self.timeout = timeout
+        self.pool = pool or default_pool
+        self.address = address
+        self.connection_kwargs = {
+            'connect_timeout': connect_timeout,
+            'backoff_min': backoff_min,
+            'backoff_max': backoff_max,
+        }
+        self.connection = self.pool.get(*address, **self.connection_kwargs)
+        self.is_open = True
+
+    def connect(self) -> None:
+        """
+        Подключается к шлюзу: недоступный шлюз обнаруживается
+        при открытии порта, а не при первом обмене.
+        """
+        with self.connection.lock:
+            self.connection.connect()
+
+    def open(self) -> None:
+        if not self.is_open:
+            self.connection = self.pool.get(*self.address, **self.connection_kwargs)
+            self.is_open = True
+
+    def close(self) -> None:
+        if self.is_open:
+            self.is_open = False
+            self.pool.release(self.connection)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Запрос и ответ без обмена других пользователей соединения:
+        reset_input_buffer, write и read внутри контекста выполняются
+        под одной блокировкой.
+        """
+        with self.connection.lock:
+            yield
+
+    def reset_input_buffer(self) -> None:
+        with self.connection.lock:
+            self.connection.discard_input()
+
+    def flush(self) -> None:
+        pass
+
+    def write(self, data: bytes | bytearray) -> int:
+        with self.connection.lock:
+            self.connection.send(bytes(data))
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        with self.connection.lock:
+            return self.connection.recv(size, self.timeout)
@@ -0,0 +1,191 @@
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.dummy.emulator import EmulatedCI8, OwenBusEmulator
+from app.dummy.gateway import EmulatedGateway
+from app.owen_counter.owen_ci8 import OwenCI8
+
+from .exeptions import ReplayMismatchError
+from .recorder import RX, TX, RecordingSerial, read_records
+from .replay import ReplaySerial
+from .tcp import TcpConnectionPool, TcpSerial
+
+
+class TestTrafficReplay(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / 'bus.owenrec'
+        self.devices = [OwenCI8(addr=1), OwenCI8(addr=2), OwenCI8(addr=3)]
+        bus = OwenBusEmulator(
+            [
+                EmulatedCI8(addr=1, pcs_per_min=6000),
+                EmulatedCI8(addr=2, pcs_per_min=600),
+                EmulatedCI8(addr=3, online=False),
+            ]
+        )
+        recorder = RecordingSerial(bus, self.path)
+        self.recorded = [self.read_all(recorder) for _ in range(3)]
+        recorder.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_all(self, serial_if) -> list:
+        values = []
+        for device in self.devices:
+            try:
+                values.append(device.read_parameter(serial_if, OwenCI8.DCNT))
+            except TimeoutError:
+                values.append(None)
+        return values
+
+    def test_log_contains_timestamped_exchanges(self):
+        """Тестируем запись запросов, ответов и таймаутов в журнал."""
+        _, records = read_records(self.path)
+        self.assertEqual(18, len(records))
+        self.assertEqual([TX, RX] * 9, [record.direction for record in records])
+        self.assertEqual(b'', records[5].data, 'Таймаут не записан!')
+        offsets = [record.offset_ns for record in records]
+        self.assertEqual(sorted(offsets), offsets)
+
+    def test_sequential_replay(self):
+        """Тестируем воспроизведение журнала в исходном порядке."""
+        replay = ReplaySerial(self.path, speed=0, mode=ReplaySerial.SEQUENTIAL)
+        replayed = [self.read_all(replay) for _ in range(3)]
+        self.assertEqual(self.recorded, replayed)
+        self.assertTrue(replay.exhausted)
+
+    def test_sequential_replay_rise_exception_on_mismatch(self):
+        """Тестируем поднятие исключения при изменении порядка опроса."""
+        replay = ReplaySerial(self.path, speed=0, mode=ReplaySerial.SEQUENTIAL)
+        with self.assertRaises(ReplayMismatchError):
+            self.devices[1].read_parameter(replay, OwenCI8.DCNT)
+
+    def test_replay_by_request_with_changed_order(self):
+        """Тестируем воспроизведение при измененном порядке опроса."""
+        replay = ReplaySerial(self.path, speed=0)
+        self.devices.reverse()
+        replayed = [self.read_all(replay)[::-1] for _ in range(3)]
+        self.assertEqual(self.recorded, replayed)
+
+    def test_truncated_log(self):
+        """Тестируем чтение журнала с оборванной последней записью."""
+        raw = self.path.read_bytes()
+        self.path.write_bytes(raw[:-3])
+        _, records = read_records(self.path)
+        self.assertEqual(17, len(records))
+
+
+class TestTcpTransport(unittest.TestCase):
+    def setUp(self):
+        self.pool = TcpConnectionPool()
+        self.gateway = EmulatedGateway(
+            OwenBusEmulator([EmulatedCI8(addr=1), EmulatedCI8(addr=2, online=False)])
+        ).start()
+        self.device = OwenCI8(addr=1)
+
+    def tearDown(self):
+        self.pool.close()
+        self.gateway.stop()
+
+    def open(self, url: str) -> TcpSerial:
+        return TcpSerial(url, timeout=0.1, backoff_min=0.05, pool=self.pool)
+
+    def test_read_parameter_over_tcp(self):
+        """Тестируем чтение параметров через шлюз по постоянному соединению."""
+        serial_if = self.open(self.gateway.url)
+        for _ in range(10):
+            self.assertIsInstance(
+                self.device.read_parameter(serial_if, OwenCI8.DCNT), int
+            )
+        with self.assertRaises(TimeoutError):
+            OwenCI8(addr=2).read_parameter(serial_if, OwenCI8.DCNT)
+        self.assertEqual(1, serial_if.connection.reconnects)
+
+    def test_pool_shares_connection_per_gateway(self):
+        """Тестируем одно соединение пула на шлюз."""
+        first = self.open(self.gateway.url)
+        second = self.open(self.gateway.url)
+        self.assertIs(first.connection, second.connection)
+
+    def test_close_releases_handle_not_shared_connection(self):
+        """Тестируем закрытие порта без разрыва соединения других портов шлюза."""
+        poller = self.open(self.gateway.url)
+        self.device.read_parameter(poller, OwenCI8.DCNT)
+        probe = self.open(self.gateway.url)
+        self.device.read_parameter(probe, OwenCI8.DCNT)
+        probe.close()
+        self.assertTrue(poller.connection.connected)
+        self.device.read_parameter(poller, OwenCI8.DCNT)
+        self.assertEqual(1, poller.connection.reconnects)
+        poller.close()
+        self.assertFalse(poller.connection.connected)
+        self.assertEqual({}, self.pool.connections)
+
+    def test_transactions_not_interleaved(self):
+        """Тестируем запрос и ответ под одной блокировкой соединения."""
+        gateway = EmulatedGateway(
+            OwenBusEmulator(
+                [EmulatedCI8(addr=1), EmulatedCI8(addr=3)],
+                turnaround=0.005,
+                realtime=True,
+            )
+        ).start()
+        self.addCleanup(gateway.stop)
+
+        def poll(addr: int) -> list:
+            serial_if = self.open(gateway.url)
+            device = OwenCI8(addr=addr)
+            return [device.read_parameter(serial_if, OwenCI8.DCNT) for _ in range(20)]
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(poll, (1, 3)))
+        self.assertEqual([20, 20], [len(values) for values in results])
+
+    def test_reconnect_with_backoff(self):
+        """Тестируем восстановление соединения после перезапуска шлюза."""
+        serial_if = self.open(self.gateway.url)
+        self.device.read_parameter(serial_if, OwenCI8.DCNT)
+        port = self.gateway.port
+        self.gateway.stop()
+        for _ in range(2):
+            with self.assertRaises(OSError):
+                self.device.read_parameter(serial_if, OwenCI8.DCNT)
+        # пока идет задержка повтора, подключение не выполняется
+        started = time.monotonic()
+        with self.assertRaises(ConnectionError):
+            self.device.read_parameter(serial_if, OwenCI8.DCNT)
+        self.assertLess(time.monotonic() - started, 0.01)
+
+        self.gateway = EmulatedGateway(self.gateway.bus, port=port).start()
+        time.sleep(0.2)
+        self.assertIsInstance(self.device.read_parameter(serial_if, OwenCI8.DCNT), int)
+        self.assertEqual(2, serial_if.connection.reconnects)
+
+    def test_gateways_polled_concurrently(self):
+        """Тестируем параллельный опрос нескольких шлюзов."""
+        gateways = [
+            EmulatedGateway(
+                OwenBusEmulator([EmulatedCI8(addr=1)], turnaround=0.05, realtime=True)
+            ).start()
+            for _ in range(4)
+        ]
+        self.addCleanup(lambda: [gateway.stop() for gateway in gateways])
+        ports = [self.open(gateway.url) for gateway in gateways]
+
+        def poll(serial_if):
+            for _ in range(4):
+                self.device.read_parameter(serial_if, OwenCI8.DCNT)
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(ports)) as executor:
+            list(executor.map(poll, ports))
+        # последовательный опрос занял бы не менее 4 * 4 * 0.05 с
+        self.assertLess(time.monotonic() - started, 0.6)
+
+
+if __name__ == '__main__':
+    unittest.main()
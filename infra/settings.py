@@ -10,7 +10,17 @@ serial_settings: dict[str, Any] = {
     'bytesize': 8,
     'parity': 'N',
     'stopbits': 1,
-    'timeout': 0.2
+    'timeout': 0.2,
+    # журнал обмена для воспроизведения на стенде (app.transport.ports.open_serial)
+    # 'record': '/code/app/bus.owenrec',
+    # 'replay': '/code/app/bus.owenrec',
+    # 'replay_speed': 1.0,
+}
+
+# дополнительные шины: порты или шлюзы Ethernet - RS-485 (tcp://host:port),
+# сенсор подключается к шине ключом 'bus', по умолчанию - serial_settings
+buses_settings: dict[str, dict[str, Any]] = {
+    # 'line2': {'port': 'tcp://192.168.1.50:4001', 'timeout': 0.2},
 }
 
 sensors_settings: list[dict[str, Any]] = [
@@ -22,6 +32,14 @@ sensors_settings: list[dict[str, Any]] = [
         'parameter': OwenCI8.DCNT
     },
     # {
+    #     'name': 's30',
+    #     'driver': OwenCI8,
+    #     'bus': 'line2',
+    #     'addr': 5,
+    #     'addr_len': 8,
+    #     'parameter': OwenCI8.DCNT
+    # },
+    # {
     #     'name': 's11',
     #     'addr': 2,
     #     'addr_len': 8,
@@ -48,4 +66,81 @@ sensors_settings: list[dict[str, Any]] = [
     # },
 ]
 
+# группы сенсоров (линия, цех, завод): участник - сенсор или другая группа,
+# суммарная скорость и число сенсоров на связи - /groups/<группа>
+groups_settings: dict[str, list[str]] = {
+    # 'line1': ['s10', 's11'],
+    # 'line2': ['s20', 's21'],
+    # 'plant': ['line1', 'line2'],
+}
+
+# правила тревог: показатель metric ('rate' - шт/мин, 'value' - показание,
+# 'offline' - нет связи; для группы - сумма и число сенсоров без связи)
+# сравнивается op с threshold не менее duration секунд, снятие тревоги -
+# по clear_threshold; переходы отправляются в ALARM_WEBHOOKS, активные - /alarms/
+alarm_rules: list[dict[str, Any]] = [
+    # {
+    #     'name': 'line-stopped',
+    #     'group': 'line1',
+    #     'metric': 'rate',
+    #     'op': '<',
+    #     'threshold': 1,
+    #     'clear_threshold': 5,
+    #     'duration': 180,
+    # },
+    # {
+    #     'name': 'offline',
+    #     'sensors': ['s10'],
+    #     'metric': 'offline',
+    #     'op': '==',
+    #     'threshold': 1,
+    #     'duration': 30,
+    # },
+]
+
+# период опроса сенсоров, с; сенсору можно задать свой период ключом 'interval'
 POLL_DELAY = 0.5
+# опрос по запросу: сенсоры, которые не запрашивались DEMAND_WINDOW секунд,
+# опрашиваются раз в KEEPALIVE_INTERVAL секунд
+DEMAND_POLLING = False
+DEMAND_WINDOW = 300
+KEEPALIVE_INTERVAL = 60
+# применение изменений этого файла без перезапуска (сенсоры, шины, POLL_DELAY),
+# файл проверяется раз в SETTINGS_RELOAD_INTERVAL секунд
+SETTINGS_RELOAD = False
+SETTINGS_RELOAD_INTERVAL = 2
+# повторное открытие недоступного или потерянного порта шины: первая попытка
+# через BUS_REOPEN_MIN_INTERVAL секунд, далее интервал удваивается
+# до BUS_REOPEN_INTERVAL секунд
+BUS_REOPEN_MIN_INTERVAL = 0.25
+BUS_REOPEN_INTERVAL = 5
+# модель пропускной способности шины: задержка ответа СИ8 до первых измерений, с,
+# и допустимая загрузка шины; если периоды опроса сенсоров не помещаются
+# в BUS_MAX_LOAD, они увеличиваются, переподписка сообщается в журнал и /capacity/
+BUS_TURNAROUND = 0.02
+BUS_MAX_LOAD = 0.9
+# определение скорости счетчиков локальных портов при запуске: расхождение
+# со скоростью порта и выигрыш от перенастройки счетчиков (параметр bPS)
+# на большую скорость - в журнал и /baudrate/; скорость порта не меняется
+# (тот же отчет без запуска опроса - python -m app.owen_poller.baudrate)
+BAUD_PROBE = False
+# история показаний: HISTORY_SIZE отсчетов на сенсор не чаще раза
+# в HISTORY_INTERVAL секунд (по умолчанию - последний час)
+HISTORY_SIZE = 720
+HISTORY_INTERVAL = 5
+# длительная история для выгрузки /history/export/ в сжатых блоках
+# по ARCHIVE_BLOCK отсчетов: ARCHIVE_SIZE отсчетов на сенсор не чаще раза
+# в ARCHIVE_INTERVAL секунд (по умолчанию - сутки, около 0.5 МБ на сенсор);
+# 0 - не ведется, выгрузка - из HISTORY_SIZE отсчетов
+ARCHIVE_SIZE = 172800
+ARCHIVE_INTERVAL = 0.5
+ARCHIVE_BLOCK = 512
+# скорость счета считается методом наименьших квадратов по последним
+# RATE_SAMPLES показаниям сенсора (время показания - середина обмена с СИ8)
+RATE_SAMPLES = 16
+# пороги аналитики простоев, шт/мин и секунд: скорость не выше ANALYTICS_IDLE_RATE -
+# простой, не ниже ANALYTICS_FULL_RATE - работа в полную силу; простой короче
+# ANALYTICS_PAUSE_MAX - пауза, длиннее - остановка
+ANALYTICS_IDLE_RATE = 10
+ANALYTICS_FULL_RATE = 150
+ANALYTICS_PAUSE_MAX = 60